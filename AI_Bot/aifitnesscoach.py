@@ -1,24 +1,88 @@
+import argparse
 import cv2
-import mediapipe as mp
+import math
 import numpy as np
-import pyttsx3
 import os
 import platform
 import tempfile
 import subprocess
 import time
+import zlib
+from speech import SpeechWorker
+from pipeline import FramePipeline
+from landmark_array import JOINT_ANGLES, landmarks_to_array
+from exercise_rules import COMPILED_EXERCISES
+from rep_analytics import RepAnalytics
+from landmark_log import LandmarkRecorder
+from perf_stats import StageTimer
+from roi_tracker import RoiPoseTracker
+from motion_model import StridedPose
+from perf_controller import AdaptivePose
+from overlay import TextSpriteCache
+from background_loader import BackgroundLoader
+from pose_backends import BACKENDS, DEFAULT_TASK_MODEL, create_backend
+from event_stream import EventStreamServer, ExerciseEventPublisher
+from feedback_bus import AudioSink, FeedbackBus, ScreenSink
+from voice_commands import VoiceCommandListener
+from session_store import DEFAULT_PATH as HISTORY_PATH, SessionLogger, SessionStore
+from video_recorder import VideoRecorder
 
 
-# Initialize mediapipe pose class and drawing utilities
-mp_pose = mp.solutions.pose
-mp_drawing = mp.solutions.drawing_utils
-pose = mp_pose.Pose()
+# Mediapipe pose class and drawing utilities, set once the pose model has loaded
+mp_pose = None
+mp_drawing = None
 
 
-# Initialize text-to-speech engine
-engine = pyttsx3.init()
-engine.setProperty('rate', 120)  # Set the speed of the speech
-engine.setProperty('voice', engine.getProperty('voices')[1].id)  # Set a different voice if available
+# Function to import mediapipe's pose and drawing modules (slow: mediapipe is a big import)
+def import_mediapipe():
+    global mp_pose, mp_drawing
+    import mediapipe as mp
+    mp_pose = mp.solutions.pose
+    mp_drawing = mp.solutions.drawing_utils
+
+
+# Function to import mediapipe and build the pose model (slow, so it runs in the background).
+# The legacy backend is a plain mp_pose.Pose; others come from pose_backends.create_backend.
+def load_pose(backend='legacy', model_path=DEFAULT_TASK_MODEL):
+    import_mediapipe()
+    return create_backend(backend, model_path=model_path)
+
+
+# The pose model loads in the background while the intro screen is up
+pose_loader = BackgroundLoader(load_pose, name='pose-loader')
+
+
+# Initialize text-to-speech worker (the engine itself starts on the worker thread)
+speech = SpeechWorker(rate=120, voice_index=1)
+
+
+# Rendered text sprites shared by everything drawn on screen
+text_cache = TextSpriteCache(max_entries=512)
+
+
+# Function to draw one feedback message (used by the on-screen feedback sink)
+def draw_feedback(frame, text, position, color):
+    put_text_with_shadow(frame, text, position, 1, color, (0, 0, 0), 2)
+
+
+# Feedback from the detectors is coalesced, rate-limited and prioritized before it reaches the
+# screen and the voice (see feedback_bus.py). Form corrections are only shown unless speak_form is set.
+feedback = FeedbackBus([
+    ScreenSink(draw_feedback),
+    AudioSink(lambda text, interrupt=False: text_to_speech(text, interrupt)),
+])
+speak_form = False
+
+
+# Pushes reps, stage changes and feedback to the companion app (None unless --stream-port is given)
+events = None
+
+# Per-rep range of motion, tempo and asymmetry for each exercise (see rep_analytics.py)
+analytics = {}
+
+
+# Saves every rep and feedback message to the workout history (None when history is off)
+history = None
 
 
 # Function to calculate angle between three points
@@ -33,49 +97,84 @@ def calculate_angle(a, b, c):
     return angle
 
 
-# Function to convert text to speech seamlessly
-def text_to_speech(text):
-    engine.say(text)
-    engine.runAndWait()
+# Function to convert text to speech seamlessly (queues the phrase and returns immediately)
+def text_to_speech(text, interrupt=False):
+    speech.say(text, interrupt)
 
 
 # Function to draw text with a shadow for better visibility
+# (each distinct text/scale/color is rasterized once and then alpha-blended from the cache)
 def put_text_with_shadow(img, text, position, font_scale, color, shadow_color, thickness=2):
-    x, y = position
-    # Draw shadow
-    cv2.putText(img, text, (x + 2, y + 2), cv2.FONT_HERSHEY_SIMPLEX, font_scale, shadow_color, thickness, cv2.LINE_AA)
-    # Draw main text
-    cv2.putText(img, text, position, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness, cv2.LINE_AA)
-
-
-# Function to display the introduction screen 
-def display_intro():
-    global selected_workout
-    selected_workout = None
+    text_cache.draw(img, text, position, font_scale, color, shadow_color, thickness)
+
+
+# Text drawn on the introduction screen: (text, position, font scale, thickness)
+INTRO_LINES = [
+    ('Welcome to AI Fitness Coach', (90, 150), 1.5, 3),
+    ('Press a key to select your workout', (120, 300), 1, 2),
+    ('1: Pushups  2: Squats  3: Bicep Curl', (100, 400), 1, 2),
+    ('4: Lunges  5: Overhead Dumbbell Press', (100, 450), 1, 2),
+]
+
+
+# Function to build the introduction screen; the finished image is cached in the temp directory
+# (keyed by the background file and the menu text) so later launches skip decoding and drawing
+def load_intro_screen(path='Fitness-Background.jpg', size=(800, 600)):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = f"{size[0]}x{size[1]}-{stat.st_size}-{int(stat.st_mtime)}-{zlib.crc32(repr(INTRO_LINES).encode()):08x}"
+    cache_path = os.path.join(tempfile.gettempdir(), f'ai_fitness_intro-{key}.npy')
+    try:
+        return np.load(cache_path)
+    except (OSError, ValueError):
+        pass
 
     # Load and resize the background image
-    background = cv2.imread('Fitness-Background.jpg')  
+    background = cv2.imread(path)
     if background is None:
-        print("Error: Could not load background image.")
-        return
-    
-    background = cv2.resize(background, (800, 600))
+        return None
+    background = cv2.resize(background, size)
 
     # Apply a fading effect to the background image
     alpha = 0.3  # Transparency factor (0.0 to 1.0)
     faded_background = cv2.addWeighted(background, alpha, background, 1 - alpha, 0)
 
     # Display welcome text with shadow
-    put_text_with_shadow(faded_background, 'Welcome to AI Fitness Coach', (90, 150), 1.5, (255, 255, 255), (0, 0, 0), 3)
-    put_text_with_shadow(faded_background, 'Press a key to select your workout', (120, 300), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(faded_background, '1: Pushups  2: Squats  3: Bicep Curl', (100, 400), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(faded_background, '4: Lunges  5: Overhead Dumbbell Press', (100, 450), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(faded_background, '4: Lunges  5: Overhead Dumbbell Press', (100, 450), 1, (255, 255, 255), (0, 0, 0), 2)
+    for text, position, font_scale, thickness in INTRO_LINES:
+        put_text_with_shadow(faded_background, text, position, font_scale, (255, 255, 255), (0, 0, 0), thickness)
 
+    try:
+        np.save(cache_path, faded_background)
+    except OSError:
+        pass
+    return faded_background
+
+
+# Function to display the introduction screen (a workout can also be picked by voice)
+def display_intro(voice=None):
+    global selected_workout
+    selected_workout = None
+
+    faded_background = load_intro_screen()
+    if faded_background is None:
+        print("Error: Could not load background image.")
+        return
 
     # Display the introduction screen
     cv2.imshow('Intro', faded_background)
-    key = cv2.waitKey(0)
+    if voice:
+        key = -1
+        while key == -1 and selected_workout is None:
+            key = cv2.waitKey(50)
+            for action, exercise in voice.poll():
+                if exercise:
+                    selected_workout = exercise
+                elif action == 'stop':
+                    key = ord('q')
+    else:
+        key = cv2.waitKey(0)
     if key == ord('1'):
         selected_workout = "pushups"
     elif key == ord('2'):
@@ -94,324 +193,147 @@ def display_intro():
 
 
 
-def detect_squats(landmarks, frame, count, stage):
-    # Get coordinates for hips, knees, and ankles
-    left_hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x, landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-    left_knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x, landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-    left_ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x, landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-
-    right_hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-    right_knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-    right_ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
+# Function to run one frame of a table-driven exercise (see exercise_rules.EXERCISES):
+# updates counts/stages in place, draws angles, feedback, counts and the rep analytics HUD, and announces reps
+def run_exercise(name, landmarks, frame, counts, stages, timestamp=None):
+    exercise = COMPILED_EXERCISES[name]
+    previous_stages = list(stages) if events else None
+    update = exercise.update(landmarks, counts, stages)
 
-    # Calculate the angles at the knees
-    left_knee_angle = calculate_angle(left_hip, left_knee, left_ankle)
-    right_knee_angle = calculate_angle(right_hip, right_knee, right_ankle)
+    tracker = analytics.get(name)
+    if tracker is None:
+        tracker = analytics[name] = RepAnalytics(exercise)
+    update.metrics = tracker.update(update.angles, time.perf_counter() if timestamp is None else timestamp, stages, update.reps)
 
-    # Visualize the angles
-    put_text_with_shadow(frame, str(int(left_knee_angle)), tuple(np.multiply(left_knee, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, str(int(right_knee_angle)), tuple(np.multiply(right_knee, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
+    # Visualize the angles (scaled to pixels with plain floats; no temporary arrays per label)
+    height, width = frame.shape[:2]
+    for i in exercise.display_angles:
+        joint = JOINT_ANGLES[i][1][1]
+        position = (int(landmarks[joint, 0] * width), int(landmarks[joint, 1] * height))
+        put_text_with_shadow(frame, str(int(update.angles[i])), position, 1, (255, 255, 255), (0, 0, 0), 2)
 
-    # Check for squat stages based on knee angles
-    if left_knee_angle > 130 and right_knee_angle > 130:
-        stage = "up"
-    if left_knee_angle < 110 and right_knee_angle < 110 and stage == "up":
-        stage = "down"
-        count += 1
-        text_to_speech("Good squat!")
+    # Announce completed reps
+    for i in update.reps:
+        counter = exercise.counters[i]
+        if 'rep_message' in counter:
+            message = counter['rep_message']
+            feedback.emit('rep', message['text'], message['position'], message['color'])
+        if 'speech' in counter:
+            feedback.emit('rep', counter['speech'], show=False, speak=True)
 
-    # --- Implementing Coaching Feedback ---
-    # 1. Knee Alignment: Ensure knees track over toes
-    if abs(left_knee[0] - left_ankle[0]) > 0.1 or abs(right_knee[0] - right_ankle[0]) > 0.1:
-        put_text_with_shadow(frame, "Align knees with toes!", (50, 200), 1, (0, 0, 255), (0, 0, 0), 2)
+    # Coaching feedback
+    for rule in update.messages:
+        feedback.emit('form', rule['message'], rule['position'], rule.get('color'), speak=speak_form)
+    feedback.flush(frame)
 
-    # 2. Depth: Ensure proper squat depth
-    if left_knee_angle > 120 or right_knee_angle > 120:
-        put_text_with_shadow(frame, "Go lower for a full squat!", (50, 250), 1, (0, 0, 255), (0, 0, 0), 2)
+    # Display counts
+    for counter, count in zip(exercise.counters, counts):
+        put_text_with_shadow(frame, f"{counter['label']}: {count}", counter['position'], 1, (255, 255, 255), (0, 0, 0), 2)
 
-    # 3. Back Position: Avoid leaning forward excessively
-    if left_hip[1] > left_knee[1] or right_hip[1] > right_knee[1]:
-        put_text_with_shadow(frame, "Keep your back straight!", (50, 300), 1, (0, 0, 255), (0, 0, 0), 2)
+    # Rep analytics HUD along the bottom (the text only changes when a rep completes)
+    hud_lines = tracker.hud_lines()
+    for i, line in enumerate(hud_lines):
+        put_text_with_shadow(frame, line, (20, height - 20 - 26 * (len(hud_lines) - 1 - i)), 0.6, (255, 255, 0), (0, 0, 0), 1)
 
-    # Display squat count
-    put_text_with_shadow(frame, f'Squat Count: {count}', (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
-
-
-    return count, stage
+    if events:
+        events.update(exercise, update, counts, previous_stages, stages)
+    if history:
+        history.update(exercise, update, counts)
+    return update
 
 
+# The detect_* functions keep their original signatures; with metrics=True they also return the
+# exercise's rep analytics summary (see RepAnalytics.summary)
+def detect_squats(landmarks, frame, count, stage, metrics=False):
+    counts, stages = [count], [stage]
+    run_exercise("squats", landmarks, frame, counts, stages)
+    if metrics:
+        return counts[0], stages[0], analytics["squats"].summary()
+    return counts[0], stages[0]
 
 
 # Function for bicep curl detection
-def detect_bicep_curls(landmarks, frame, left_count, right_count, left_stage, right_stage):
-    # Get coordinates for left and right shoulders, elbows, and wrists
-    left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-    left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x, landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-    left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x, landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-
-    right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-    right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-    right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-
-    # Calculate the angles at the elbows
-    left_elbow_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    right_elbow_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-    # Visualize the angles
-    put_text_with_shadow(frame, str(int(left_elbow_angle)), tuple(np.multiply(left_elbow, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, str(int(right_elbow_angle)), tuple(np.multiply(right_elbow, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    # --- Implementing Form Corrections ---
-
-    # 1. Elbow Position: Ensure elbows stay close to the torso
-    if landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x > landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x + 0.1 or \
-       landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x > landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x + 0.1:
-        put_text_with_shadow(frame, "Keep your elbows close to your body!", (50, 150), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 2. Back Stability: Avoid swinging the torso
-    if abs(landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x - landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x) > 0.1 or \
-       abs(landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x - landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x) > 0.1:
-        put_text_with_shadow(frame, "Avoid swinging; keep your back straight!", (50, 200), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 3. Full Range of Motion: Ensure arm is fully extended at the bottom
-    if left_elbow_angle > 160 and right_elbow_angle > 160:  # This assumes full extension is above 160 degrees
-        put_text_with_shadow(frame, "Lower your arm fully between reps!", (50, 250), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 4. Shoulder Engagement: Shoulders should remain stable and not rise
-    #if landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y < landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y - 0.05 or \
-    #   landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y < landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y - 0.05:
-    #    put_text_with_shadow(frame, "Keep your shoulders relaxed!", (50, 300), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 5. Wrist Position: Ensure wrists stay straight
-    if abs(landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x - landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x) > 0.05 or \
-       abs(landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x - landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x) > 0.05:
-        put_text_with_shadow(frame, "Keep your wrists straight!", (50, 350), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # Check for left arm curl stages
-    if left_elbow_angle > 160:
-        left_stage = "down"
-    if left_elbow_angle < 50 and left_stage == "down":
-        left_stage = "up"
-        left_count += 1
-
-    # Check for right arm curl stages
-    if right_elbow_angle > 160:
-        right_stage = "down"
-    if right_elbow_angle < 50 and right_stage == "down":
-        right_stage = "up"
-        if left_stage != "up":
-            right_count += 1
-
-    # Display curl counts
-    put_text_with_shadow(frame, f'Left Curl Count: {left_count}', (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, f'Right Curl Count: {right_count}', (50, 100), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    return left_count, right_count, left_stage, right_stage
-
-
-
-
-
-# Placeholder functions for other exercise detection
-
+def detect_bicep_curls(landmarks, frame, left_count, right_count, left_stage, right_stage, metrics=False):
+    counts, stages = [left_count, right_count], [left_stage, right_stage]
+    run_exercise("bicep curl", landmarks, frame, counts, stages)
+    if metrics:
+        return counts[0], counts[1], stages[0], stages[1], analytics["bicep curl"].summary()
+    return counts[0], counts[1], stages[0], stages[1]
 
 
 # function for pushup detection
-def detect_pushups(landmarks, frame, count, stage):
-    # Get coordinates for shoulders, elbows, and wrists
-    left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-    left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x, landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-    left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x, landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-
-    right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-    right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-    right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-
-    # Calculate the angles at the elbows
-    left_elbow_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    right_elbow_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-    # Visualize the angles
-    put_text_with_shadow(frame, str(int(left_elbow_angle)), tuple(np.multiply(left_elbow, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, str(int(right_elbow_angle)), tuple(np.multiply(right_elbow, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    # Check for pushup stages
-    if left_elbow_angle > 160 and right_elbow_angle > 160:
-        stage = "up"
-    elif left_elbow_angle < 90 and right_elbow_angle < 90 and stage == "up":
-        stage = "down"
-        count += 1
-        put_text_with_shadow(frame, "Good pushup!", (50, 150), 1, (0, 255, 0), (0, 0, 0), 2)
-    else:
-        # Provide feedback on the screen if the user is not doing the push-up correctly
-        if left_elbow_angle > 90 or right_elbow_angle > 90:
-            put_text_with_shadow(frame, "Go lower!", (50, 150), 1, (0, 0, 255), (0, 0, 0), 2)
-        if left_elbow_angle < 90 and right_elbow_angle < 90 and left_shoulder[1] > left_wrist[1] and right_shoulder[1] > right_wrist[1]:
-            put_text_with_shadow(frame, "Keep your back straight!", (50, 200), 1, (0, 0, 255), (0, 0, 0), 2)
-    
-    # Display pushup count
-    put_text_with_shadow(frame, f'Pushup Count: {count}', (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    return count, stage
-
-
-
-
-def detect_overhead_dumbbell_press(landmarks, frame, count, stage):
-    # Get coordinates for shoulders, elbows, and wrists
-    left_shoulder = [landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-    left_elbow = [landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].x, landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-    left_wrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x, landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-
-    right_shoulder = [landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_SHOULDER.value].y]
-    right_elbow = [landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_ELBOW.value].y]
-    right_wrist = [landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_WRIST.value].y]
-
-    # Calculate the angles at the elbows
-    left_elbow_angle = calculate_angle(left_shoulder, left_elbow, left_wrist)
-    right_elbow_angle = calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-    # Visualize the angles
-    put_text_with_shadow(frame, str(int(left_elbow_angle)), tuple(np.multiply(left_elbow, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, str(int(right_elbow_angle)), tuple(np.multiply(right_elbow, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    # Check for overhead position (wrists above shoulders)
-    if left_wrist[1] < left_shoulder[1] and right_wrist[1] < right_shoulder[1]:
-        # Check for press stages
-        if left_elbow_angle > 160 and right_elbow_angle > 160 and stage != "up":
-            stage = "up"
-        elif left_elbow_angle < 100 and right_elbow_angle < 100 and stage == "up":
-            stage = "down"
-            count += 1
-            text_to_speech("Good overhead press!")
-    else:
-        # Reset stage if wrists are not overhead to avoid incorrect counting
-        stage = None
-
-    # --- Implementing Coaching Feedback ---
-    # 1. Wrist Alignment: Wrists must be straight
-    if abs(left_wrist[0] - left_elbow[0]) > 0.1 or abs(right_wrist[0] - right_elbow[0]) > 0.1:
-        put_text_with_shadow(frame, "Keep your wrists straight!", (50, 150), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 2. Don't Drop Arms: Only if arms are below halfway
-    halfway_line = (left_shoulder[1] + right_shoulder[1]) / 2
-    if left_wrist[1] > halfway_line and right_wrist[1] > halfway_line:
-        put_text_with_shadow(frame, "Don't drop your arms!", (50, 200), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 3. Fully Extend Arms: Only if arms are halfway up or above
-    if left_wrist[1] <= halfway_line or right_wrist[1] <= halfway_line:
-        if left_elbow_angle < 160 or right_elbow_angle < 160:
-            put_text_with_shadow(frame, "Fully extend your arms!", (50, 250), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 4. Back Posture: Avoid leaning backward
-    if abs(landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x - left_shoulder[0]) > 0.1 or \
-       abs(landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x - right_shoulder[0]) > 0.1:
-        put_text_with_shadow(frame, "Maintain a straight back!", (50, 300), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # Display press count
-    put_text_with_shadow(frame, f'Press Count: {count}', (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    return count, stage
-
+def detect_pushups(landmarks, frame, count, stage, metrics=False):
+    counts, stages = [count], [stage]
+    run_exercise("pushups", landmarks, frame, counts, stages)
+    if metrics:
+        return counts[0], stages[0], analytics["pushups"].summary()
+    return counts[0], stages[0]
 
 
+def detect_overhead_dumbbell_press(landmarks, frame, count, stage, metrics=False):
+    counts, stages = [count], [stage]
+    run_exercise("overhead dumbbell press", landmarks, frame, counts, stages)
+    if metrics:
+        return counts[0], stages[0], analytics["overhead dumbbell press"].summary()
+    return counts[0], stages[0]
 
 
+# Function for lunge detection with coaching feedback
+def detect_lunges(landmarks, frame, left_count, right_count, left_stage, right_stage, metrics=False):
+    counts, stages = [left_count, right_count], [left_stage, right_stage]
+    run_exercise("lunges", landmarks, frame, counts, stages)
+    if metrics:
+        return counts[0], counts[1], stages[0], stages[1], analytics["lunges"].summary()
+    return counts[0], counts[1], stages[0], stages[1]
 
 
 
 
-# Function for lunge detection with coaching feedback
-def detect_lunges(landmarks, frame, left_count, right_count, left_stage, right_stage):
-    # Get coordinates for hips, knees, and ankles for both legs
-    left_hip = [landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].x, landmarks[mp_pose.PoseLandmark.LEFT_HIP.value].y]
-    left_knee = [landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].x, landmarks[mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-    left_ankle = [landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].x, landmarks[mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-
-    right_hip = [landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_HIP.value].y]
-    right_knee = [landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_KNEE.value].y]
-    right_ankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x, landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
-
-    # Calculate the angles at the knees
-    left_knee_angle = calculate_angle(left_hip, left_knee, left_ankle)
-    right_knee_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-    # Visualize the angles
-    put_text_with_shadow(frame, str(int(left_knee_angle)), tuple(np.multiply(left_knee, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, str(int(right_knee_angle)), tuple(np.multiply(right_knee, [frame.shape[1], frame.shape[0]]).astype(int)), 1, (255, 255, 255), (0, 0, 0), 2)
-
-    # Check for lunge stages
-    if left_knee_angle > 160 and right_knee_angle < 110:
-        right_stage = "down"
-    elif right_knee_angle > 160 and left_knee_angle < 110:
-        left_stage = "down"
-    elif left_knee_angle > 160 and right_knee_angle > 160:
-        if right_stage == "down":
-            right_count += 1
-            text_to_speech("Good right lunge!")
-            right_stage = None
-        if left_stage == "down":
-            left_count += 1
-            text_to_speech("Good left lunge!")
-            left_stage = None
-
-    # Coaching feedback for lunges
-    # 1. Knee Position
-    if left_knee[0] > left_ankle[0] + 0.05 or right_knee[0] > right_ankle[0] + 0.05:
-        put_text_with_shadow(frame, "Avoid letting your knee go past your toes!", (50, 200), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 3. Back Leg Form
-    if left_knee_angle < 70 or right_knee_angle < 70:
-        put_text_with_shadow(frame, "Lower your back knee toward the ground!", (50, 250), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # 4. Torso Stability
-    if abs(left_hip[0] - left_knee[0]) > 0.1 or abs(right_hip[0] - right_knee[0]) > 0.1:
-        put_text_with_shadow(frame, "Keep your torso upright; avoid leaning forward!", (50, 300), 1, (0, 0, 255), (0, 0, 0), 2)
-
-    # Display lunge counts
-    put_text_with_shadow(frame, f'Right Lunge Count: {right_count}', (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
-    put_text_with_shadow(frame, f'Left Lunge Count: {left_count}', (50, 100), 1, (255, 255, 255), (0, 0, 0), 2)
-    
-    return left_count, right_count, left_stage, right_stage
-
-
 
 
+# Countdown function for the 5-second grace period. It runs on the live pipeline instead of a frozen
+# frame, so capture and pose inference keep going: by the time the workout starts the model is warm,
+# tracking has locked on to the user and the ROI/landmark predictor state is primed.
+# Returns how many frames were processed and in how many a pose was found.
+def countdown(pipeline, seconds=5):
+    end = time.perf_counter() + seconds + 1  # one extra second for "Starting now!"
+    announced = None
+    warmed = found = 0
+    while pipeline.running():
+        remaining = end - time.perf_counter()
+        if remaining <= 0:
+            break
+        packet = pipeline.get()
+        if packet is None:
+            break
 
+        frame = packet.frame
+        warmed += 1
+        if packet.results.pose_landmarks:
+            found += 1
+            mp_drawing.draw_landmarks(frame, packet.results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
 
-# Countdown function for the 5-second grace period
-def countdown(frame, seconds=5):
-    height, width = frame.shape[:2]  # Get the frame dimensions
-    for i in range(seconds, 0, -1):
-        # Clear the frame
-        frame_copy = frame.copy()  # Copy the frame to clear previous text
+        number = math.ceil(remaining) - 1
+        if number > 0:
+            text, color, phrase = f'Starting in {number}', (255, 255, 255), str(number)
+        else:
+            text, color, phrase = 'Starting now!', (0, 255, 0), "Starting now!"
 
         # Calculate text size and position for centering
-        text = f'Starting in {i}'
+        height, width = frame.shape[:2]
         text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 2, 3)[0]
         text_x = (width - text_size[0]) // 2
         text_y = (height + text_size[1]) // 2
+        put_text_with_shadow(frame, text, (text_x, text_y), 2, color, (0, 0, 0), 3)
+        cv2.imshow('Fitness Coach', frame)
+        cv2.waitKey(1)
+        pipeline.release(packet)
 
-        # Display the countdown text on the center of the frame
-        put_text_with_shadow(frame_copy, text, (text_x, text_y), 2, (255, 255, 255), (0, 0, 0), 3)
-        
-        # Show the frame with the countdown number
-        cv2.imshow('Fitness Coach', frame_copy)
-        cv2.waitKey(1000)  # Wait for 1 second
-        
-        # Announce the countdown
-        text_to_speech(str(i))
-
-    # Display "Starting now!" message
-    frame_copy = frame.copy()  # Clear frame again for "Starting now!" text
-    text = 'Starting now!'
-    text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 2, 3)[0]
-    text_x = (width - text_size[0]) // 2
-    text_y = (height + text_size[1]) // 2
-    put_text_with_shadow(frame_copy, text, (text_x, text_y), 2, (0, 255, 0), (0, 0, 0), 3)
-    cv2.imshow('Fitness Coach', frame_copy)
-    cv2.waitKey(1000)  # Display "Starting now!" for a second
-    text_to_speech("Starting now!")
+        # Announce each number once, as it appears
+        if number != announced:
+            announced = number
+            text_to_speech(phrase, interrupt=True)
+    return warmed, found
 
 
 
@@ -424,103 +346,312 @@ def countdown(frame, seconds=5):
 
 
 # Main function to handle the exercise detection
-def main():
-    global selected_workout
+def main(record_path=None, stats=False, stats_overlay=False, roi=False, stride=1, adaptive_stride=False, target_fps=None, stream_port=None, speak_feedback=False, voice_backend=None,
+         history_path=HISTORY_PATH, backend='legacy', task_model=DEFAULT_TASK_MODEL, video_path=None):
+    global selected_workout, events, speak_form, history
+    speak_form = speak_feedback
+
+    # Load the pose model and speech engine while the user picks a workout
+    loader = pose_loader if backend == 'legacy' else BackgroundLoader(lambda: load_pose(backend, task_model), name='pose-loader')
+
+    # Whatever gets started below is shut down in the finally block, however main() exits
+    voice = pose = pose_owner = model = cap = pipeline = recorder = video = stream = store = None
+    try:
+        loader.start()
+        speech.start()
+
+        # Optional voice control, listening on its own thread
+        if voice_backend:
+            try:
+                voice = VoiceCommandListener(voice_backend).start()
+            except Exception as e:
+                print(f"Voice control unavailable: {e}")
+
+        # Display intro screen
+        display_intro(voice)
+        if selected_workout is None:
+            print("No workout selected. Exiting...")
+            return
+
+        try:
+            pose = pose_owner = loader.get()
+        except Exception as e:
+            print(f"Error: Could not load the {backend} pose backend: {e}")
+            return
+
+        # Start capturing video
+        cap = cv2.VideoCapture(0)
+        if not cap.isOpened():
+            print("Error: Could not open camera.")
+            return
+
+        pushup_count = 0
+        pushup_stage = None
     
-    # Display intro screen
-    display_intro()
-    if selected_workout is None:
-        print("No workout selected. Exiting...")
-        return
-
-    # Start capturing video
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Error: Could not open camera.")
-        return
-
-    pushup_count = 0
-    pushup_stage = None
+        squat_count = 0
+        squat_stage = None
     
-    squat_count = 0
-    squat_stage = None
+        left_curl_count = 0
+        right_curl_count = 0
+        left_curl_stage = None
+        right_curl_stage = None
+        both_curl_count = 0
     
-    left_curl_count = 0
-    right_curl_count = 0
-    left_curl_stage = None
-    right_curl_stage = None
-    both_curl_count = 0
-    
-    left_lunge_count = 0
-    right_lunge_count = 0
-    left_lunge_stage = None
-    right_lunge_stage = None
-
-    # Define the current exercise
-    current_exercise = selected_workout
-
-
-
-
-
-    # Capture the initial frame for countdown
-    ret, frame = cap.read()
-    if ret:
-        countdown(frame)  # 5-second countdown before starting the workout
-
-
-
-
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            print("Error: Could not read from camera.")
-            break
-
-               
-
-        # Recolor the image to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-       
-        
-        
-        # Process the frame with Mediapipe Pose
-        results = pose.process(rgb_frame)
-
-        # Check if landmarks are detected
-        if results.pose_landmarks:
+        left_lunge_count = 0
+        right_lunge_count = 0
+        left_lunge_stage = None
+        right_lunge_stage = None
+
+        # Define the current exercise
+        current_exercise = selected_workout
+
+        # Optionally stream workout events to the companion app
+        if stream_port:
+            stream = EventStreamServer(port=stream_port).start()
+            events = ExerciseEventPublisher(stream)
+            print(f"Streaming workout events on {stream.url()}")
+
+        # Workout history is written in batches on a background thread
+        if history_path:
+            store = SessionStore(history_path)
+            history = SessionLogger(store)
+
+        # Reused every frame for the (33, 4) landmark array the detectors consume
+        landmark_buffer = np.empty((33, 4), dtype=np.float32)
+
+        # Optionally record the landmark trace for replay.py
+        recorder = LandmarkRecorder(record_path, current_exercise) if record_path else None
+
+        # Capture and pose inference run on background threads; this loop is the render/UI stage
+        # Optional per-stage timing (None means instrumentation is off)
+        timer = StageTimer() if stats or stats_overlay else None
+
+        # Optionally let a controller pick model complexity and input resolution to hold a target FPS
+        asynchronous = getattr(pose, 'asynchronous', False)
+        if asynchronous and (roi or stride > 1 or adaptive_stride or target_fps):
+            print("Note: --roi, --stride and --target-fps need a synchronous backend; ignoring them")
+            roi = adaptive_stride = False
+            stride = 1
+            target_fps = None
+        # (the legacy model from the loader has the controller's starting settings, so it becomes that level)
+        model = AdaptivePose(target_fps, pose=pose if backend == 'legacy' else None) if target_fps else pose
+        if target_fps and backend == 'legacy':
+            pose_owner = model
+
+        # Optionally run inference on a crop around the user instead of the full frame
+        tracker = RoiPoseTracker(model) if roi else None
+        process = tracker.process if tracker else model.process
+
+        # Optionally run the model on every Nth frame only and extrapolate landmarks in between
+        strided = None
+        if stride > 1 or adaptive_stride:
+            strided = StridedPose(process, stride=stride, adaptive=adaptive_stride)
+            process = strided.process
+
+        if asynchronous:
+            pipeline = FramePipeline(cap, None, timer=timer, submit=pose.submit).start()
+        else:
+            # (the strided model extrapolates along capture times, not whenever inference got round to a frame)
+            pipeline = FramePipeline(cap, process, timer=timer, timestamped=strided is not None).start()
+
+        # 5-second countdown before starting the workout, warming up the pipeline meanwhile
+        warmed, found = countdown(pipeline)
+        if timer:
+            print(f"Warm-up: {warmed} frames during the countdown, pose found in {found}")
+            timer.reset()
+
+        # Running totals of the current exercise, in counter order (history and the event stream only
+        # report what each session adds to them)
+        def current_counts():
+            return {
+                'pushups': [pushup_count],
+                'squats': [squat_count],
+                'bicep curl': [left_curl_count, right_curl_count],
+                'lunges': [left_lunge_count, right_lunge_count],
+                'overhead dumbbell press': [squat_count],
+            }[current_exercise]
+
+        if events:
+            events.start(COMPILED_EXERCISES[current_exercise], current_counts())
+        if history:
+            history.start(COMPILED_EXERCISES[current_exercise], current_counts())
+
+        # Optionally save the annotated workout to a video file, encoded on a background thread
+        if video_path:
+            video = VideoRecorder(video_path, cap.get(cv2.CAP_PROP_FPS) or 30.0)
+
+        start_time = None
+        while pipeline.running():
+            packet = pipeline.get()
+            if packet is None:
+                break
+            if start_time is None:
+                start_time = packet.captured_at
+
+            frame = packet.frame
+            results = packet.results
+            if timer:
+                stage_start = time.perf_counter()
+
+            # Check if landmarks are detected
+            if results.pose_landmarks:
             
-            mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-
-            landmarks = results.pose_landmarks.landmark
+                mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+                if timer:
+                    now = time.perf_counter()
+                    timer.record('draw', now - stage_start)
+                    stage_start = now
+
+                landmarks = landmarks_to_array(results.pose_landmarks, landmark_buffer)
+                if recorder:
+                    recorder.write(packet.captured_at - start_time, landmarks)
             
-            # Call the function based on the current exercise
-            if current_exercise == "pushups":
-                pushup_count, pushup_stage = detect_pushups(landmarks, frame, pushup_count, pushup_stage)
-            elif current_exercise == "squats":
-                squat_count, squat_stage = detect_squats(landmarks, frame, squat_count, squat_stage)
-            elif current_exercise == "bicep curl":
-                left_curl_count, right_curl_count, left_curl_stage, right_curl_stage = detect_bicep_curls(landmarks, frame, left_curl_count, right_curl_count, left_curl_stage, right_curl_stage)
-            elif current_exercise == "lunges":
-                left_lunge_count, right_lungeF_count, left_lunge_stage, right_lunge_stage = detect_lunges(landmarks, frame, left_lunge_count, right_lunge_count, left_lunge_stage, right_lunge_stage)
-            elif current_exercise == "overhead dumbbell press":
-                squat_count, squat_stage = detect_overhead_dumbbell_press(landmarks, frame, squat_count, squat_stage)
-        else:
-            print("No landmarks detected. Please adjust your position.")
-
-        # Display frame
-        cv2.imshow('Fitness Coach', frame)
-
-        # Exit condition
-        key = cv2.waitKey(10) & 0xFF
-        if key == ord('q'):
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
+                # Call the function based on the current exercise
+                if current_exercise == "pushups":
+                    pushup_count, pushup_stage = detect_pushups(landmarks, frame, pushup_count, pushup_stage)
+                elif current_exercise == "squats":
+                    squat_count, squat_stage = detect_squats(landmarks, frame, squat_count, squat_stage)
+                elif current_exercise == "bicep curl":
+                    left_curl_count, right_curl_count, left_curl_stage, right_curl_stage = detect_bicep_curls(landmarks, frame, left_curl_count, right_curl_count, left_curl_stage, right_curl_stage)
+                elif current_exercise == "lunges":
+                    left_lunge_count, right_lunge_count, left_lunge_stage, right_lunge_stage = detect_lunges(landmarks, frame, left_lunge_count, right_lunge_count, left_lunge_stage, right_lunge_stage)
+                elif current_exercise == "overhead dumbbell press":
+                    squat_count, squat_stage = detect_overhead_dumbbell_press(landmarks, frame, squat_count, squat_stage)
+            else:
+                if recorder:
+                    recorder.write(packet.captured_at - start_time)
+                print("No landmarks detected. Please adjust your position.")
+                feedback.flush(frame)
+
+            if timer:
+                now = time.perf_counter()
+                timer.record('detect', now - stage_start)
+                if stats_overlay:
+                    timer.draw_overlay(frame)
+                stage_start = now
+
+            # Display frame
+            cv2.imshow('Fitness Coach', frame)
+
+            # Exit condition (the pipeline already paces us, so only poll the keyboard)
+            key = cv2.waitKey(1) & 0xFF
+            # imshow has its own copy; the buffer can take the next capture, or goes to the video
+            # recorder first, which gives it back to the pool once it is encoded (the capture time
+            # keeps the recording in real time whatever the live frame rate)
+            if video:
+                video.write(packet.frame, pipeline.pool.give, packet.captured_at)
+                packet.frame = None
+            else:
+                pipeline.release(packet)
+
+            if timer:
+                now = time.perf_counter()
+                timer.record('display', now - stage_start)
+                timer.record('latency', now - packet.captured_at)
+                timer.frame_done(now)
+
+            if key == ord('q'):
+                break
+
+            # Voice commands: switch exercise (each keeps its own count) or stop
+            if voice:
+                commands = voice.poll()
+                if ('stop', None) in commands:
+                    break
+                for action, exercise in commands:
+                    if exercise and exercise != current_exercise:
+                        current_exercise = exercise
+                        print(f"Switched to {exercise}")
+                        if events:
+                            events.finish()
+                            events.start(COMPILED_EXERCISES[current_exercise], current_counts())
+                        if history:
+                            history.start(COMPILED_EXERCISES[current_exercise], current_counts())
+
+        pipeline.stop()
+        if pipeline.error:
+            print(pipeline.error)
+        if recorder:
+            recorder.close()
+            print(f"Recorded {recorder.frames} frames to {recorder.path}")
+        if video:
+            video.close()
+            video_stats = video.stats()
+            print(f"Saved {video_stats['written']} annotated frames to {video.path} "
+                  f"({video_stats['repeated']} repeated to keep real time, {video_stats['dropped']} dropped while the encoder was behind)")
+        if timer:
+            print(f"Dropped frames: {pipeline.dropped_capture} before inference, {pipeline.dropped_inference} skipped by the pose backend, "
+                  f"{pipeline.dropped_results} before display")
+            timer.print_summary()
+            if tracker:
+                print(f"ROI inference: {tracker.roi_frames} cropped, {tracker.full_frames} full frame, {tracker.lost} times lost, "
+                      f"{tracker.moves} region changes")
+            if strided:
+                print(f"Strided inference: {strided.inferred} inferred, {strided.predicted} predicted, final stride {strided.stride}")
+            if target_fps:
+                print(f"Performance controller: {model.switches} switches, final settings {model.settings()}")
+            feedback_stats = feedback.stats()
+            print(f"Feedback: {feedback_stats['emitted']} emitted ({feedback_stats['coalesced']} duplicates), "
+                  f"{feedback_stats['shown']} shown, {feedback_stats['spoken']} spoken, {feedback_stats['suppressed']} held back")
+    finally:
+        if pipeline:
+            pipeline.stop()
+        if recorder:
+            recorder.close()
+        if video:
+            video.close()
+        if pose is None:
+            # main() never got as far as using the model: wait for the loader to finish so it can be closed
+            try:
+                pose = pose_owner = loader.get()
+            except Exception:
+                pass
+        if model is not None and model is not pose:
+            model.close()
+        if pose_owner is pose and pose is not None:
+            # (when the performance controller took the pose over, it has closed it above)
+            pose.close()
+
+        if events:
+            events.finish()
+            events = None
+        if stream:
+            stream.close()
+        if voice:
+            voice.close()
+        if history:
+            history.finish()
+            history = None
+        if store:
+            store.close()
+
+        if cap is not None:
+            cap.release()
+        cv2.destroyAllWindows()
+        speech.close()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='AI Fitness Coach')
+    parser.add_argument('--record', metavar='PATH', help='Record per-frame landmarks to PATH for replay.py')
+    parser.add_argument('--stats', action='store_true', help='Time each stage and print a summary at exit')
+    parser.add_argument('--stats-overlay', action='store_true', help='Also draw FPS and the stage breakdown on the video')
+    parser.add_argument('--roi', action='store_true', help='Run pose inference on a crop around the user (faster on large frames)')
+    parser.add_argument('--stride', type=int, default=1, help='Run pose inference on every Nth frame and extrapolate the rest')
+    parser.add_argument('--adaptive-stride', action='store_true', help='Pick the stride from the measured inference time')
+    parser.add_argument('--target-fps', type=float, help='Adapt model complexity and resolution to hold this inference rate')
+    parser.add_argument('--stream-port', type=int, help='Stream reps, stages and feedback to the companion app on this local port')
+    parser.add_argument('--speak-feedback', action='store_true', help='Also speak form corrections (rate-limited per cue)')
+    parser.add_argument('--voice', nargs='?', const='google', choices=['google', 'sphinx', 'vosk'],
+                        help='Voice commands ("start squats", "switch to lunges", "stop"); sphinx and vosk work offline')
+    parser.add_argument('--history', default=HISTORY_PATH, metavar='PATH', help='Workout history database (default: %(default)s)')
+    parser.add_argument('--no-history', action='store_true', help="Don't save this workout to the history")
+    parser.add_argument('--backend', choices=BACKENDS, default='legacy', help='Pose backend (tasks: MediaPipe Tasks PoseLandmarker, live-stream mode)')
+    parser.add_argument('--task-model', default=DEFAULT_TASK_MODEL, help='PoseLandmarker .task model for --backend tasks')
+    parser.add_argument('--save-video', metavar='PATH', help='Save the annotated workout video to PATH (e.g. workout.mp4)')
+    args = parser.parse_args()
+    main(record_path=args.record, stats=args.stats, stats_overlay=args.stats_overlay, roi=args.roi,
+         stride=args.stride, adaptive_stride=args.adaptive_stride, target_fps=args.target_fps, stream_port=args.stream_port,
+         speak_feedback=args.speak_feedback, voice_backend=args.voice,
+         history_path=None if args.no_history else args.history, backend=args.backend, task_model=args.task_model,
+         video_path=args.save_video)
 	
\ No newline at end of file
@@ -1,11 +1,9 @@
 import speech_recognition as sr
 
-from gtts import gTTS
-import os
-from io import BytesIO
-from playsound import playsound
+from phrase_cache import PhraseCache
 
 language = 'en'
+phrases = PhraseCache(language=language)
 
 def speech_to_text():
     recognizer = sr.Recognizer()
@@ -14,15 +12,15 @@ def speech_to_text():
         print("Please say something....")
         audio = recognizer.listen(source, timeout=2)
         try:
-            print("You said: \n" + recognizer.recognize_google(audio))
-            return (recognizer.recognize_google(audio))
+            # Recognize once and reuse the text (each call is a network round trip)
+            text = recognizer.recognize_google(audio)
+            print("You said: \n" + text)
+            return text
         except Exception as e:
             print("Error: " + str(e))
 
 def text_to_speech(text):
-    output = gTTS(text=text, lang=language, slow=False)
-    output.save("output.mp3")
-    playsound("output.mp3")
+    phrases.say(text)
 
 def main():  
     text_to_speech("Testing, Testing, Testing")
@@ -0,0 +1,40 @@
+import threading
+
+
+# Runs a slow initializer (model loading, heavy imports) on a background thread.
+# get() waits for it to finish and re-raises whatever it raised.
+class BackgroundLoader:
+    def __init__(self, factory, name='loader'):
+        self.factory = factory
+        self.name = name
+        self.thread = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self.value = None
+        self.error = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+        return self
+
+    def ready(self):
+        return self.done.is_set()
+
+    def get(self, timeout=None):
+        self.start()
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"{self.name} did not finish within {timeout} seconds")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def _run(self):
+        try:
+            self.value = self.factory()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
@@ -0,0 +1,166 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+from exercise_rules import EXERCISES
+from process_video import create_pose, process_video, write_csv
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Each worker process owns its own pose model
+worker_pose = None
+
+
+def init_worker(model_complexity):
+    global worker_pose
+    # One process per core already; keep OpenCV from spawning its own threads on top
+    cv2.setNumThreads(1)
+    worker_pose = create_pose(model_complexity)
+
+
+# Runs in a worker: a failure only affects this file's result
+def process_job(path, exercise):
+    try:
+        return process_video(path, exercise, worker_pose)
+    except Exception as e:
+        return {'file': path, 'exercise': exercise, 'error': f"{type(e).__name__}: {e}", 'reps': []}
+
+
+# Expand files and directories into (path, exercise) jobs
+def collect_jobs(inputs, exercise=None, manifest=None):
+    jobs = []
+    if manifest:
+        with open(manifest, newline='') as f:
+            for row in csv.DictReader(f):
+                jobs.append((row['file'], row['exercise']))
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = sorted(p for p in glob.glob(os.path.join(item, '**', '*'), recursive=True)
+                           if p.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            paths = [item]
+        jobs.extend((path, exercise) for path in paths)
+
+    for path, name in jobs:
+        if name not in EXERCISES:
+            raise ValueError(f"Unknown exercise {name!r} for {path}")
+    return jobs
+
+
+# Run jobs[i] for each i in `indices` on one process pool, at most `workers` at a time, handing each
+# result to on_result(i, result). A worker that dies (e.g. crashes inside a native library on a
+# corrupt file) takes the whole pool down; then this returns (jobs that were in flight, jobs not
+# started yet) instead of two empty lists.
+def run_pool(jobs, indices, workers, model_complexity, on_result):
+    waiting = collections.deque(indices)
+    in_flight = {}
+    broken = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                initargs=(model_complexity,)) as pool:
+        while (waiting or in_flight) and not broken:
+            try:
+                while waiting and len(in_flight) < workers:
+                    i = waiting.popleft()
+                    in_flight[pool.submit(process_job, *jobs[i])] = i
+            except BrokenProcessPool:
+                # Broke between two results; counting this job in keeps every retry making progress
+                broken.append(i)
+                break
+            finished, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                i = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken.append(i)
+                    continue
+                except Exception as e:
+                    result = {'file': jobs[i][0], 'exercise': jobs[i][1], 'error': f"{type(e).__name__}: {e}", 'reps': []}
+                on_result(i, result)
+    return broken + list(in_flight.values()), list(waiting)
+
+
+# Fan the jobs out over a process pool; results come back in the order the jobs were given.
+# When a worker crash breaks the pool, each job that was in flight is rerun on its own to find the
+# file that crashed (recorded as failed) and the rest carry on in a new pool.
+def run_batch(jobs, workers=None, model_complexity=1, progress=print):
+    workers = workers or os.cpu_count() or 1
+    results = [None] * len(jobs)
+    started = time.perf_counter()
+    done = 0
+    failed = 0
+
+    def finish(i, result):
+        nonlocal done, failed
+        results[i] = result
+        done += 1
+        if 'error' in result:
+            failed += 1
+            status = "FAILED " + result['error']
+        else:
+            status = f"{len(result['reps'])} reps, {result['speedup']}x real-time"
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(f"[{done}/{len(jobs)}] {result['file']}: {status} ({done / elapsed:.2f} files/s)")
+
+    remaining = list(range(len(jobs)))
+    while remaining:
+        suspects, remaining = run_pool(jobs, remaining, workers, model_complexity, finish)
+        for i in suspects:
+            crashed, _ = run_pool(jobs, [i], 1, model_complexity, finish)
+            if crashed:
+                finish(i, {'file': jobs[i][0], 'exercise': jobs[i][1], 'reps': [],
+                           'error': "BrokenProcessPool: the worker process died while processing this file"})
+
+    return results, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reprocess many recorded sessions in parallel.')
+    parser.add_argument('inputs', nargs='*', help='Video files or directories to search for videos')
+    parser.add_argument('--exercise', choices=sorted(EXERCISES), help='Exercise performed in the given videos')
+    parser.add_argument('--manifest', help='CSV with "file" and "exercise" columns')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--model-complexity', type=int, default=1, choices=[0, 1, 2])
+    parser.add_argument('--output', default='batch_results.json', help='Aggregated JSON results file')
+    parser.add_argument('--csv', help='Also write one row per rep for all videos as CSV')
+    args = parser.parse_args()
+
+    if args.inputs and not args.exercise:
+        parser.error("--exercise is required when passing videos directly")
+    jobs = collect_jobs(args.inputs, args.exercise, args.manifest)
+    if not jobs:
+        parser.error("No videos to process")
+
+    started = time.perf_counter()
+    results, failed = run_batch(jobs, args.workers, args.model_complexity)
+    elapsed = time.perf_counter() - started
+
+    video_seconds = sum(result.get('video_seconds', 0) for result in results)
+    summary = {
+        'files': len(results),
+        'failed': failed,
+        'reps': sum(len(result['reps']) for result in results),
+        'video_seconds': round(video_seconds, 3),
+        'processing_seconds': round(elapsed, 3),
+        'speedup': round(video_seconds / elapsed, 2) if elapsed > 0 else None,
+    }
+    with open(args.output, 'w') as f:
+        json.dump({'summary': summary, 'results': results}, f, indent=2)
+    if args.csv:
+        write_csv([result for result in results if 'error' not in result], args.csv)
+
+    print(f"{summary['files']} files ({failed} failed), {summary['reps']} reps, "
+          f"{summary['speedup']}x real-time overall -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+import aifitnesscoach as coach
+from landmark_array import NUM_LANDMARKS, PoseLandmark as L, joint_angles, landmarks_to_array
+from landmark_log import load_recording
+from motion_model import to_landmark_list
+from pipeline import FramePipeline
+from pose_backends import DEFAULT_TASK_MODEL, create_backend
+from roi_tracker import RoiPoseTracker
+from speech import SpeechWorker
+
+
+# Benchmarks for the per-frame hot path. Runs offline: landmarks come from a synthetic random walk
+# (or a recording from aifitnesscoach.py --record), frames from noise (or a video file).
+#
+#   python benchmark.py                      # run everything, save to benchmark_results/
+#   python benchmark.py --only detect        # only benchmarks whose name contains "detect"
+#   python benchmark.py --baseline old.json  # compare against a specific earlier run
+#   python benchmark.py --only pose_stream --task-model pose_landmarker_full.task   # legacy vs Tasks backend
+#   python benchmark.py --only frame_path    # steady-state memory allocated per frame at 1080p
+
+RESULTS_DIR = 'benchmark_results'
+
+
+# Deterministic random walk of plausible normalized landmarks
+def synthetic_landmarks(frames, seed=0):
+    rng = np.random.default_rng(seed)
+    landmarks = np.empty((frames, NUM_LANDMARKS, 4), dtype=np.float32)
+    current = rng.random((NUM_LANDMARKS, 4)).astype(np.float32)
+    for i in range(frames):
+        current = np.clip(current + rng.normal(0, 0.05, current.shape).astype(np.float32), 0, 1)
+        landmarks[i] = current
+    return landmarks
+
+
+# Smooth squats: both knees bend from 175 to 75 degrees and back every `period` seconds.
+# Returns (times, landmarks)
+def synthetic_squats(seconds, fps=30, period=2.5):
+    times = np.arange(round(seconds * fps)) / fps
+    knee_angles = np.radians(125 + 50 * np.cos(2 * np.pi * times / period))
+    landmarks = np.empty((len(times), NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:] = (0.5, 0.5, 0.0, 1.0)
+    for hip, knee, ankle, x in [(L.LEFT_HIP, L.LEFT_KNEE, L.LEFT_ANKLE, 0.45), (L.RIGHT_HIP, L.RIGHT_KNEE, L.RIGHT_ANKLE, 0.55)]:
+        landmarks[:, ankle, :2] = (x, 0.9)
+        landmarks[:, knee, :2] = (x, 0.7)
+        landmarks[:, hip, 0] = x + 0.2 * np.sin(knee_angles)
+        landmarks[:, hip, 1] = 0.7 + 0.2 * np.cos(knee_angles)
+    return times, landmarks
+
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def video_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise IOError("Could not read frames from " + path)
+    return frames
+
+
+# Time each call of fn(i) in nanoseconds
+def time_calls(fn, iterations, warmup=10):
+    for i in range(warmup):
+        fn(i)
+    times = np.empty(iterations, dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        start = clock()
+        fn(i)
+        times[i] = clock() - start
+    return times
+
+
+def summarize(times):
+    micros = times / 1000.0
+    mean = float(micros.mean())
+    return {
+        'calls': len(times),
+        'mean_us': round(mean, 2),
+        'p50_us': round(float(np.percentile(micros, 50)), 2),
+        'p90_us': round(float(np.percentile(micros, 90)), 2),
+        'p99_us': round(float(np.percentile(micros, 99)), 2),
+        'per_second': round(1e6 / mean, 1) if mean > 0 else None,
+    }
+
+
+# Simulated engine that keeps the speech thread busy the way a real utterance would
+class SlowSpeechEngine:
+    def __init__(self, seconds=0.5):
+        self.seconds = seconds
+        self.busy_until = 0.0
+
+    def startLoop(self, use_driver_loop):
+        pass
+
+    def endLoop(self):
+        pass
+
+    def say(self, text):
+        self.busy_until = time.perf_counter() + self.seconds
+
+    def stop(self):
+        self.busy_until = 0.0
+
+    def isBusy(self):
+        return time.perf_counter() < self.busy_until
+
+    def iterate(self):
+        time.sleep(0.005)
+
+
+# Startup as main() does it, in a fresh interpreter: import, start loading the pose model, build the
+# menu screen, then wait for the model and run the first inference. Prints seconds since start.
+STARTUP_PROBE = '''
+import json, time
+started = time.perf_counter()
+import numpy as np
+import aifitnesscoach as coach
+coach.pose_loader.start()
+coach.load_intro_screen()
+menu = time.perf_counter() - started
+pose = coach.pose_loader.get()
+pose.process(np.zeros((480, 640, 3), dtype=np.uint8))
+print(json.dumps({'menu': menu, 'first_inference': time.perf_counter() - started}))
+pose.close()
+'''
+
+
+# Run the startup probe a few times; returns nanosecond timings for time to menu and to first inference
+def startup_times(runs):
+    times = {'menu': [], 'first_inference': []}
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', STARTUP_PROBE], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL, text=True)
+        for name, seconds in json.loads(output.strip().splitlines()[-1]).items():
+            times[name].append(int(seconds * 1e9))
+    return {name: np.array(values, dtype=np.int64) for name, values in times.items()}
+
+
+# Feed frames to a pose backend at a camera-like rate and time each frame from hand-over to result.
+# A synchronous backend skips frames that arrive while it is still busy (as the capture queue does);
+# an asynchronous one is given every frame and drops what it can't keep up with itself.
+# Returns (latencies in ns, {'per_second': results delivered per second, ...}).
+def pose_stream(backend_name, model_path, frames, count, fps):
+    def run():
+        backend = create_backend(backend_name, model_path=model_path)
+        rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+        submitted_at = {}
+        latencies = []
+        skipped = []
+
+        def on_result(results, timestamp):
+            latencies.append(time.perf_counter_ns() - submitted_at.pop(timestamp))
+
+        def on_drop(timestamp):
+            skipped.append(submitted_at.pop(timestamp))
+
+        interval = 1.0 / fps
+        submitted = 0
+        started = time.perf_counter()
+        try:
+            for i in range(count):
+                due = started + i * interval
+                now = time.perf_counter()
+                if now < due:
+                    time.sleep(due - now)
+                elif now - due > interval and not backend.asynchronous:
+                    continue
+                rgb_frame = rgb_frames[i % len(rgb_frames)]
+                timestamp = time.perf_counter()
+                submitted_at[timestamp] = time.perf_counter_ns()
+                submitted += 1
+                if backend.asynchronous:
+                    backend.submit(rgb_frame, timestamp, on_result, on_drop)
+                else:
+                    on_result(backend.process(rgb_frame), timestamp)
+            # Let the last asynchronous results come in
+            deadline = time.perf_counter() + 1.0
+            while backend.asynchronous and len(latencies) + len(skipped) < submitted and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - started
+        finally:
+            backend.close()
+        return np.array(latencies, dtype=np.int64), {
+            'per_second': round(len(latencies) / elapsed, 1),
+            'frames': count,
+            'submitted': submitted,
+            'delivered': len(latencies),
+            'skipped': len(skipped),
+        }
+    return run
+
+
+# Camera stand-in: copies a fixed frame into the caller's buffer like cv2.VideoCapture.read(image)
+class StaticCapture:
+    def __init__(self, frame, fps=60):
+        self.frame = frame
+        self.interval = 1.0 / fps
+
+    def read(self, image=None):
+        time.sleep(self.interval)
+        if image is None or image.shape != self.frame.shape:
+            image = np.empty_like(self.frame)
+        np.copyto(image, self.frame)
+        return True, image
+
+
+class FixedResults:
+    def __init__(self, pose_landmarks):
+        self.pose_landmarks = pose_landmarks
+
+
+# The whole frame path - capture and RGB conversion on the pipeline threads, then drawing,
+# landmark extraction and the squat detector on this one - with a pose stand-in that cycles through
+# prepared results, under tracemalloc. After a warm-up, reports how far traced memory rose above
+# its steady-state level at any point (a fresh frame-sized array shows up here) and how much it
+# grew per frame.
+def frame_path(landmark_lists, frame_count, size=(1080, 1920), warmup=30):
+    def run():
+        frame = np.random.default_rng(0).integers(0, 255, size + (3,), dtype=np.uint8)
+        results = [FixedResults(landmarks) for landmarks in landmark_lists]
+        calls = [0]
+
+        def process(rgb_frame):
+            calls[0] += 1
+            return results[calls[0] % len(results)]
+        landmark_buffer = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        counts, stages = [0], [None]
+        times = np.empty(frame_count, dtype=np.int64)
+        clock = time.perf_counter_ns
+        # Steady state includes a warm text cache: every angle label the detector can draw
+        for angle in range(181):
+            coach.put_text_with_shadow(frame.copy(), str(angle), (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
+        tracemalloc.start()
+        pipeline = FramePipeline(StaticCapture(frame), process).start()
+        try:
+            for i in range(-warmup, frame_count):
+                if i == 0:
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                packet = pipeline.get()
+                start = clock()
+                coach.mp_drawing.draw_landmarks(packet.frame, packet.results.pose_landmarks, coach.mp_pose.POSE_CONNECTIONS)
+                landmarks = landmarks_to_array(packet.results.pose_landmarks, landmark_buffer)
+                coach.run_exercise('squats', landmarks, packet.frame, counts, stages)
+                pipeline.release(packet)
+                if i >= 0:
+                    times[i] = clock() - start
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            pipeline.stop()
+            tracemalloc.stop()
+        return times, {
+            'peak_over_baseline_kb': round((peak - baseline) / 1024, 1),
+            'growth_bytes_per_frame': round((current - baseline) / frame_count, 1),
+            'frame_buffers': pipeline.pool.allocated,
+        }
+    return run
+
+
+def benchmark_suite(landmark_fixture, frames, iterations, pose_iterations, startup_runs=5,
+                    task_model=DEFAULT_TASK_MODEL, stream_frames=150, stream_fps=30):
+    count = len(landmark_fixture)
+    frame = frames[0]
+    benchmarks = {}
+
+    # Cold start, measured once and shared by both entries
+    startup = {}
+
+    def startup_stage(name):
+        def run():
+            if not startup:
+                startup.update(startup_times(startup_runs))
+            return startup[name]
+        return run
+    benchmarks['startup_to_menu'] = startup_stage('menu')
+    benchmarks['startup_to_first_inference'] = startup_stage('first_inference')
+
+    # The drawing and pose stages use mediapipe's modules through aifitnesscoach; import them when
+    # one of those runs (no pose model is built for that, and none for the stages that don't)
+    def needs_mediapipe(run):
+        def wrapped():
+            if coach.mp_pose is None:
+                coach.import_mediapipe()
+            return run()
+        return wrapped
+
+    # Keep the detectors from talking while we time them
+    coach.text_to_speech = lambda text, interrupt=False: None
+
+    a, b, c = landmark_fixture[:, 11, :2], landmark_fixture[:, 13, :2], landmark_fixture[:, 15, :2]
+    benchmarks['calculate_angle'] = lambda: time_calls(lambda i: coach.calculate_angle(a[i % count], b[i % count], c[i % count]), iterations)
+    benchmarks['joint_angles'] = lambda: time_calls(lambda i: joint_angles(landmark_fixture[i % count]), iterations)
+
+    landmark_lists = [to_landmark_list(landmarks) for landmarks in landmark_fixture[:min(count, 256)]]
+    buffer = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    benchmarks['landmarks_to_array'] = lambda: time_calls(lambda i: landmarks_to_array(landmark_lists[i % len(landmark_lists)], buffer), iterations)
+
+    def detector(fn, state):
+        scratch = frame.copy()
+
+        def call(i):
+            state[:] = fn(landmark_fixture[i % count], scratch, *state)
+        return lambda: time_calls(call, iterations)
+
+    benchmarks['detect_pushups'] = detector(coach.detect_pushups, [0, None])
+    benchmarks['detect_squats'] = detector(coach.detect_squats, [0, None])
+    benchmarks['detect_bicep_curls'] = detector(coach.detect_bicep_curls, [0, 0, None, None])
+    benchmarks['detect_lunges'] = detector(coach.detect_lunges, [0, 0, None, None])
+    benchmarks['detect_overhead_dumbbell_press'] = detector(coach.detect_overhead_dumbbell_press, [0, None])
+
+    scratch = frame.copy()
+    benchmarks['put_text_with_shadow'] = lambda: time_calls(
+        lambda i: coach.put_text_with_shadow(scratch, f'Squat Count: {i % 100}', (50, 50), 1, (255, 255, 255), (0, 0, 0), 2), iterations)
+    benchmarks['draw_landmarks'] = needs_mediapipe(lambda: time_calls(
+        lambda i: coach.mp_drawing.draw_landmarks(scratch, landmark_lists[i % len(landmark_lists)], coach.mp_pose.POSE_CONNECTIONS), iterations))
+
+    def pose_process():
+        rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+        pose = coach.mp_pose.Pose()
+        try:
+            return time_calls(lambda i: pose.process(rgb_frames[i % len(rgb_frames)]), pose_iterations, warmup=5)
+        finally:
+            pose.close()
+    benchmarks['pose.process'] = needs_mediapipe(pose_process)
+
+    # Inference on a crop around the user (RoiPoseTracker) vs the full frame, on the same frames in
+    # order. Only meaningful with --video showing a person: in synthetic noise nobody is found, so
+    # every frame goes to the full-frame path.
+    def pose_roi():
+        rgb_frames = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+        pose = create_backend('legacy')
+        try:
+            full = time_calls(lambda i: pose.process(rgb_frames[i % len(rgb_frames)]), pose_iterations, warmup=5)
+            pose.reset()
+            tracker = RoiPoseTracker(pose)
+            roi = time_calls(lambda i: tracker.process(rgb_frames[i % len(rgb_frames)]), pose_iterations, warmup=5)
+        finally:
+            pose.close()
+        return roi, {
+            'speedup': round(float(np.percentile(full, 50) / np.percentile(roi, 50)), 2),
+            'roi_frames': tracker.roi_frames,
+            'full_frames': tracker.full_frames,
+            'crop_moves': tracker.moves,
+        }
+    benchmarks['pose_roi'] = pose_roi
+
+    # Legacy vs Tasks (live-stream) backend under the same camera-rate input
+    benchmarks['pose_stream_legacy'] = pose_stream('legacy', None, frames, stream_frames, stream_fps)
+    if task_model and os.path.exists(task_model):
+        benchmarks['pose_stream_tasks'] = pose_stream('tasks', task_model, frames, stream_frames, stream_fps)
+
+    # Frame loop latency must not change while the speech worker is talking
+    def frame_loop(speaking):
+        def run():
+            worker = SpeechWorker(engine_factory=SlowSpeechEngine)
+            state = [0, None]
+            scratch = frame.copy()
+
+            def call(i):
+                state[:] = coach.detect_squats(landmark_fixture[i % count], scratch, *state)
+                if speaking and i % 10 == 0:
+                    worker.say(f'Rep {i}')
+            try:
+                return time_calls(call, iterations)
+            finally:
+                worker.close()
+        return run
+    benchmarks['frame_loop_silent'] = frame_loop(False)
+    benchmarks['frame_loop_speaking'] = frame_loop(True)
+
+    benchmarks['frame_path_1080p'] = needs_mediapipe(frame_path(landmark_lists, max(pose_iterations * 4, 100)))
+
+    return benchmarks
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def latest_result(directory, exclude=None):
+    paths = sorted(glob.glob(os.path.join(directory, '*.json')), key=os.path.getmtime)
+    paths = [path for path in paths if path != exclude]
+    return paths[-1] if paths else None
+
+
+def print_report(results, baseline=None):
+    print(f"{'benchmark':34} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'per sec':>12} {'vs base':>9}")
+    for name, stats in results.items():
+        change = ''
+        if baseline and name in baseline:
+            before = baseline[name]['p50_us']
+            if before:
+                change = f"{(stats['p50_us'] - before) / before * 100:+.1f}%"
+        print(f"{name:34} {stats['p50_us']:10.2f} {stats['p90_us']:10.2f} {stats['p99_us']:10.2f} {stats['per_second']:12.1f} {change:>9}")
+        if 'peak_over_baseline_kb' in stats:
+            print(f"{'':34} traced memory: peak {stats['peak_over_baseline_kb']} KB over steady state, "
+                  f"{stats['growth_bytes_per_frame']} B/frame growth, {stats['frame_buffers']} frame buffers")
+        if 'speedup' in stats:
+            print(f"{'':34} {stats['speedup']}x full-frame p50; {stats['roi_frames']} cropped, "
+                  f"{stats['full_frames']} full frames, crop moved {stats['crop_moves']} times")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the per-frame hot path.')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--pose-iterations', type=int, default=50)
+    parser.add_argument('--startup-runs', type=int, default=5)
+    parser.add_argument('--task-model', default=DEFAULT_TASK_MODEL, help='PoseLandmarker .task model; the Tasks backend is benchmarked if it exists')
+    parser.add_argument('--stream-frames', type=int, default=150, help='Frames fed to each backend in the pose_stream benchmarks')
+    parser.add_argument('--stream-fps', type=float, default=30, help='Rate the pose_stream benchmarks feed frames at')
+    parser.add_argument('--only', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--recording', help='Landmark recording to use instead of synthetic landmarks')
+    parser.add_argument('--video', help='Video to take frames from instead of synthetic noise')
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    parser.add_argument('--baseline', help='Earlier results file to compare against (default: latest in output dir)')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    if args.recording:
+        _, records = load_recording(args.recording)
+        landmark_fixture = np.asarray(records['landmarks'], dtype=np.float32)
+        landmark_fixture = landmark_fixture[~np.isnan(landmark_fixture[:, 0, 0])]
+    else:
+        landmark_fixture = synthetic_landmarks(4096)
+    frames = video_frames(args.video, 30) if args.video else synthetic_frames(4)
+
+    results = {}
+    suite = benchmark_suite(landmark_fixture, frames, args.iterations, args.pose_iterations, args.startup_runs,
+                            args.task_model, args.stream_frames, args.stream_fps)
+    for name, run in suite.items():
+        if args.only and args.only not in name:
+            continue
+        times = run()
+        extra = {}
+        if isinstance(times, tuple):
+            times, extra = times
+        results[name] = summarize(times)
+        results[name].update(extra)
+
+    baseline_path = args.baseline or latest_result(args.output_dir)
+    baseline = None
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)['results']
+        print(f"Comparing against {baseline_path}")
+    print_report(results, baseline)
+
+    if not args.no_save:
+        os.makedirs(args.output_dir, exist_ok=True)
+        revision = git_revision()
+        path = os.path.join(args.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+        with open(path, 'w') as f:
+            json.dump({
+                'revision': revision,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'iterations': args.iterations,
+                'results': results,
+            }, f, indent=2)
+        print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from event_stream import EventStreamServer
+
+
+# Measures event delivery latency of the streaming service (event_stream.py).
+#
+#   python event_latency.py                                  # self-test: in-process server, synthetic events
+#   python event_latency.py --url http://127.0.0.1:8765/events   # watch a running aifitnesscoach.py --stream-port 8765
+#
+# The self-test also connects a deliberately slow client to check that it only loses its own
+# events and that publish() stays fast while it lags.
+
+
+# Read Server-Sent Events from url; calls on_event(event, received_at) for each one
+def read_events(url, on_event, stop, delay=0.0):
+    with urllib.request.urlopen(url) as response:
+        data = None
+        for line in response:
+            if stop.is_set():
+                break
+            line = line.rstrip(b'\r\n')
+            if line.startswith(b'data: '):
+                data = line[6:]
+            elif not line and data is not None:
+                on_event(json.loads(data), time.time())
+                data = None
+                if delay:
+                    time.sleep(delay)
+
+
+class LatencyClient:
+    def __init__(self, url, delay=0.0):
+        self.url = url
+        self.delay = delay
+        self.latencies = []
+        self.sequences = []
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            read_events(self.url, self._on_event, self.stop, self.delay)
+        except OSError:
+            pass
+
+    def _on_event(self, event, received_at):
+        if event['type'] == 'benchmark':
+            self.latencies.append(received_at - event['sent_at'])
+            self.sequences.append(event['index'])
+
+
+def percentiles(seconds):
+    millis = np.array(seconds) * 1000.0
+    if len(millis) == 0:
+        return 'no events'
+    return f"p50 {np.percentile(millis, 50):.3f} ms, p95 {np.percentile(millis, 95):.3f} ms, max {millis.max():.3f} ms"
+
+
+def self_test(clients, events, rate, slow_delay):
+    stream = EventStreamServer(port=0, max_pending=32).start()
+    readers = [LatencyClient(stream.url()) for _ in range(clients)]
+    slow = LatencyClient(stream.url(), delay=slow_delay)
+    for reader in readers + [slow]:
+        reader.thread.start()
+    while stream.stats()['clients'] < len(readers) + 1:
+        time.sleep(0.01)
+
+    # Publish the way the frame loop would: at a fixed rate, timing each call
+    publish_times = []
+    interval = 1.0 / rate
+    next_event = time.perf_counter()
+    for i in range(events):
+        started = time.perf_counter()
+        stream.publish('benchmark', index=i)
+        publish_times.append(time.perf_counter() - started)
+        next_event += interval
+        time.sleep(max(0.0, next_event - time.perf_counter()))
+    time.sleep(0.5)
+
+    stats = stream.stats()
+    stream.close()
+    for i, reader in enumerate(readers):
+        print(f"client {i + 1}: {len(reader.latencies)}/{events} events, {percentiles(reader.latencies)}")
+    print(f"slow client ({slow_delay * 1000:.0f} ms per event): {len(slow.latencies)}/{events} events received, "
+          f"{stats['dropped']} dropped, {stats['timeouts']} timed out, {percentiles(slow.latencies)}")
+    print(f"publish(): {percentiles(publish_times)}")
+
+
+def watch(url):
+    latencies = []
+
+    def on_event(event, received_at):
+        latency = received_at - event['sent_at']
+        latencies.append(latency)
+        fields = {k: v for k, v in event.items() if k not in ('type', 'seq', 'sent_at')}
+        print(f"{event['type']:>9} {latency * 1000:7.2f} ms  {fields}")
+
+    try:
+        read_events(url, on_event, threading.Event())
+    except KeyboardInterrupt:
+        pass
+    print(f"{len(latencies)} events, {percentiles(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure event delivery latency of the streaming service.')
+    parser.add_argument('--url', help='Events URL of a running coach (default: run a self-test)')
+    parser.add_argument('--clients', type=int, default=3)
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=200.0, help='Events per second in the self-test')
+    parser.add_argument('--slow-delay', type=float, default=0.05, help='Seconds the slow client spends on each event')
+    args = parser.parse_args()
+
+    if args.url:
+        watch(args.url)
+    else:
+        self_test(args.clients, args.events, args.rate, args.slow_delay)
+
+
+if __name__ == "__main__":
+    main()
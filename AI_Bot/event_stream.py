@@ -0,0 +1,235 @@
+import collections
+import http.server
+import json
+import socket
+import threading
+import time
+
+
+# Local push service for the companion app: rep events, stage changes and feedback are streamed to
+# every connected client as Server-Sent Events (GET /events) the moment they happen. GET /state
+# returns the latest event of each kind as JSON.
+#
+# publish() never waits on the network: every client has its own small queue that drops the oldest
+# event when full, and its own handler thread does the socket writes, so a slow or stalled client
+# only loses events itself and never holds up the frame loop. A write that the client doesn't take
+# within `send_timeout` means it has stalled: the events in that write count as dropped too, and the
+# client is disconnected (SSE clients reconnect, and start again from the latest state). Events
+# already taken into the client machine's own receive buffer count as sent: the server can't see
+# whether the app has read them.
+
+
+# One connected client's pending events
+class EventClient:
+    def __init__(self, max_pending):
+        self.pending = collections.deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.sent = 0
+        self.closed = False
+
+    def push(self, payload):
+        with self.condition:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(payload)
+            self.condition.notify()
+
+    # Wait for events; returns [] on timeout and None once closed
+    def take(self, timeout):
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+            if self.closed:
+                return None
+            payloads = list(self.pending)
+            self.pending.clear()
+            return payloads
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class EventStreamHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/events':
+            self._stream_events()
+        elif path == '/state':
+            body = json.dumps(self.server.stream.state()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def _stream_events(self):
+        stream = self.server.stream
+        # No Nagle delay, and a small send buffer so a lagging client backs up into its own
+        # (bounded, drop-oldest) queue rather than into megabytes of stale kernel buffers
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 8192)
+        self.connection.settimeout(stream.send_timeout)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        client = stream.connect()
+        payloads = []
+        timed_out = False
+        try:
+            while True:
+                payloads = client.take(stream.keepalive)
+                if payloads is None:
+                    break
+                # Comment lines keep idle connections (and proxies) from timing out
+                self.wfile.write(b''.join(payloads) if payloads else b': keepalive\n\n')
+                self.wfile.flush()
+                client.sent += len(payloads)
+        except socket.timeout:
+            # Part of this write may have gone out, so the stream can't be resumed
+            client.dropped += len(payloads)
+            timed_out = True
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+        finally:
+            stream.disconnect(client, timed_out)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EventStreamServer:
+    def __init__(self, host='127.0.0.1', port=8765, max_pending=64, keepalive=15.0, send_timeout=2.0):
+        self.address = (host, port)
+        self.max_pending = max_pending
+        self.keepalive = keepalive
+        self.send_timeout = send_timeout
+        self.clients = []
+        self.disconnected_dropped = 0
+        self.timeouts = 0
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.sequence = 0
+        self.httpd = None
+        self.thread = None
+
+    def start(self):
+        self.httpd = http.server.ThreadingHTTPServer(self.address, EventStreamHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stream = self
+        self.address = self.httpd.server_address
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='event-stream', daemon=True)
+        self.thread.start()
+        return self
+
+    def url(self):
+        return f'http://{self.address[0]}:{self.address[1]}/events'
+
+    def close(self):
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.close()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    # New clients first get the latest event of each kind, so they start from the current state
+    def connect(self):
+        client = EventClient(self.max_pending)
+        with self.lock:
+            for payload in self.latest.values():
+                client.push(payload[1])
+            self.clients.append(client)
+        return client
+
+    def disconnect(self, client, timed_out=False):
+        client.close()
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+                self.disconnected_dropped += client.dropped
+                self.timeouts += timed_out
+
+    # Queue an event for every client; `key` names the state it replaces (defaults to the type)
+    def publish(self, event_type, key=None, **fields):
+        with self.lock:
+            self.sequence += 1
+            event = dict(fields, type=event_type, seq=self.sequence, sent_at=time.time())
+            payload = f"id: {self.sequence}\nevent: {event_type}\ndata: {json.dumps(event)}\n\n".encode()
+            self.latest[key or event_type] = (event, payload)
+            for client in self.clients:
+                client.push(payload)
+        return event
+
+    def state(self):
+        with self.lock:
+            return [event for event, _ in self.latest.values()]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'clients': len(self.clients),
+                'events': self.sequence,
+                'dropped': self.disconnected_dropped + sum(client.dropped for client in self.clients),
+                'timeouts': self.timeouts,
+            }
+
+
+# Turns per-frame exercise updates into events: reps and stage changes as they happen, feedback
+# only when the set of active messages changes (the rules fire on every frame they hold).
+# Counts are per session: start() takes the caller's running totals, which carry on when the user
+# comes back to an exercise, and events report what the announced session has added to them.
+class ExerciseEventPublisher:
+    def __init__(self, stream):
+        self.stream = stream
+        self.exercise = None
+        self.baseline = []
+        self.counts = []
+        self.feedback = None
+
+    def start(self, exercise, counts=None):
+        self.exercise = exercise
+        self.baseline = list(counts) if counts is not None else [0] * len(exercise.counters)
+        self.counts = [0] * len(exercise.counters)
+        self.feedback = None
+        self._publish_session('started')
+
+    def finish(self):
+        if self.exercise is not None:
+            self._publish_session('finished')
+
+    def _publish_session(self, state):
+        self.stream.publish('session', exercise=self.exercise.name, state=state,
+                            counters=[counter['label'] for counter in self.exercise.counters], counts=list(self.counts))
+
+    def update(self, exercise, update, counts, previous_stages, stages):
+        self.counts[:] = [count - start for count, start in zip(counts, self.baseline)]
+        for i, (before, after) in enumerate(zip(previous_stages, stages)):
+            if before != after:
+                label = exercise.counters[i]['label']
+                self.stream.publish('stage', key=f'stage:{label}', exercise=exercise.name, counter=label, stage=after)
+        for i in update.reps:
+            label = exercise.counters[i]['label']
+            self.stream.publish('rep', key=f'rep:{label}', exercise=exercise.name, counter=label, count=self.counts[i])
+        # A rep's metrics follow once its cycle is complete (see rep_analytics.py)
+        for rep in update.metrics:
+            self.stream.publish('rep_metrics', key=f'rep_metrics:{rep.label}', exercise=exercise.name, counter=rep.label,
+                                count=self.counts[rep.counter], metrics=rep.as_dict())
+
+        feedback = sorted(rule['message'] for rule in update.messages)
+        if feedback != self.feedback:
+            self.feedback = feedback
+            self.stream.publish('feedback', exercise=exercise.name, messages=feedback)
@@ -0,0 +1,356 @@
+import re
+
+import numpy as np
+
+from landmark_array import PoseLandmark, NUM_LANDMARKS, ANGLE_INDEX, joint_angles
+from rep_analytics import RepAnalytics
+
+
+# Exercises declared as data.
+#
+# Every condition is a tuple (expression, op, threshold). An expression is a joint angle name from
+# landmark_array.JOINT_ANGLES ('left_knee'), a landmark coordinate ('LEFT_WRIST.y'), or a weighted
+# sum of those, optionally wrapped in abs(): 'abs(LEFT_KNEE.x - LEFT_ANKLE.x)',
+# 'LEFT_WRIST.y - 0.5*LEFT_SHOULDER.y - 0.5*RIGHT_SHOULDER.y'.
+#
+# A rule is {'all': [conditions]}, {'any': [conditions]} or {'clauses': [[...], [...]]}
+# (all clauses must hold, each clause holds if any of its conditions does).
+#
+# Counters are small state machines: when 'reset' holds the stage becomes 'reset_stage'; otherwise
+# when 'trigger' holds and the stage is 'trigger_from' the stage becomes 'trigger_stage' and a rep
+# is counted. An optional 'gate' must hold for either to happen (the stage is cleared when it doesn't).
+#
+# For per-rep analytics (rep_analytics.py) a counter names the joint angle(s) it 'track's and whether
+# the angle is 'increasing' or 'decreasing' in the 'concentric' (lifting) phase; 'asymmetry' pairs
+# the left and right counters of one-sided exercises.
+EXERCISES = {
+    'pushups': {
+        'display_angles': ['left_elbow', 'right_elbow'],
+        'counters': [
+            {
+                'label': 'Pushup Count', 'position': (50, 50),
+                'reset': {'all': [('left_elbow', '>', 160), ('right_elbow', '>', 160)]}, 'reset_stage': 'up',
+                'trigger': {'all': [('left_elbow', '<', 90), ('right_elbow', '<', 90)]}, 'trigger_from': 'up', 'trigger_stage': 'down',
+                'track': ['left_elbow', 'right_elbow'], 'concentric': 'increasing',
+                'rep_message': {'text': 'Good pushup!', 'position': (50, 150), 'color': (0, 255, 0)},
+            },
+        ],
+        'form_rules': [
+            # Only shown on frames where no counter changed stage
+            {'any': [('left_elbow', '>', 90), ('right_elbow', '>', 90)],
+             'when': 'idle', 'message': 'Go lower!', 'position': (50, 150)},
+            {'all': [('left_elbow', '<', 90), ('right_elbow', '<', 90),
+                     ('LEFT_SHOULDER.y - LEFT_WRIST.y', '>', 0), ('RIGHT_SHOULDER.y - RIGHT_WRIST.y', '>', 0)],
+             'when': 'idle', 'message': 'Keep your back straight!', 'position': (50, 200)},
+        ],
+    },
+    'squats': {
+        'display_angles': ['left_knee', 'right_knee'],
+        'counters': [
+            {
+                'label': 'Squat Count', 'position': (50, 50),
+                'reset': {'all': [('left_knee', '>', 130), ('right_knee', '>', 130)]}, 'reset_stage': 'up',
+                'trigger': {'all': [('left_knee', '<', 110), ('right_knee', '<', 110)]}, 'trigger_from': 'up', 'trigger_stage': 'down',
+                'track': ['left_knee', 'right_knee'], 'concentric': 'increasing',
+                'speech': 'Good squat!',
+            },
+        ],
+        'form_rules': [
+            # Knee Alignment: Ensure knees track over toes
+            {'any': [('abs(LEFT_KNEE.x - LEFT_ANKLE.x)', '>', 0.1), ('abs(RIGHT_KNEE.x - RIGHT_ANKLE.x)', '>', 0.1)],
+             'message': 'Align knees with toes!', 'position': (50, 200)},
+            # Depth: Ensure proper squat depth
+            {'any': [('left_knee', '>', 120), ('right_knee', '>', 120)],
+             'message': 'Go lower for a full squat!', 'position': (50, 250)},
+            # Back Position: Avoid leaning forward excessively
+            {'any': [('LEFT_HIP.y - LEFT_KNEE.y', '>', 0), ('RIGHT_HIP.y - RIGHT_KNEE.y', '>', 0)],
+             'message': 'Keep your back straight!', 'position': (50, 300)},
+        ],
+    },
+    'bicep curl': {
+        'display_angles': ['left_elbow', 'right_elbow'],
+        'counters': [
+            {
+                'label': 'Left Curl Count', 'position': (50, 50),
+                'reset': {'all': [('left_elbow', '>', 160)]}, 'reset_stage': 'down',
+                'trigger': {'all': [('left_elbow', '<', 50)]}, 'trigger_from': 'down', 'trigger_stage': 'up',
+                'track': 'left_elbow', 'concentric': 'decreasing',
+            },
+            {
+                'label': 'Right Curl Count', 'position': (50, 100),
+                'reset': {'all': [('right_elbow', '>', 160)]}, 'reset_stage': 'down',
+                'trigger': {'all': [('right_elbow', '<', 50)]}, 'trigger_from': 'down', 'trigger_stage': 'up',
+                'track': 'right_elbow', 'concentric': 'decreasing',
+                # Don't count the right arm when both arms curl together
+                'skip_if_stage': (0, 'up'),
+            },
+        ],
+        'asymmetry': (0, 1),
+        'form_rules': [
+            # Elbow Position: Ensure elbows stay close to the torso
+            {'any': [('LEFT_ELBOW.x - LEFT_SHOULDER.x', '>', 0.1), ('RIGHT_ELBOW.x - RIGHT_SHOULDER.x', '>', 0.1)],
+             'message': 'Keep your elbows close to your body!', 'position': (50, 150)},
+            # Back Stability: Avoid swinging the torso
+            {'any': [('abs(LEFT_SHOULDER.x - LEFT_HIP.x)', '>', 0.1), ('abs(RIGHT_SHOULDER.x - RIGHT_HIP.x)', '>', 0.1)],
+             'message': 'Avoid swinging; keep your back straight!', 'position': (50, 200)},
+            # Full Range of Motion: Ensure arm is fully extended at the bottom
+            {'all': [('left_elbow', '>', 160), ('right_elbow', '>', 160)],
+             'message': 'Lower your arm fully between reps!', 'position': (50, 250)},
+            # Wrist Position: Ensure wrists stay straight
+            {'any': [('abs(LEFT_WRIST.x - LEFT_ELBOW.x)', '>', 0.05), ('abs(RIGHT_WRIST.x - RIGHT_ELBOW.x)', '>', 0.05)],
+             'message': 'Keep your wrists straight!', 'position': (50, 350)},
+        ],
+    },
+    'lunges': {
+        'display_angles': ['left_knee', 'right_knee'],
+        'counters': [
+            {
+                'label': 'Left Lunge Count', 'position': (50, 100),
+                'reset': {'all': [('right_knee', '>', 160), ('left_knee', '<', 110)]}, 'reset_stage': 'down',
+                'trigger': {'all': [('left_knee', '>', 160), ('right_knee', '>', 160)]}, 'trigger_from': 'down', 'trigger_stage': None,
+                'track': 'left_knee', 'concentric': 'increasing',
+                'speech': 'Good left lunge!',
+            },
+            {
+                'label': 'Right Lunge Count', 'position': (50, 50),
+                'reset': {'all': [('left_knee', '>', 160), ('right_knee', '<', 110)]}, 'reset_stage': 'down',
+                'trigger': {'all': [('left_knee', '>', 160), ('right_knee', '>', 160)]}, 'trigger_from': 'down', 'trigger_stage': None,
+                'track': 'right_knee', 'concentric': 'increasing',
+                'speech': 'Good right lunge!',
+            },
+        ],
+        'asymmetry': (0, 1),
+        'form_rules': [
+            # Knee Position
+            {'any': [('LEFT_KNEE.x - LEFT_ANKLE.x', '>', 0.05), ('RIGHT_KNEE.x - RIGHT_ANKLE.x', '>', 0.05)],
+             'message': 'Avoid letting your knee go past your toes!', 'position': (50, 200)},
+            # Back Leg Form
+            {'any': [('left_knee', '<', 70), ('right_knee', '<', 70)],
+             'message': 'Lower your back knee toward the ground!', 'position': (50, 250)},
+            # Torso Stability
+            {'any': [('abs(LEFT_HIP.x - LEFT_KNEE.x)', '>', 0.1), ('abs(RIGHT_HIP.x - RIGHT_KNEE.x)', '>', 0.1)],
+             'message': 'Keep your torso upright; avoid leaning forward!', 'position': (50, 300)},
+        ],
+    },
+    'overhead dumbbell press': {
+        'display_angles': ['left_elbow', 'right_elbow'],
+        'counters': [
+            {
+                'label': 'Press Count', 'position': (50, 50),
+                # Only count while the wrists are overhead
+                'gate': {'all': [('LEFT_WRIST.y - LEFT_SHOULDER.y', '<', 0), ('RIGHT_WRIST.y - RIGHT_SHOULDER.y', '<', 0)]},
+                'reset': {'all': [('left_elbow', '>', 160), ('right_elbow', '>', 160)]}, 'reset_stage': 'up',
+                'trigger': {'all': [('left_elbow', '<', 100), ('right_elbow', '<', 100)]}, 'trigger_from': 'up', 'trigger_stage': 'down',
+                'track': ['left_elbow', 'right_elbow'], 'concentric': 'increasing',
+                'speech': 'Good overhead press!',
+            },
+        ],
+        'form_rules': [
+            # Wrist Alignment: Wrists must be straight
+            {'any': [('abs(LEFT_WRIST.x - LEFT_ELBOW.x)', '>', 0.1), ('abs(RIGHT_WRIST.x - RIGHT_ELBOW.x)', '>', 0.1)],
+             'message': 'Keep your wrists straight!', 'position': (50, 150)},
+            # Don't Drop Arms: Only if arms are below halfway
+            {'all': [('LEFT_WRIST.y - 0.5*LEFT_SHOULDER.y - 0.5*RIGHT_SHOULDER.y', '>', 0),
+                     ('RIGHT_WRIST.y - 0.5*LEFT_SHOULDER.y - 0.5*RIGHT_SHOULDER.y', '>', 0)],
+             'message': "Don't drop your arms!", 'position': (50, 200)},
+            # Fully Extend Arms: Only if arms are halfway up or above
+            {'clauses': [[('LEFT_WRIST.y - 0.5*LEFT_SHOULDER.y - 0.5*RIGHT_SHOULDER.y', '<=', 0),
+                          ('RIGHT_WRIST.y - 0.5*LEFT_SHOULDER.y - 0.5*RIGHT_SHOULDER.y', '<=', 0)],
+                         [('left_elbow', '<', 160), ('right_elbow', '<', 160)]],
+             'message': 'Fully extend your arms!', 'position': (50, 250)},
+            # Back Posture: Avoid leaning backward
+            {'any': [('abs(LEFT_HIP.x - LEFT_SHOULDER.x)', '>', 0.1), ('abs(RIGHT_HIP.x - RIGHT_SHOULDER.x)', '>', 0.1)],
+             'message': 'Maintain a straight back!', 'position': (50, 300)},
+        ],
+    },
+}
+
+
+AXES = {'x': 0, 'y': 1, 'z': 2, 'visibility': 3}
+NUM_FEATURES = NUM_LANDMARKS * 4 + len(ANGLE_INDEX)
+
+_TERM = re.compile(r'\s*([+-])?\s*(?:(\d+(?:\.\d*)?|\.\d+)\s*\*\s*)?([A-Za-z_]+)(?:\.(\w+))?\s*')
+
+
+# Turn an expression string into a weight vector over [flattened landmarks, joint angles]
+def parse_expression(expression):
+    expression = expression.strip()
+    use_abs = expression.startswith('abs(') and expression.endswith(')')
+    if use_abs:
+        expression = expression[4:-1]
+
+    weights = np.zeros(NUM_FEATURES)
+    pos = 0
+    while pos < len(expression):
+        match = _TERM.match(expression, pos)
+        if match is None or match.end() == pos:
+            raise ValueError("Could not parse expression: " + expression)
+        sign, coefficient, name, axis = match.groups()
+        if pos > 0 and sign is None:
+            raise ValueError("Missing operator in expression: " + expression)
+        weight = float(coefficient) if coefficient else 1.0
+        if sign == '-':
+            weight = -weight
+
+        if axis is not None:
+            if name not in PoseLandmark.__members__ or axis not in AXES:
+                raise ValueError("Unknown landmark coordinate: " + name + "." + axis)
+            weights[PoseLandmark[name] * 4 + AXES[axis]] += weight
+        elif name in ANGLE_INDEX:
+            weights[NUM_LANDMARKS * 4 + ANGLE_INDEX[name]] += weight
+        else:
+            raise ValueError("Unknown joint angle: " + name)
+        pos = match.end()
+
+    return weights, use_abs
+
+
+# Convert a rule declaration into a list of clauses (lists of conditions)
+def rule_clauses(rule):
+    if 'all' in rule:
+        return [[condition] for condition in rule['all']]
+    if 'any' in rule:
+        return [list(rule['any'])]
+    if 'clauses' in rule:
+        return [list(clause) for clause in rule['clauses']]
+    raise ValueError("Rule needs 'all', 'any' or 'clauses': " + str(rule))
+
+
+# Result of one frame of an exercise
+class ExerciseUpdate:
+    def __init__(self, angles, reps, messages, fired):
+        self.angles = angles
+        self.reps = reps
+        self.messages = messages
+        self.fired = fired
+        self.metrics = []  # rep_analytics.RepMetrics for the reps completed this frame, when tracked
+
+
+# An exercise compiled into a weight matrix so that every condition of every rule is one row:
+# a frame is evaluated with a mat-vec, a comparison and two reduceat calls
+class CompiledExercise:
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self.display_angles = [ANGLE_INDEX[angle] for angle in spec.get('display_angles', [])]
+        self.counters = spec['counters']
+        self.form_rules = spec.get('form_rules', [])
+
+        rules = []
+        self.counter_rules = []
+        for counter in self.counters:
+            indices = {}
+            for key in ('gate', 'reset', 'trigger'):
+                if key in counter:
+                    indices[key] = len(rules)
+                    rules.append(counter[key])
+            self.counter_rules.append(indices)
+        self.form_rule_offset = len(rules)
+        rules.extend(self.form_rules)
+
+        # Deduplicate conditions so shared ones are only evaluated once
+        conditions = {}
+        clause_conditions = []
+        clause_starts = []
+        rule_starts = []
+        for rule in rules:
+            rule_starts.append(len(clause_starts))
+            for clause in rule_clauses(rule):
+                clause_starts.append(len(clause_conditions))
+                for condition in clause:
+                    clause_conditions.append(conditions.setdefault(tuple(condition), len(conditions)))
+
+        self.weights = np.zeros((len(conditions), NUM_FEATURES))
+        self.use_abs = np.zeros(len(conditions), dtype=bool)
+        self.thresholds = np.zeros(len(conditions))
+        self.signs = np.zeros(len(conditions))
+        self.strict = np.zeros(len(conditions), dtype=bool)
+        for (expression, op, threshold), i in conditions.items():
+            if op not in ('>', '>=', '<', '<='):
+                raise ValueError("Unknown comparison: " + op)
+            self.weights[i], self.use_abs[i] = parse_expression(expression)
+            self.thresholds[i] = threshold
+            self.signs[i] = 1.0 if op[0] == '>' else -1.0
+            self.strict[i] = len(op) == 1
+
+        self.clause_conditions = np.array(clause_conditions, dtype=np.intp)
+        self.clause_starts = np.array(clause_starts, dtype=np.intp)
+        self.rule_starts = np.array(rule_starts, dtype=np.intp)
+        self.features = np.empty(NUM_FEATURES)
+        # Most exercises have no abs() conditions and use one kind of comparison: skip the selects then
+        self.any_abs = bool(self.use_abs.any())
+        self.all_strict = bool(self.strict.all())
+        self.any_strict = bool(self.strict.any())
+
+    # Which rules hold for this frame, as a boolean array (counter rules first, then form rules)
+    def evaluate(self, landmarks, angles):
+        features = self.features
+        features[:NUM_LANDMARKS * 4] = landmarks.reshape(-1)
+        features[NUM_LANDMARKS * 4:] = angles
+        values = self.weights @ features
+        if self.any_abs:
+            values = np.where(self.use_abs, np.abs(values), values)
+        margin = (values - self.thresholds) * self.signs
+        if self.all_strict:
+            holds = margin > 0
+        elif not self.any_strict:
+            holds = margin >= 0
+        else:
+            holds = np.where(self.strict, margin > 0, margin >= 0)
+        clauses = np.logical_or.reduceat(holds[self.clause_conditions], self.clause_starts)
+        return np.logical_and.reduceat(clauses, self.rule_starts)
+
+    # Advance the counters (counts and stages are lists, one entry per counter, updated in place)
+    def update(self, landmarks, counts, stages, angles=None):
+        if angles is None:
+            angles = joint_angles(landmarks)
+        fired = self.evaluate(landmarks, angles)
+
+        reps = []
+        idle = True
+        for i, (counter, rules) in enumerate(zip(self.counters, self.counter_rules)):
+            if 'gate' in rules and not fired[rules['gate']]:
+                # Reset stage if the gate doesn't hold to avoid incorrect counting
+                stages[i] = None
+            elif fired[rules['reset']]:
+                stages[i] = counter['reset_stage']
+                idle = False
+            elif fired[rules['trigger']] and stages[i] == counter['trigger_from']:
+                stages[i] = counter['trigger_stage']
+                idle = False
+                skip = counter.get('skip_if_stage')
+                if skip is None or stages[skip[0]] != skip[1]:
+                    counts[i] += 1
+                    reps.append(i)
+
+        messages = []
+        for j, rule in enumerate(self.form_rules):
+            if fired[self.form_rule_offset + j] and (idle or rule.get('when') != 'idle'):
+                messages.append(rule)
+
+        return ExerciseUpdate(angles, reps, messages, fired)
+
+
+COMPILED_EXERCISES = {name: CompiledExercise(name, spec) for name, spec in EXERCISES.items()}
+
+
+# Counts, stages and per-rep analytics for one person doing one exercise
+class ExerciseSession:
+    def __init__(self, name):
+        if name not in COMPILED_EXERCISES:
+            raise ValueError("Unknown exercise: " + name)
+        self.name = name
+        self.exercise = COMPILED_EXERCISES[name]
+        self.counts = [0] * len(self.exercise.counters)
+        self.stages = [None] * len(self.exercise.counters)
+        self.analytics = RepAnalytics(self.exercise)
+
+    # timestamp (seconds) drives the tempo metrics; without it only the counters advance
+    def update(self, landmarks, angles=None, timestamp=None):
+        update = self.exercise.update(landmarks, self.counts, self.stages, angles)
+        if timestamp is not None:
+            update.metrics = self.analytics.update(update.angles, timestamp, self.stages, update.reps)
+        return update
+
+    def labels(self):
+        return [counter['label'] for counter in self.exercise.counters]
@@ -0,0 +1,145 @@
+import time
+
+
+# Feedback from the detectors goes through a bus instead of straight to the screen and the voice.
+# Detectors emit() typed events every frame a cue applies; once per frame flush() coalesces
+# duplicates and hands the survivors, highest priority first, to the sinks. The sinks decide what
+# to do with them: the screen holds messages briefly so they don't flicker, the voice applies
+# per-cue cooldowns and lets rep counts cut off form nags.
+
+# Higher wins. 'rep' is a completed repetition, 'count' a running count that is only worth saying
+# when it changes, 'form' a technique correction.
+PRIORITIES = {'rep': 3, 'count': 2, 'form': 1}
+
+# Seconds before the voice may repeat the same cue; None means only when the text changes
+COOLDOWNS = {'rep': 0.0, 'count': None, 'form': 5.0}
+
+
+class FeedbackEvent:
+    def __init__(self, kind, text, position=None, color=None, show=True, speak=False, key=None):
+        self.kind = kind
+        self.text = text
+        self.position = position
+        self.color = color
+        self.show = show
+        self.speak = speak
+        self.key = key or (kind, text)
+        self.priority = PRIORITIES.get(kind, 0)
+
+
+class FeedbackBus:
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self.pending = {}
+        self.emitted = 0
+        self.coalesced = 0
+
+    def emit(self, kind, text, position=None, color=None, show=True, speak=False, key=None):
+        event = FeedbackEvent(kind, text, position, color, show, speak, key)
+        self.emitted += 1
+        if event.key in self.pending:
+            self.coalesced += 1
+        self.pending[event.key] = event
+
+    # Deliver this frame's events to every sink (and let them draw onto frame)
+    def flush(self, frame=None, now=None):
+        now = time.perf_counter() if now is None else now
+        events = sorted(self.pending.values(), key=lambda event: -event.priority)
+        self.pending.clear()
+        for sink in self.sinks:
+            sink.deliver(events, now)
+            if frame is not None:
+                sink.draw(frame, now)
+
+    def stats(self):
+        stats = {'emitted': self.emitted, 'coalesced': self.coalesced}
+        for sink in self.sinks:
+            stats.update(sink.stats())
+        return stats
+
+
+# Draws shown events, keeping each one up for `hold` seconds after it was last emitted. Messages
+# that are up at the same time never share a line: the highest priority one keeps its position
+# and the others move down, `line_height` pixels at a time, to the next free line (e.g. "Go lower!"
+# held over the rep that "Good pushup!" announces at the same spot).
+class ScreenSink:
+    def __init__(self, draw_text, hold=0.5, default_color=(0, 0, 255), line_height=50):
+        self.draw_text = draw_text
+        self.hold = hold
+        self.default_color = default_color
+        self.line_height = line_height
+        self.visible = {}
+        self.shown = 0
+
+    def deliver(self, events, now):
+        for event in events:
+            if event.show and event.position is not None:
+                if event.key not in self.visible:
+                    self.shown += 1
+                self.visible[event.key] = (event, now + self.hold)
+
+    def draw(self, frame, now):
+        expired = [key for key, (_, until) in self.visible.items() if until < now]
+        for key in expired:
+            del self.visible[key]
+        taken = set()
+        for event, _ in sorted(self.visible.values(), key=lambda item: -item[0].priority):
+            x, y = event.position
+            while (x, y) in taken:
+                y += self.line_height
+            taken.add((x, y))
+            self.draw_text(frame, event.text, (x, y), event.color or self.default_color)
+
+    def stats(self):
+        return {'shown': self.shown}
+
+
+# Speaks spoken events through speak(text, interrupt). Per-cue cooldowns (COOLDOWNS by kind,
+# `cooldowns` by text), one phrase per flush, and lower-priority cues are held back for
+# `min_gap` seconds after a higher-priority one so they don't talk over it; a higher-priority
+# cue interrupts a lower-priority one.
+class AudioSink:
+    def __init__(self, speak, cooldowns=None, min_gap=1.5):
+        self.speak = speak
+        self.cooldowns = cooldowns or {}
+        self.min_gap = min_gap
+        self.last_spoken = {}
+        self.last_text = {}
+        self.last_priority = 0
+        self.last_time = float('-inf')
+        self.spoken = 0
+        self.suppressed = 0
+
+    def deliver(self, events, now):
+        for event in events:
+            if not event.speak:
+                continue
+            if self._allowed(event, now):
+                interrupt = event.priority > self.last_priority and now - self.last_time < self.min_gap
+                self.speak(event.text, interrupt=interrupt)
+                self.last_spoken[event.key] = now
+                self.last_text[event.kind] = event.text
+                self.last_priority = event.priority
+                self.last_time = now
+                self.spoken += 1
+                # Sorted by priority, so the rest of this frame's cues can wait
+                for rest in events[events.index(event) + 1:]:
+                    if rest.speak:
+                        self.suppressed += 1
+                return
+            self.suppressed += 1
+
+    def _allowed(self, event, now):
+        if event.priority < self.last_priority and now - self.last_time < self.min_gap:
+            return False
+        cooldown = self.cooldowns.get(event.text, COOLDOWNS.get(event.kind, 0.0))
+        if cooldown is None:
+            return self.last_text.get(event.kind) != event.text
+        last = self.last_spoken.get(event.key)
+        return last is None or now - last >= cooldown
+
+    def draw(self, frame, now):
+        pass
+
+    def stats(self):
+        return {'spoken': self.spoken, 'suppressed': self.suppressed}
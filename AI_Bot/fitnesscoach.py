@@ -39,19 +39,22 @@ cv2.namedWindow('Mediapipe Feed', cv2.WINDOW_NORMAL)
 cv2.resizeWindow('Mediapipe Feed', 800, 600)
 ## Setup mediapipe instance
 with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+    # Camera frame and its RGB copy are reused every iteration
+    frame = rgb = None
     while cap.isOpened():
-        ret, frame = cap.read()
+        ret, frame = cap.read(frame)
         
         # Recolor image to RGB
-        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        image.flags.writeable = False
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        rgb.flags.writeable = False
       
         # Make detection
-        results = pose.process(image)
+        results = pose.process(rgb)
+        rgb.flags.writeable = True
     
-        # Recolor back to BGR
-        image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        # Draw on the BGR frame itself instead of converting the RGB copy back
+        image = frame
+        height, width = image.shape[:2]
         
         
         # Extract landmarks
@@ -65,7 +68,7 @@ with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as
                 lwrist = [landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].x,landmarks[mp_pose.PoseLandmark.LEFT_WRIST.value].y]
                 angle = calculate_angle(lshoulder, lelbow, lwrist)
                 cv2.putText(image, str(angle), 
-                           tuple(np.multiply(lelbow, [640, 480]).astype(int)), 
+                           (int(lelbow[0] * width), int(lelbow[1] * height)), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA
                                 )
                 # Curl counter logic
@@ -86,7 +89,7 @@ with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as
                 rankle = [landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].x,landmarks[mp_pose.PoseLandmark.RIGHT_ANKLE.value].y]
                 angle3 = calculate_angle(rhip, rknee, rankle)
                 cv2.putText(image, str(angle3), 
-                           tuple(np.multiply(rknee, [640, 480]).astype(int)), 
+                           (int(rknee[0] * width), int(rknee[1] * height)), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA
                                 )
                 
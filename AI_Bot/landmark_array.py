@@ -0,0 +1,95 @@
+import enum
+
+import numpy as np
+
+
+# Same numbering as mediapipe's mp.solutions.pose.PoseLandmark, so indices line up with results.pose_landmarks
+class PoseLandmark(enum.IntEnum):
+    NOSE = 0
+    LEFT_EYE_INNER = 1
+    LEFT_EYE = 2
+    LEFT_EYE_OUTER = 3
+    RIGHT_EYE_INNER = 4
+    RIGHT_EYE = 5
+    RIGHT_EYE_OUTER = 6
+    LEFT_EAR = 7
+    RIGHT_EAR = 8
+    MOUTH_LEFT = 9
+    MOUTH_RIGHT = 10
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_ELBOW = 13
+    RIGHT_ELBOW = 14
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_PINKY = 17
+    RIGHT_PINKY = 18
+    LEFT_INDEX = 19
+    RIGHT_INDEX = 20
+    LEFT_THUMB = 21
+    RIGHT_THUMB = 22
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    LEFT_HEEL = 29
+    RIGHT_HEEL = 30
+    LEFT_FOOT_INDEX = 31
+    RIGHT_FOOT_INDEX = 32
+
+
+NUM_LANDMARKS = 33
+
+# Columns of the landmark array
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+
+# Joint angles computed every frame: name -> (first point, joint, end point)
+JOINT_ANGLES = [
+    ('left_knee', (PoseLandmark.LEFT_HIP, PoseLandmark.LEFT_KNEE, PoseLandmark.LEFT_ANKLE)),
+    ('right_knee', (PoseLandmark.RIGHT_HIP, PoseLandmark.RIGHT_KNEE, PoseLandmark.RIGHT_ANKLE)),
+    ('left_elbow', (PoseLandmark.LEFT_SHOULDER, PoseLandmark.LEFT_ELBOW, PoseLandmark.LEFT_WRIST)),
+    ('right_elbow', (PoseLandmark.RIGHT_SHOULDER, PoseLandmark.RIGHT_ELBOW, PoseLandmark.RIGHT_WRIST)),
+    ('left_hip', (PoseLandmark.LEFT_SHOULDER, PoseLandmark.LEFT_HIP, PoseLandmark.LEFT_KNEE)),
+    ('right_hip', (PoseLandmark.RIGHT_SHOULDER, PoseLandmark.RIGHT_HIP, PoseLandmark.RIGHT_KNEE)),
+    ('left_shoulder', (PoseLandmark.LEFT_ELBOW, PoseLandmark.LEFT_SHOULDER, PoseLandmark.LEFT_HIP)),
+    ('right_shoulder', (PoseLandmark.RIGHT_ELBOW, PoseLandmark.RIGHT_SHOULDER, PoseLandmark.RIGHT_HIP)),
+]
+
+ANGLE_NAMES = [name for name, _ in JOINT_ANGLES]
+ANGLE_INDEX = {name: i for i, name in enumerate(ANGLE_NAMES)}
+
+LEFT_KNEE_ANGLE, RIGHT_KNEE_ANGLE, LEFT_ELBOW_ANGLE, RIGHT_ELBOW_ANGLE, \
+    LEFT_HIP_ANGLE, RIGHT_HIP_ANGLE, LEFT_SHOULDER_ANGLE, RIGHT_SHOULDER_ANGLE = range(len(JOINT_ANGLES))
+
+_FIRST = np.array([points[0] for _, points in JOINT_ANGLES])
+_JOINT = np.array([points[1] for _, points in JOINT_ANGLES])
+_END = np.array([points[2] for _, points in JOINT_ANGLES])
+_POINTS = np.stack([_FIRST, _JOINT, _END])
+
+
+# Convert results.pose_landmarks into a (33, 4) float32 array of x, y, z, visibility
+def landmarks_to_array(pose_landmarks, out=None):
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark]
+    return out
+
+
+# Angles (degrees, 0-180) at b between the 2D points a-b-c; works on any matching batch shape (..., 2)
+def calculate_angles(a, b, c):
+    radians = np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) - np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0])
+    angle = np.abs(np.degrees(radians))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+# All JOINT_ANGLES for a landmark array of shape (33, 4), or a batch of them (N, 33, 4), in one call.
+# Each x, y pair is viewed as one complex number, so the angle at b is the argument of (c - b) * conj(a - b):
+# same result as calculate_angles, in about half the numpy calls (this runs every frame).
+def joint_angles(landmarks):
+    points = np.ascontiguousarray(landmarks, dtype=np.float32).view(np.complex64)[..., _POINTS, 0]
+    first = points[..., 0, :] - points[..., 1, :]
+    end = points[..., 2, :] - points[..., 1, :]
+    return np.abs(np.angle(end * first.conj(), deg=True))
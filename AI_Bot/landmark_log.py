@@ -0,0 +1,80 @@
+import numpy as np
+
+from landmark_array import NUM_LANDMARKS
+
+
+# Compact landmark recording: a 64-byte header followed by fixed-size records, so a whole
+# session can be memory-mapped as one structured array.
+#
+#   header:  b'AIFCLM' | version (1 byte) | landmark dtype ('e' float16 / 'f' float32) | exercise name (56 bytes, utf-8)
+#   record:  time (float64 seconds) | landmarks (33 x 4 of x, y, z, visibility)
+#
+# Frames without a detected pose are stored as NaN landmarks so timestamps stay continuous.
+MAGIC = b'AIFCLM'
+VERSION = 1
+HEADER_SIZE = 64
+NAME_SIZE = HEADER_SIZE - len(MAGIC) - 2
+
+
+def record_dtype(landmark_dtype):
+    return np.dtype([('time', '<f8'), ('landmarks', np.dtype(landmark_dtype).newbyteorder('<'), (NUM_LANDMARKS, 4))])
+
+
+# Appends one record per frame; cheap enough to call from the live loop
+class LandmarkRecorder:
+    def __init__(self, path, exercise='', landmark_dtype=np.float16):
+        landmark_dtype = np.dtype(landmark_dtype)
+        if landmark_dtype.char not in 'ef':
+            raise ValueError("Landmarks can only be recorded as float16 or float32")
+        self.path = path
+        self.record = np.zeros(1, dtype=record_dtype(landmark_dtype))
+        self.frames = 0
+        self.file = open(path, 'wb')
+        name = exercise.encode('utf-8')[:NAME_SIZE]
+        self.file.write(MAGIC + bytes([VERSION]) + landmark_dtype.char.encode() + name.ljust(NAME_SIZE, b'\0'))
+
+    def write(self, timestamp, landmarks=None):
+        self.record['time'] = timestamp
+        if landmarks is None:
+            self.record['landmarks'] = np.nan
+        else:
+            self.record['landmarks'] = landmarks
+        self.file.write(self.record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+        raise ValueError("Not a landmark recording: " + path)
+    if header[len(MAGIC)] != VERSION:
+        raise ValueError(f"Unsupported landmark recording version {header[len(MAGIC)]}: {path}")
+    landmark_dtype = np.dtype(chr(header[len(MAGIC) + 1]))
+    exercise = header[len(MAGIC) + 2:].rstrip(b'\0').decode('utf-8')
+    return exercise, landmark_dtype
+
+
+# Memory-map a recording; returns (exercise, records) where records['time'] is (N,) and
+# records['landmarks'] is (N, 33, 4)
+def load_recording(path):
+    exercise, landmark_dtype = read_header(path)
+    dtype = record_dtype(landmark_dtype)
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        size = f.tell() - HEADER_SIZE
+    frames = size // dtype.itemsize
+    if frames == 0:
+        return exercise, np.zeros(0, dtype=dtype)
+    # A partial trailing record (e.g. the app was killed mid-write) is ignored
+    return exercise, np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(frames,))
@@ -0,0 +1,119 @@
+import math
+import time
+
+import numpy as np
+
+from landmark_array import NUM_LANDMARKS, landmarks_to_array
+
+
+# Constant-velocity model for all landmarks at once. Each measured frame resets the position to
+# the measurement and blends the observed velocity into a smoothed estimate; in between, positions
+# are extrapolated along that velocity (for at most max_extrapolation seconds).
+class LandmarkPredictor:
+    def __init__(self, smoothing=0.5, max_extrapolation=0.25):
+        self.smoothing = smoothing
+        self.max_extrapolation = max_extrapolation
+        self.position = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self.velocity = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self.time = None
+
+    def reset(self):
+        self.time = None
+        self.velocity[:] = 0
+
+    def ready(self):
+        return self.time is not None
+
+    def update(self, landmarks, timestamp):
+        if self.time is not None and timestamp > self.time:
+            observed = (landmarks[:, :3] - self.position[:, :3]) / (timestamp - self.time)
+            self.velocity += self.smoothing * (observed - self.velocity)
+        else:
+            self.velocity[:] = 0
+        self.position[:] = landmarks
+        self.time = timestamp
+
+    def predict(self, timestamp, out=None):
+        if out is None:
+            out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        dt = min(max(timestamp - self.time, 0.0), self.max_extrapolation)
+        out[:, :3] = self.position[:, :3] + self.velocity * dt
+        out[:, 3] = self.position[:, 3]
+        return out
+
+
+# Stand-in for pose.process results on predicted frames
+class PredictedResults:
+    def __init__(self, pose_landmarks):
+        self.pose_landmarks = pose_landmarks
+        self.predicted = True
+
+
+def to_landmark_list(landmarks):
+    from mediapipe.framework.formats import landmark_pb2
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmark_list
+
+
+# Runs the real pose model on every Nth frame and extrapolates landmarks for the frames in between.
+# With adaptive=True, N follows the measured inference time so the model runs as often as it can
+# while the detectors still get target_fps landmark frames. Pass each frame's capture time as
+# timestamp: the motion model then follows the camera's clock, not the jitter of when inference ran.
+class StridedPose:
+    def __init__(self, process, stride=2, adaptive=False, max_stride=4, target_fps=30.0, predictor=None):
+        self.process_frame = process
+        self.stride = stride
+        self.adaptive = adaptive
+        self.max_stride = max_stride
+        self.target_fps = target_fps
+        self.predictor = predictor or LandmarkPredictor()
+        self.landmarks = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        self.since_inference = 0
+        self.inference_time = None
+        self.inferred = 0
+        self.predicted = 0
+
+    def process(self, rgb_frame, timestamp=None):
+        now = time.perf_counter() if timestamp is None else timestamp
+        self.since_inference += 1
+        if self.predictor.ready() and self.since_inference < self.stride:
+            self.predicted += 1
+            return PredictedResults(to_landmark_list(self.predictor.predict(now, self.landmarks)))
+
+        started = time.perf_counter()
+        results = self.process_frame(rgb_frame)
+        elapsed = time.perf_counter() - started
+        self.inference_time = elapsed if self.inference_time is None else 0.9 * self.inference_time + 0.1 * elapsed
+        self.inferred += 1
+        self.since_inference = 0
+
+        if results.pose_landmarks:
+            self.predictor.update(landmarks_to_array(results.pose_landmarks, self.landmarks), now)
+        else:
+            self.predictor.reset()
+        if self.adaptive:
+            self._adapt()
+        return results
+
+    # Enough predicted frames to cover the time one inference takes at the target frame rate
+    def _adapt(self):
+        needed = math.ceil(self.inference_time * self.target_fps)
+        self.stride = max(1, min(self.max_stride, needed))
+
+
+# Offline equivalent of StridedPose for recorded traces: keeps every stride-th frame (offset by
+# `start`) and replaces the rest with predictions. NaN rows are frames where no pose was found.
+def simulate_stride(times, landmarks, stride, predictor, start=0):
+    output = np.full_like(landmarks, np.nan)
+    for i in range(len(landmarks)):
+        if (start + i) % stride == 0:
+            if np.isnan(landmarks[i, 0, 0]):
+                predictor.reset()
+            else:
+                predictor.update(landmarks[i], times[i])
+                output[i] = landmarks[i]
+        elif predictor.ready():
+            predictor.predict(times[i], output[i])
+    return output
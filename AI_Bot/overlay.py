@@ -0,0 +1,83 @@
+import collections
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+SHADOW_OFFSET = 2
+
+
+# A pre-rendered piece of shadowed text with its anti-aliased alpha mask, stored ready for blending:
+# dst = dst * (255 - alpha) / 255 + color, with color premultiplied by alpha
+class TextSprite:
+    def __init__(self, text, font_scale, color, shadow_color, thickness):
+        (width, height), baseline = cv2.getTextSize(text, FONT, font_scale, thickness)
+        margin = thickness + 1
+        self.origin = (margin, margin + height)
+        size = (height + baseline + 2 * margin + SHADOW_OFFSET, width + 2 * margin + SHADOW_OFFSET)
+
+        # Draw exactly what put_text_with_shadow used to draw, over black and into a coverage mask
+        canvas = np.zeros(size + (3,), dtype=np.uint8)
+        mask = np.zeros(size, dtype=np.uint8)
+        x, y = self.origin
+        for position, text_color in (((x + SHADOW_OFFSET, y + SHADOW_OFFSET), shadow_color), ((x, y), color)):
+            cv2.putText(canvas, text, position, FONT, font_scale, text_color, thickness, cv2.LINE_AA)
+            cv2.putText(mask, text, position, FONT, font_scale, 255, thickness, cv2.LINE_AA)
+
+        # Crop to the pixels actually touched
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if len(rows) == 0:
+            self.origin = (0, 0)
+            self.inverse_alpha = self.color = self.scratch = np.zeros((0, 0, 3), dtype=np.uint8)
+            return
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        self.origin = (x - left, y - top)
+
+        # Rendered over black the canvas is already premultiplied by coverage
+        coverage = np.repeat(mask[top:bottom, left:right, None], 3, axis=2)
+        self.inverse_alpha = 255 - coverage
+        self.color = np.minimum(canvas[top:bottom, left:right], coverage)
+        self.scratch = np.empty_like(self.color)
+
+    # Blend onto img with the text baseline starting at position (clipped to the image)
+    def draw(self, img, position):
+        height, width = self.inverse_alpha.shape[:2]
+        x0 = position[0] - self.origin[0]
+        y0 = position[1] - self.origin[1]
+        left, top = max(x0, 0), max(y0, 0)
+        right, bottom = min(x0 + width, img.shape[1]), min(y0 + height, img.shape[0])
+        if right <= left or bottom <= top:
+            return
+
+        # Two saturating OpenCV ops on the region of interest, written straight back into img
+        region = img[top:bottom, left:right]
+        sprite = (slice(top - y0, bottom - y0), slice(left - x0, right - x0))
+        scratch = cv2.multiply(region, self.inverse_alpha[sprite], dst=self.scratch[sprite], scale=1 / 255)
+        cv2.add(scratch, self.color[sprite], dst=region)
+
+
+# LRU cache of text sprites keyed by everything that affects how they look
+class TextSpriteCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.sprites = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, font_scale, color, shadow_color, thickness):
+        key = (text, font_scale, tuple(color), tuple(shadow_color), thickness)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = self.sprites[key] = TextSprite(text, font_scale, color, shadow_color, thickness)
+        if len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, img, text, position, font_scale, color, shadow_color, thickness=2):
+        self.get(text, font_scale, color, shadow_color, thickness).draw(img, position)
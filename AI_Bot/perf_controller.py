@@ -0,0 +1,163 @@
+import time
+
+import cv2
+
+from background_loader import BackgroundLoader
+
+
+# Quality levels from best to fastest. Lower tracking confidence at the low end keeps mediapipe
+# tracking the user instead of falling back to the (much slower) person detector.
+LEVELS = [
+    {'model_complexity': 2, 'max_width': None, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+    {'model_complexity': 1, 'max_width': None, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+    {'model_complexity': 1, 'max_width': 960, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+    {'model_complexity': 0, 'max_width': 960, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+    {'model_complexity': 0, 'max_width': 640, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.3},
+]
+
+
+# Closed-loop controller around the legacy pose model: watches inference latency against the frame
+# budget for target_fps and steps between LEVELS. Hysteresis: it only switches after `dwell` frames
+# at the current level, only steps up when well under budget, and won't step up to a level that was
+# measured to be over budget in the last `retry_after` seconds.
+# The models of the levels next to the current one are built on background threads, so a switch
+# never stalls inference while a graph is constructed (until one is ready the controller stays put).
+# pose, if given, is an already loaded model with the settings of start_level; it is closed with the rest.
+class AdaptivePose:
+    def __init__(self, target_fps=20.0, levels=LEVELS, start_level=1, dwell=45, upgrade_margin=0.6, smoothing=0.1,
+                 retry_after=30.0, pose=None, clock=time.monotonic):
+        self.budget = 1.0 / target_fps
+        self.levels = levels
+        self.level = start_level
+        self.dwell = dwell
+        self.upgrade_margin = upgrade_margin
+        self.smoothing = smoothing
+        self.retry_after = retry_after
+        self.clock = clock
+        self.poses = {}
+        self.loaders = {}
+        self.measured = {}
+        self.unavailable = set()
+        self.latency = None
+        self.frames_at_level = 0
+        self.switches = 0
+        self.resize_buffer = None
+        key = self._key(start_level)
+        self.pose = self.poses[key] = pose if pose is not None else self._build(key)
+        self._prefetch()
+
+    def _key(self, level):
+        settings = self.levels[level]
+        return settings['model_complexity'], settings['min_detection_confidence'], settings['min_tracking_confidence']
+
+    def _build(self, key):
+        from pose_backends import LegacyPoseBackend
+        return LegacyPoseBackend(*key)
+
+    # Start building the models of the neighbouring levels
+    def _prefetch(self):
+        for step in (-1, 1):
+            level = self._next_level(step)
+            if level is not None:
+                try:
+                    self._pose_for(level)
+                except Exception:
+                    self.unavailable.add(level)
+
+    # The model for level, or None while it is still being built (raises if it couldn't be)
+    def _pose_for(self, level):
+        key = self._key(level)
+        if key in self.poses:
+            return self.poses[key]
+        loader = self.loaders.get(key)
+        if loader is None:
+            self.loaders[key] = BackgroundLoader(lambda: self._build(key), name=f'pose-level-{level}').start()
+            return None
+        if not loader.ready():
+            return None
+        del self.loaders[key]
+        self.poses[key] = loader.get()
+        return self.poses[key]
+
+    def process(self, rgb_frame):
+        max_width = self.levels[self.level]['max_width']
+        if max_width and rgb_frame.shape[1] > max_width:
+            height = round(rgb_frame.shape[0] * max_width / rgb_frame.shape[1])
+            if self.resize_buffer is None or self.resize_buffer.shape[:2] != (height, max_width):
+                self.resize_buffer = None
+            rgb_frame = self.resize_buffer = cv2.resize(rgb_frame, (max_width, height), dst=self.resize_buffer, interpolation=cv2.INTER_AREA)
+
+        started = time.perf_counter()
+        results = self.pose.process(rgb_frame)
+        elapsed = time.perf_counter() - started
+
+        self.latency = elapsed if self.latency is None else self.latency + self.smoothing * (elapsed - self.latency)
+        self.frames_at_level += 1
+        if self.frames_at_level >= self.dwell:
+            self._adjust()
+        return results
+
+    # Nearest level in the given direction whose model could be loaded
+    def _next_level(self, step):
+        level = self.level + step
+        while 0 <= level < len(self.levels):
+            if level not in self.unavailable:
+                return level
+            level += step
+        return None
+
+    def _adjust(self):
+        self.measured[self.level] = (self.latency, self.clock())
+        if self.latency > self.budget:
+            faster = self._next_level(1)
+            if faster is not None:
+                self._switch(faster)
+        elif self.latency < self.budget * self.upgrade_margin:
+            better = self._next_level(-1)
+            if better is not None and not self._too_slow(better):
+                self._switch(better)
+
+    # Over budget when last measured, and that was recent enough to still go by (the load on the
+    # machine changes, so a level that was too slow once is tried again after a while)
+    def _too_slow(self, level):
+        if level not in self.measured:
+            return False
+        latency, when = self.measured[level]
+        return latency > self.budget and self.clock() - when < self.retry_after
+
+    def _switch(self, level):
+        try:
+            pose = self._pose_for(level)
+        except Exception as e:
+            # e.g. the heavy model can't be downloaded; stay where we are
+            print(f"Could not switch pose model to level {level}: {e}")
+            self.unavailable.add(level)
+            self.frames_at_level = 0
+            return
+        self.frames_at_level = 0
+        if pose is None:
+            # Still loading; look again after another dwell
+            return
+        self.pose = pose
+        self.level = level
+        self.latency = None
+        self.switches += 1
+        self._prefetch()
+
+    # Forget the current model's tracking state (e.g. when the region it sees changes)
+    def reset(self):
+        self.pose.reset()
+
+    def settings(self):
+        return dict(self.levels[self.level], level=self.level)
+
+    def close(self):
+        for key, loader in self.loaders.items():
+            try:
+                self.poses[key] = loader.get()
+            except Exception:
+                pass
+        for pose in self.poses.values():
+            pose.close()
+        self.poses = {}
+        self.loaders = {}
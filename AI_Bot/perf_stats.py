@@ -0,0 +1,96 @@
+import time
+
+import cv2
+import numpy as np
+
+
+# Rolling per-stage latency statistics for the live loop.
+# Each stage keeps its last `window` samples in a ring buffer (plus running totals), so recording
+# a sample is a couple of array writes. Callers hold `timer = None` when stats are off, which
+# makes instrumentation a single falsy check per stage.
+class StageTimer:
+    def __init__(self, window=256, overlay_refresh=15):
+        self.window = window
+        self.overlay_refresh = overlay_refresh
+        self.samples = {}
+        self.positions = {}
+        self.totals = {}
+        self.frame_times = np.zeros(window)
+        self.frames = 0
+        self.overlay_lines = []
+
+    def record(self, stage, seconds):
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = np.zeros(self.window)
+            self.positions[stage] = 0
+            self.totals[stage] = [0, 0.0, 0.0]  # count, sum, max
+        position = self.positions[stage]
+        samples[position % self.window] = seconds
+        self.positions[stage] = position + 1
+        totals = self.totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+        if seconds > totals[2]:
+            totals[2] = seconds
+
+    # Forget everything recorded so far (e.g. warm-up frames). Stages keep their buffers so the
+    # pipeline threads can go on recording while this runs.
+    def reset(self):
+        for stage in self.totals:
+            self.positions[stage] = 0
+            self.totals[stage] = [0, 0.0, 0.0]
+        self.frames = 0
+        self.overlay_lines = []
+
+    # Call once per displayed frame
+    def frame_done(self, now=None):
+        self.frame_times[self.frames % self.window] = time.perf_counter() if now is None else now
+        self.frames += 1
+
+    def fps(self):
+        n = min(self.frames, self.window)
+        if n < 2:
+            return 0.0
+        newest = self.frame_times[(self.frames - 1) % self.window]
+        oldest = self.frame_times[(self.frames - n) % self.window]
+        return (n - 1) / (newest - oldest) if newest > oldest else 0.0
+
+    def recent(self, stage):
+        samples = self.samples[stage]
+        return samples[:min(self.positions[stage], self.window)]
+
+    # Milliseconds per stage over the rolling window, plus lifetime mean/max
+    def summary(self):
+        stats = {}
+        for stage in self.samples:
+            recent = self.recent(stage) * 1000.0
+            count, total, worst = self.totals[stage]
+            if count == 0 or len(recent) == 0:
+                continue
+            stats[stage] = {
+                'count': count,
+                'p50_ms': float(np.percentile(recent, 50)),
+                'p95_ms': float(np.percentile(recent, 95)),
+                'mean_ms': total / count * 1000.0,
+                'max_ms': worst * 1000.0,
+            }
+        return stats
+
+    # Draw FPS and the per-stage median in the top-right corner; text is refreshed every few frames
+    def draw_overlay(self, frame):
+        if self.frames % self.overlay_refresh == 0 or not self.overlay_lines:
+            self.overlay_lines = [f'FPS {self.fps():5.1f}']
+            for stage, stats in self.summary().items():
+                self.overlay_lines.append(f"{stage:>8} {stats['p50_ms']:6.1f} ms")
+
+        x = frame.shape[1] - 230
+        cv2.rectangle(frame, (x - 10, 10), (frame.shape[1] - 10, 20 + 22 * len(self.overlay_lines)), (0, 0, 0), -1)
+        for i, line in enumerate(self.overlay_lines):
+            cv2.putText(frame, line, (x, 32 + 22 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (0, 255, 255), 1, cv2.LINE_AA)
+
+    def print_summary(self):
+        print(f"Frames: {self.frames}, FPS (last {min(self.frames, self.window)} frames): {self.fps():.1f}")
+        print(f"{'stage':>10} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'max ms':>8}")
+        for stage, stats in self.summary().items():
+            print(f"{stage:>10} {stats['count']:8d} {stats['p50_ms']:8.2f} {stats['p95_ms']:8.2f} {stats['mean_ms']:8.2f} {stats['max_ms']:8.2f}")
@@ -0,0 +1,279 @@
+import argparse
+import collections
+import hashlib
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+
+try:
+    from gtts import gTTS
+except ImportError:
+    gTTS = None
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+from speech import SpeechWorker
+
+
+# gTTS phrases synthesized once and kept on disk as mp3, with an in-memory LRU of decoded sounds
+# played straight from memory (pygame.mixer) - no output.mp3 written and deleted per cue.
+# say() only plays sounds already in memory. Anything else goes to a loader thread, which reads and
+# decodes the mp3 and plays it; a phrase that isn't on disk yet is spoken by the offline engine
+# (pyttsx3 via SpeechWorker) instead and synthesized on a third thread for next time. So say() never
+# waits on the disk, the decoder or the network.
+# The offline engine is also used for everything when gTTS or pygame isn't available.
+#
+#   python phrase_cache.py --warm    # pre-synthesize the coaching phrases and numbers (needs network)
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'ai_fitness_phrases')
+
+
+# Everything the coaches say: rep counts, countdown and the table-driven exercise messages
+def coaching_phrases(max_count=100):
+    from exercise_rules import EXERCISES
+    phrases = [str(i) for i in range(max_count + 1)]
+    phrases += ['Starting now!', 'Lower your hips', 'Raise your hips', 'Go lower', 'Keep your torso upright',
+                'Keep elbows stable', 'Testing, Testing, Testing']
+    phrases += [f"Great job! You've completed {i} reps." for i in range(1, max_count + 1)]
+    for spec in EXERCISES.values():
+        for counter in spec['counters']:
+            if 'speech' in counter:
+                phrases.append(counter['speech'])
+        for rule in spec.get('form_rules', []):
+            phrases.append(rule['message'])
+    return list(dict.fromkeys(phrases))
+
+
+# max_delay: how late (seconds) a phrase loaded from disk may still start playing
+class PhraseCache:
+    def __init__(self, cache_dir=CACHE_DIR, language='en', max_memory=128, retry_after=60.0, fallback=None, max_delay=1.0):
+        self.cache_dir = cache_dir
+        self.language = language
+        self.max_memory = max_memory
+        self.retry_after = retry_after
+        self.fallback = fallback
+        self.max_delay = max_delay
+        self.sounds = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.play_lock = threading.Lock()
+        self.player = None  # None: not tried yet, False: unavailable
+        self.channel = None
+        self.loads = queue.Queue()
+        self.loading = set()
+        self.loader = None
+        self.pending = queue.Queue()
+        self.queued = set()
+        self.worker = None
+        self.offline_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.late = 0
+        self.synthesized = 0
+        self.fallbacks = 0
+
+    def path_for(self, text):
+        digest = hashlib.sha1(f'{self.language}:{text}'.encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest + '.mp3')
+
+    # mp3 bytes for text from the disk store, or None if it hasn't been synthesized
+    def cached_audio(self, text):
+        try:
+            with open(self.path_for(text), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    # Synthesize text into the disk store (blocking, network); returns the mp3 bytes or None
+    def synthesize(self, text):
+        if gTTS is None or time.monotonic() < self.offline_until:
+            return None
+        buffer = io.BytesIO()
+        try:
+            gTTS(text=text, lang=self.language, slow=False).write_to_fp(buffer)
+        except Exception as e:
+            # Most likely offline; don't try again for a while
+            print(f"Could not synthesize {text!r}: {e}")
+            self.offline_until = time.monotonic() + self.retry_after
+            return None
+
+        data = buffer.getvalue()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(text)
+        partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, path)
+        self.synthesized += 1
+        return data
+
+    # Synthesize every phrase that isn't on disk yet; returns how many are available afterwards
+    def warm(self, phrases):
+        available = 0
+        for text in phrases:
+            if os.path.exists(self.path_for(text)) or self.synthesize(text) is not None:
+                available += 1
+        return available
+
+    def warm_in_background(self, phrases):
+        for text in phrases:
+            self._queue_synthesis(text)
+
+    def say(self, text):
+        text = str(text).strip()
+        if not text:
+            return
+        if not self._player_ready():
+            self._speak_offline(text)
+            return
+        with self.lock:
+            sound = self.sounds.get(text)
+            if sound is not None:
+                self.sounds.move_to_end(text)
+                self.hits += 1
+            else:
+                self.misses += 1
+                if text in self.loading:
+                    return
+                self.loading.add(text)
+                if self.loader is None:
+                    self.loader = threading.Thread(target=self._load_loop, name='phrase-loader', daemon=True)
+                    self.loader.start()
+        if sound is None:
+            self.loads.put((text, time.monotonic()))
+        else:
+            self._play(sound)
+
+    def close(self):
+        self.loads.put(None)
+        self.pending.put(None)
+        if self.fallback is not None:
+            self.fallback.close()
+        if self.player:
+            pygame.mixer.quit()
+            self.player = False
+
+    def _player_ready(self):
+        if self.player is None:
+            self.player = False
+            if pygame is not None:
+                try:
+                    pygame.mixer.init()
+                    self.channel = pygame.mixer.Channel(0)
+                    self.player = True
+                except Exception as e:
+                    print(f"Audio playback unavailable, using the offline voice: {e}")
+        return self.player
+
+    # Don't restart a phrase that is already playing or up next; otherwise the newest phrase
+    # replaces whatever was queued behind the current one
+    def _play(self, sound):
+        with self.play_lock:
+            if self.channel.get_busy():
+                if self.channel.get_sound() is not sound and self.channel.get_queue() is not sound:
+                    self.channel.queue(sound)
+            else:
+                self.channel.play(sound)
+
+    def _speak_offline(self, text):
+        self.fallbacks += 1
+        self._fallback().say(text)
+
+    # Decode the phrase from disk into the LRU; None if it hasn't been synthesized (or won't decode)
+    def _load(self, text):
+        data = self.cached_audio(text)
+        if data is None:
+            return None
+        try:
+            sound = pygame.mixer.Sound(file=io.BytesIO(data))
+        except Exception as e:
+            print(f"Could not decode cached audio for {text!r}: {e}")
+            return None
+        with self.lock:
+            self.sounds[text] = sound
+            if len(self.sounds) > self.max_memory:
+                self.sounds.popitem(last=False)
+        return sound
+
+    def _load_loop(self):
+        while True:
+            item = self.loads.get()
+            if item is None:
+                return
+            text, requested_at = item
+            sound = self._load(text)
+            if sound is None:
+                self._speak_offline(text)
+                self._queue_synthesis(text)
+            elif time.monotonic() - requested_at <= self.max_delay:
+                self._play(sound)
+            else:
+                self.late += 1
+            with self.lock:
+                self.loading.discard(text)
+
+    def _fallback(self):
+        if self.fallback is None:
+            self.fallback = SpeechWorker(rate=150, voice_index=0)
+        return self.fallback
+
+    def _queue_synthesis(self, text):
+        if gTTS is None:
+            return
+        with self.lock:
+            if text in self.queued:
+                return
+            self.queued.add(text)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._synthesis_loop, name='phrase-synthesis', daemon=True)
+                self.worker.start()
+        self.pending.put(text)
+
+    def _synthesis_loop(self):
+        while True:
+            text = self.pending.get()
+            if text is None:
+                return
+            if self.cached_audio(text) is None:
+                self.synthesize(text)
+            with self.lock:
+                self.queued.discard(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the synthesized coaching phrase cache.')
+    parser.add_argument('--warm', action='store_true', help='Synthesize all known coaching phrases and numbers')
+    parser.add_argument('--say', help='Speak a phrase through the cache')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    cache = PhraseCache(args.cache_dir, args.language)
+    if args.warm:
+        if gTTS is None:
+            parser.error("gTTS is not installed")
+        phrases = coaching_phrases()
+        started = time.perf_counter()
+        available = cache.warm(phrases)
+        print(f"{available}/{len(phrases)} phrases cached in {args.cache_dir} "
+              f"({cache.synthesized} synthesized in {time.perf_counter() - started:.1f}s)")
+    if args.say:
+        cache.say(args.say)
+        if cache.player:
+            # (a phrase that isn't in memory yet starts once the loader has decoded it)
+            while cache.loading:
+                time.sleep(0.05)
+            while cache.channel.get_busy():
+                time.sleep(0.05)
+        else:
+            time.sleep(2.0)
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import queue
+import threading
+import time
+
+import cv2
+
+
+# Put an item into a bounded queue, throwing away the oldest items instead of blocking; returns how
+# many were thrown away (on_drop, if given, is called with each of them)
+def put_latest(q, item, on_drop=None):
+    dropped = 0
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                oldest = q.get_nowait()
+            except queue.Empty:
+                continue
+            if on_drop:
+                on_drop(oldest)
+            dropped += 1
+
+
+# Frame buffers that go round the pipeline instead of a new array per captured frame.
+# Capture reads into a free buffer (cap.read(image) reuses it when the size matches); a buffer comes
+# back when its packet is dropped or the render stage calls FramePipeline.release(packet). The pool
+# grows to the number of frames in flight (a handful) and then stops allocating.
+class FramePool:
+    def __init__(self):
+        self.free = queue.SimpleQueue()
+        self.allocated = 0
+
+    def take(self):
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            self.allocated += 1
+            return None
+
+    def give(self, frame):
+        if frame is not None:
+            self.free.put(frame)
+
+
+# One frame moving through the pipeline
+class FramePacket:
+    def __init__(self, index, frame, captured_at):
+        self.index = index
+        self.frame = frame
+        self.captured_at = captured_at
+        self.results = None
+        self.inferred_at = None
+
+
+# Capture -> inference -> render pipeline.
+# Capture and inference each run on their own thread and hand work forward through
+# queues of size 1, so a slow stage only ever sees the newest frame ("latest frame wins").
+# The render/UI stage stays on the calling thread because cv2.imshow/waitKey must.
+# With an asynchronous backend (see pose_backends.py) pass its submit() instead of process: the
+# inference thread only hands frames over and results come back through the backend's callback.
+# With timestamped=True, process is called as process(rgb_frame, captured_at) (see StridedPose).
+class FramePipeline:
+    def __init__(self, cap, process, queue_size=1, timer=None, submit=None, timestamped=False):
+        self.cap = cap
+        self.process = process
+        self.submit = submit
+        self.timestamped = timestamped
+        self.timer = timer
+        self.capture_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.error = None
+        self.captured = 0
+        self.inferred = 0
+        self.dropped_capture = 0
+        self.dropped_inference = 0
+        self.dropped_results = 0
+        self.pool = FramePool()
+        # The RGB copy handed to the model, converted in place every frame (mp.Image copies the
+        # pixels on submit, so asynchronous backends can share it too)
+        self.rgb_frame = None
+
+    def start(self):
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name='capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='inference', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(1.0)
+        self.threads = []
+
+    def running(self):
+        return not self.stop_event.is_set()
+
+    # Give a packet's frame buffer back once it has been drawn and shown
+    def release(self, packet):
+        self.pool.give(packet.frame)
+        packet.frame = None
+
+    def _drop(self, packet):
+        self.pool.give(packet.frame)
+
+    # An asynchronous backend skipped this frame (called from the backend's thread)
+    def _skipped(self, packet):
+        self.dropped_inference += 1
+        self._drop(packet)
+
+    # Wait for the next processed frame; returns None once the pipeline has stopped
+    def get(self, timeout=0.1):
+        while True:
+            try:
+                return self.result_queue.get(timeout=timeout)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return None
+
+    def _capture_loop(self):
+        index = 0
+        timer = self.timer
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            ret, frame = self.cap.read(self.pool.take())
+            if not ret:
+                self.error = "Error: Could not read from camera."
+                self.stop_event.set()
+                break
+            if timer:
+                timer.record('capture', time.perf_counter() - started)
+            self.captured += 1
+            self.dropped_capture += put_latest(self.capture_queue, FramePacket(index, frame, time.perf_counter()), self._drop)
+            index += 1
+
+    def _inference_loop(self):
+        timer = self.timer
+        while not self.stop_event.is_set():
+            try:
+                packet = self.capture_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            # Recolor the image to RGB (into the reused buffer) and run pose estimation on it read-only
+            try:
+                started = time.perf_counter()
+                rgb_frame = self.rgb_frame
+                if rgb_frame is not None:
+                    rgb_frame.flags.writeable = True
+                rgb_frame = self.rgb_frame = cv2.cvtColor(packet.frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+                rgb_frame.flags.writeable = False
+                converted = time.perf_counter()
+                if timer:
+                    timer.record('convert', converted - started)
+                if self.submit:
+                    self.submit(rgb_frame, packet.captured_at,
+                                lambda results, timestamp, packet=packet, converted=converted: self._deliver(packet, results, converted),
+                                lambda timestamp, packet=packet: self._skipped(packet))
+                    continue
+                if self.timestamped:
+                    results = self.process(rgb_frame, packet.captured_at)
+                else:
+                    results = self.process(rgb_frame)
+            except Exception as e:
+                self.error = "Error: Pose estimation failed: " + str(e)
+                self.stop_event.set()
+                break
+            self._deliver(packet, results, converted)
+
+    # Hand a processed frame to the render stage (called from the backend's thread when asynchronous)
+    def _deliver(self, packet, results, converted):
+        packet.results = results
+        packet.inferred_at = time.perf_counter()
+        if self.timer:
+            self.timer.record('pose', packet.inferred_at - converted)
+        self.inferred += 1
+        self.dropped_results += put_latest(self.result_queue, packet, self._drop)
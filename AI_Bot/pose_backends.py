@@ -0,0 +1,148 @@
+import threading
+import time
+
+import numpy as np
+
+from landmark_array import NUM_LANDMARKS
+from motion_model import to_landmark_list
+
+
+# Pose estimation backends behind one interface.
+#
+# Every backend has process(rgb_frame) -> results with .pose_landmarks (a NormalizedLandmarkList,
+# or None), the shape the legacy mp.solutions.pose API returns and everything downstream
+# (drawing, landmarks_to_array, RoiPoseTracker, StridedPose) consumes, plus close().
+# Asynchronous backends also have submit(rgb_frame, timestamp, on_result, on_drop=None), which returns
+# at once and later calls on_result(results, timestamp) from the backend's own thread - or
+# on_drop(timestamp) if the frame is skipped. FramePipeline uses submit() when it is available, so
+# inference no longer blocks its thread.
+#
+#   legacy: mp.solutions.pose.Pose, synchronous
+#   tasks:  MediaPipe Tasks PoseLandmarker; LIVE_STREAM mode (asynchronous) by default, VIDEO mode
+#           when live_stream=False. Needs a .task model bundle, e.g. pose_landmarker_full.task from
+#           https://developers.google.com/mediapipe/solutions/vision/pose_landmarker
+
+BACKENDS = ['legacy', 'tasks']
+DEFAULT_TASK_MODEL = 'pose_landmarker_full.task'
+
+
+class LegacyPoseBackend:
+    asynchronous = False
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        import mediapipe as mp
+        self.pose = mp.solutions.pose.Pose(model_complexity=model_complexity,
+                                           min_detection_confidence=min_detection_confidence,
+                                           min_tracking_confidence=min_tracking_confidence)
+
+    def process(self, rgb_frame):
+        return self.pose.process(rgb_frame)
+
+    def reset(self):
+        self.pose.reset()
+
+    def close(self):
+        self.pose.close()
+
+
+# Tasks results in the legacy shape
+class TasksResults:
+    def __init__(self, pose_landmarks, timestamp):
+        self.pose_landmarks = pose_landmarks
+        self.timestamp = timestamp
+
+
+def _first_pose(result):
+    if not result.pose_landmarks:
+        return None
+    landmarks = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    for i, lm in enumerate(result.pose_landmarks[0]):
+        landmarks[i] = (lm.x, lm.y, lm.z, lm.visibility if lm.visibility is not None else 1.0)
+    return to_landmark_list(landmarks)
+
+
+class TasksPoseBackend:
+    def __init__(self, model_path=DEFAULT_TASK_MODEL, live_stream=True, min_detection_confidence=0.5,
+                 min_presence_confidence=0.5, min_tracking_confidence=0.5):
+        import mediapipe as mp
+        from mediapipe.tasks.python import BaseOptions, vision
+        self.mp = mp
+        self.asynchronous = live_stream
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.last_timestamp_ms = -1
+        self.submitted = 0
+        self.delivered = 0
+        self.dropped = 0
+        options = vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM if live_stream else vision.RunningMode.VIDEO,
+            num_poses=1,
+            min_pose_detection_confidence=min_detection_confidence,
+            min_pose_presence_confidence=min_presence_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result if live_stream else None)
+        self.landmarker = vision.PoseLandmarker.create_from_options(options)
+
+    # Tasks need strictly increasing millisecond timestamps
+    def _timestamp_ms(self, timestamp):
+        timestamp_ms = max(int(timestamp * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def _image(self, rgb_frame):
+        return self.mp.Image(image_format=self.mp.ImageFormat.SRGB, data=rgb_frame)
+
+    def process(self, rgb_frame):
+        if self.asynchronous:
+            raise RuntimeError("The live-stream backend is asynchronous; use submit()")
+        timestamp = time.perf_counter()
+        result = self.landmarker.detect_for_video(self._image(rgb_frame), self._timestamp_ms(timestamp))
+        return TasksResults(_first_pose(result), timestamp)
+
+    # Queue a frame; on_result(results, timestamp) is called when (and if) the landmarker gets to it.
+    # The landmarker drops frames that arrive while it is busy: for those on_drop(timestamp) is called
+    # instead, once a later frame's result shows it was skipped (or on close), so the caller can
+    # recycle whatever it kept for the frame.
+    def submit(self, rgb_frame, timestamp, on_result, on_drop=None):
+        with self.lock:
+            timestamp_ms = self._timestamp_ms(timestamp)
+            self.in_flight[timestamp_ms] = (timestamp, on_result, on_drop)
+            self.submitted += 1
+        self.landmarker.detect_async(self._image(rgb_frame), timestamp_ms)
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        with self.lock:
+            entry = self.in_flight.pop(timestamp_ms, None)
+            # Anything older was dropped by the landmarker and will never come back
+            stale = [self.in_flight.pop(t) for t in [t for t in self.in_flight if t < timestamp_ms]]
+            self.delivered += 1
+        self._dropped(stale)
+        if entry is not None:
+            timestamp, on_result, on_drop = entry
+            on_result(TasksResults(_first_pose(result), timestamp), timestamp)
+
+    def _dropped(self, entries):
+        self.dropped += len(entries)
+        for timestamp, on_result, on_drop in entries:
+            if on_drop:
+                on_drop(timestamp)
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.landmarker.close()
+        # No results come after this, so whatever is still in flight has been dropped
+        with self.lock:
+            remaining = list(self.in_flight.values())
+            self.in_flight.clear()
+        self._dropped(remaining)
+
+
+def create_backend(name='legacy', model_complexity=1, model_path=DEFAULT_TASK_MODEL, live_stream=True):
+    if name == 'legacy':
+        return LegacyPoseBackend(model_complexity)
+    if name == 'tasks':
+        return TasksPoseBackend(model_path, live_stream=live_stream)
+    raise ValueError("Unknown pose backend: " + name)
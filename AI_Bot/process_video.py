@@ -0,0 +1,150 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from landmark_array import landmarks_to_array
+from exercise_rules import EXERCISES, ExerciseSession
+
+mp_pose = mp.solutions.pose
+
+CSV_FIELDS = ['file', 'exercise', 'rep', 'counter', 'count', 'frame', 'time', 'form_feedback',
+              'rom', 'min_angle', 'max_angle', 'concentric', 'eccentric', 'tut', 'duration']
+
+
+# Create a pose model for offline processing (one per process; mediapipe graphs aren't shareable)
+def create_pose(model_complexity=1):
+    return mp_pose.Pose(static_image_mode=False, model_complexity=model_complexity,
+                        min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+# Run pose estimation + rep counting over a recorded video as fast as possible (no display, no pacing)
+def process_video(path, exercise, pose=None, max_frames=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError("Could not open video: " + path)
+
+    owns_pose = pose is None
+    if owns_pose:
+        pose = create_pose()
+    else:
+        pose.reset()  # Forget any tracking state left over from a previous video
+
+    session = ExerciseSession(exercise)
+    labels = session.labels()
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    landmarks = np.empty((33, 4), dtype=np.float32)
+    rgb_frame = None
+
+    # Form feedback seen since the last rep of each counter
+    feedback = [set() for _ in labels]
+    reps = []
+    # Each counter's latest rep row, which its metrics are added to when its cycle completes
+    last_rep = {}
+    frames = 0
+    detected = 0
+    started = time.perf_counter()
+
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+            results = pose.process(rgb_frame)
+            frames += 1
+            if not results.pose_landmarks:
+                continue
+            detected += 1
+
+            update = session.update(landmarks_to_array(results.pose_landmarks, landmarks), timestamp=(frames - 1) / fps)
+            for rule in update.messages:
+                for seen in feedback:
+                    seen.add(rule['message'])
+            for i in update.reps:
+                last_rep[i] = {
+                    'rep': len(reps) + 1,
+                    'counter': labels[i],
+                    'count': session.counts[i],
+                    'frame': frames - 1,
+                    'time': round((frames - 1) / fps, 3),
+                    'form_feedback': sorted(feedback[i]),
+                }
+                reps.append(last_rep[i])
+                feedback[i] = set()
+            for rep in update.metrics:
+                if rep.counter in last_rep:
+                    last_rep[rep.counter].update(rep.as_dict())
+    finally:
+        cap.release()
+        if owns_pose:
+            pose.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'file': path,
+        'exercise': exercise,
+        'counts': dict(zip(labels, session.counts)),
+        'analytics': session.analytics.summary(),
+        'reps': reps,
+        'frames': frames,
+        'frames_with_pose': detected,
+        'video_seconds': round(frames / fps, 3),
+        'processing_seconds': round(elapsed, 3),
+        'speedup': round(frames / fps / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def write_json(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+# One row per rep; results may be one video's result or a list of them
+def write_csv(results, path):
+    if isinstance(results, dict):
+        results = [results]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for result in results:
+            for rep in result['reps']:
+                row = dict(rep, file=result['file'], exercise=result['exercise'])
+                row['form_feedback'] = '; '.join(rep['form_feedback'])
+                writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count reps in a recorded workout video without a display.')
+    parser.add_argument('video', help='Path to the recorded video')
+    parser.add_argument('exercise', choices=sorted(EXERCISES), help='Exercise performed in the video')
+    parser.add_argument('--json', help='Write the results as JSON to this file')
+    parser.add_argument('--csv', help='Write one row per rep as CSV to this file')
+    parser.add_argument('--model-complexity', type=int, default=1, choices=[0, 1, 2])
+    args = parser.parse_args()
+
+    pose = create_pose(args.model_complexity)
+    try:
+        results = process_video(args.video, args.exercise, pose)
+    finally:
+        pose.close()
+
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+    if not args.json and not args.csv:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"{results['frames']} frames, {len(results['reps'])} reps, {results['speedup']}x real-time")
+
+
+if __name__ == "__main__":
+    main()
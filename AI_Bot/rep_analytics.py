@@ -0,0 +1,222 @@
+import numpy as np
+
+from landmark_array import ANGLE_INDEX
+
+
+# Per-rep metrics computed incrementally, frame by frame, for the counters of an exercise.
+#
+# Each counter tracks one joint angle (or the mean of several, see 'track' in
+# exercise_rules.EXERCISES). While the counter is in a rep cycle (its stage is set) every frame
+# updates the running min/max angle and adds its duration to the concentric or eccentric phase,
+# depending on which way the smoothed angle is moving ('concentric' says which direction is the
+# lifting one). A rep's window runs from one return to the counter's 'reset_stage' to the next:
+# most counters count the rep partway through the cycle (at the bottom of a squat, the top of a
+# curl), so its metrics are only complete - and returned - once the stage comes back round. Lunge
+# counters count when the cycle ends (their 'trigger_stage' is None) and close right away.
+# A closed window becomes a RepMetrics row, appended to a fixed-size ring buffer of recent reps and
+# folded into running session statistics (Welford mean/variance) - so per-frame cost and memory
+# stay the same however long the session runs.
+
+METRICS = ['rom', 'min_angle', 'max_angle', 'concentric', 'eccentric', 'tut', 'duration']
+ROM, MIN_ANGLE, MAX_ANGLE, CONCENTRIC, ECCENTRIC, TUT, DURATION = range(len(METRICS))
+
+
+# Fixed-size history of metric rows plus running mean/variance over everything ever added
+class RingStats:
+    def __init__(self, columns, capacity=64):
+        self.rows = np.zeros((capacity, columns))
+        self.capacity = capacity
+        self.count = 0
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+
+    def add(self, row):
+        self.rows[self.count % self.capacity] = row
+        self.count += 1
+        delta = row - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (row - self.mean)
+
+    def last(self):
+        return self.rows[(self.count - 1) % self.capacity] if self.count else None
+
+    # The most recent min(count, capacity) rows, oldest first
+    def recent(self):
+        n = min(self.count, self.capacity)
+        start = (self.count - n) % self.capacity
+        return np.roll(self.rows, -start, axis=0)[:n]
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.zeros_like(self.mean)
+
+
+class RepMetrics:
+    def __init__(self, counter, label, values):
+        self.counter = counter
+        self.label = label
+        self.values = values
+
+    def __getattr__(self, name):
+        if name in METRICS:
+            return float(self.values[METRICS.index(name)])
+        raise AttributeError(name)
+
+    def as_dict(self):
+        return {name: round(float(value), 3) for name, value in zip(METRICS, self.values)}
+
+
+# The open rep window of one counter
+class CounterTracker:
+    def __init__(self, angle_indices, concentric_decreasing, smoothing, deadband, reset_stage, closes_on_trigger):
+        self.angle_indices = angle_indices
+        self.concentric_sign = -1.0 if concentric_decreasing else 1.0
+        self.smoothing = smoothing
+        self.deadband = deadband
+        self.reset_stage = reset_stage
+        self.closes_on_trigger = closes_on_trigger
+        self.angle = None
+        self.time = None
+        self.stage = None
+        self.pending = False  # a rep was counted and its cycle hasn't come back round yet
+        self.reset_window()
+
+    def reset_window(self):
+        self.min_angle = np.inf
+        self.max_angle = -np.inf
+        self.concentric = 0.0
+        self.eccentric = 0.0
+        self.started = None
+
+    def step(self, angles, timestamp):
+        if len(self.angle_indices) == 1:
+            raw = float(angles[self.angle_indices[0]])
+        else:
+            raw = float(np.mean(angles[self.angle_indices]))
+        if self.started is None:
+            self.started = timestamp
+        if raw < self.min_angle:
+            self.min_angle = raw
+        if raw > self.max_angle:
+            self.max_angle = raw
+
+        if self.angle is None or self.time is None or timestamp <= self.time:
+            self.angle = raw
+        else:
+            dt = timestamp - self.time
+            smoothed = self.angle + self.smoothing * (raw - self.angle)
+            velocity = (smoothed - self.angle) / dt
+            self.angle = smoothed
+            # Moving faster than the deadband counts toward a phase; slower is a pause
+            if velocity * self.concentric_sign > self.deadband:
+                self.concentric += dt
+            elif velocity * self.concentric_sign < -self.deadband:
+                self.eccentric += dt
+        self.time = timestamp
+
+    def close(self, timestamp):
+        row = np.array([self.max_angle - self.min_angle, self.min_angle, self.max_angle,
+                        self.concentric, self.eccentric, self.concentric + self.eccentric,
+                        timestamp - self.started])
+        self.reset_window()
+        self.pending = False
+        return row
+
+    # Out of the rep cycle (stage cleared): forget the open window
+    def idle(self):
+        self.reset_window()
+        self.angle = None
+        self.stage = None
+        self.pending = False
+
+
+class RepAnalytics:
+    def __init__(self, exercise, history=64, smoothing=0.5, deadband=15.0):
+        self.exercise = exercise
+        self.labels = [counter['label'] for counter in exercise.counters]
+        self.trackers = []
+        self.stats = []
+        for counter in exercise.counters:
+            track = counter.get('track')
+            if track is None:
+                self.trackers.append(None)
+                self.stats.append(None)
+                continue
+            names = [track] if isinstance(track, str) else track
+            indices = np.array([ANGLE_INDEX[name] for name in names], dtype=np.intp)
+            self.trackers.append(CounterTracker(indices, counter.get('concentric') == 'decreasing', smoothing, deadband,
+                                                counter['reset_stage'], counter['trigger_stage'] is None))
+            self.stats.append(RingStats(len(METRICS), history))
+        self.asymmetry_pair = exercise.spec.get('asymmetry')
+
+    # Feed one frame (after the counters were updated); returns RepMetrics for the reps whose cycle
+    # ended on this frame - usually a few frames after the frame that counted them
+    def update(self, angles, timestamp, stages, reps):
+        completed = []
+        for i, tracker in enumerate(self.trackers):
+            if tracker is None:
+                continue
+            stage = stages[i]
+            if stage is None and i not in reps:
+                # Cycle abandoned (e.g. the gate stopped holding): a counted rep ends with what it has
+                if tracker.pending:
+                    completed.append(self._close(i, tracker, timestamp))
+                tracker.idle()
+                continue
+            returned = stage == tracker.reset_stage and tracker.stage != stage
+            tracker.stage = stage
+            if returned and not tracker.pending:
+                # A new cycle starts here (first entry, or a cycle that didn't count)
+                tracker.reset_window()
+            tracker.step(angles, timestamp)
+            if (returned and tracker.pending) or (i in reps and tracker.closes_on_trigger):
+                completed.append(self._close(i, tracker, timestamp))
+            elif i in reps:
+                tracker.pending = True
+        return completed
+
+    def _close(self, i, tracker, timestamp):
+        row = tracker.close(timestamp)
+        self.stats[i].add(row)
+        return RepMetrics(i, self.labels[i], row)
+
+    # Relative left/right difference of the mean of a metric (0 = symmetric), or None
+    def asymmetry(self, metric='rom'):
+        if not self.asymmetry_pair:
+            return None
+        left, right = (self.stats[i] for i in self.asymmetry_pair)
+        if not left.count or not right.count:
+            return None
+        column = METRICS.index(metric)
+        a, b = left.mean[column], right.mean[column]
+        return float(abs(a - b) / max(abs(a), abs(b))) if max(abs(a), abs(b)) > 0 else 0.0
+
+    # Per-counter last rep and session averages
+    def summary(self):
+        counters = {}
+        for label, stats in zip(self.labels, self.stats):
+            if stats is None or not stats.count:
+                continue
+            counters[label] = {
+                'reps': stats.count,
+                'last': dict(zip(METRICS, np.round(stats.last(), 3).tolist())),
+                'mean': dict(zip(METRICS, np.round(stats.mean, 3).tolist())),
+                'std': dict(zip(METRICS, np.round(stats.std(), 3).tolist())),
+            }
+        result = {'counters': counters}
+        if self.asymmetry_pair:
+            result['asymmetry'] = {metric: self.asymmetry(metric) for metric in ('rom', 'tut')}
+        return result
+
+    # Short HUD lines: the last rep of each counter, then the left/right asymmetry
+    def hud_lines(self):
+        lines = []
+        for label, stats in zip(self.labels, self.stats):
+            if stats is None or not stats.count:
+                continue
+            last = stats.last()
+            lines.append(f"{label.replace(' Count', '')}: ROM {last[ROM]:.0f} deg  "
+                         f"up {last[CONCENTRIC]:.1f}s down {last[ECCENTRIC]:.1f}s  TUT {last[TUT]:.1f}s")
+        asymmetry = self.asymmetry()
+        if asymmetry is not None:
+            lines.append(f"L/R ROM asymmetry {asymmetry * 100:.0f}%")
+        return lines
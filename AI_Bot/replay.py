@@ -0,0 +1,83 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from landmark_array import joint_angles
+from landmark_log import load_recording
+from exercise_rules import EXERCISES, ExerciseSession
+from motion_model import LandmarkPredictor, simulate_stride
+
+
+# Feed recorded landmarks back through the exercise rules (no video, camera or pose model needed).
+# Landmarks are converted and their joint angles computed a chunk at a time in one vectorized call.
+# With stride > 1 only every stride-th frame is used and the rest are extrapolated, as in the
+# live --stride mode.
+def replay(records, exercise, chunk_size=65536, stride=1):
+    session = ExerciseSession(exercise)
+    predictor = LandmarkPredictor() if stride > 1 else None
+    labels = session.labels()
+    reps = []
+    frames_with_pose = 0
+    started = time.perf_counter()
+
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        times = np.asarray(chunk['time'])
+        landmarks = np.asarray(chunk['landmarks'], dtype=np.float32)
+        if predictor:
+            landmarks = simulate_stride(times, landmarks, stride, predictor, start)
+        angles = joint_angles(landmarks)
+        valid = np.flatnonzero(~np.isnan(landmarks[:, 0, 0]))
+        frames_with_pose += len(valid)
+
+        for i in valid:
+            update = session.update(landmarks[i], angles[i])
+            for counter in update.reps:
+                reps.append({'counter': labels[counter], 'count': session.counts[counter],
+                             'frame': start + int(i), 'time': round(float(times[i]), 3)})
+
+    elapsed = time.perf_counter() - started
+    return {
+        'exercise': exercise,
+        'stride': stride,
+        'counts': dict(zip(labels, session.counts)),
+        'reps': reps,
+        'frames': len(records),
+        'frames_with_pose': frames_with_pose,
+        'replay_seconds': round(elapsed, 3),
+        'frames_per_minute': round(len(records) / elapsed * 60) if elapsed > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a landmark recording through the rep counters.')
+    parser.add_argument('recording', help='File written by aifitnesscoach.py --record')
+    parser.add_argument('--exercise', choices=sorted(EXERCISES), help='Override the exercise stored in the recording')
+    parser.add_argument('--stride', type=int, default=1, help='Use every Nth frame and extrapolate the rest')
+    parser.add_argument('--json', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    recorded_exercise, records = load_recording(args.recording)
+    exercise = args.exercise or recorded_exercise
+    if exercise not in EXERCISES:
+        parser.error("Recording has no known exercise; pass --exercise")
+
+    results = replay(records, exercise, stride=args.stride)
+    if args.stride > 1:
+        # Check the strided counts against using every frame
+        reference = replay(records, exercise)
+        results['every_frame_counts'] = reference['counts']
+        results['counts_match'] = reference['counts'] == results['counts']
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
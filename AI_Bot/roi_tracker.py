@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+
+
+# Runs pose inference on a padded square around the person found in the previous frame instead of
+# the whole camera frame, downscaled to a fixed input size. Landmarks are mapped back to full-frame
+# normalized coordinates in place, so callers see the same results as from pose.process().
+# When the person is lost (no pose, or too few confident landmarks) it falls back to the full frame.
+#
+# The pose graph tracks the person from one frame's landmarks to the next, which only works while it
+# keeps seeing the same region. So the crop stays put until the person comes within `margin` (a
+# fraction of its side) of its edge or shrinks below `min_fill` of it, and the graph's tracking
+# state is reset whenever the region it sees does change (crop moved, or crop <-> full frame).
+class RoiPoseTracker:
+    def __init__(self, pose, padding=0.3, input_size=384, min_visibility=0.5, min_visible=8, max_roi_fraction=0.8,
+                 margin=0.1, min_fill=0.6):
+        self.pose = pose
+        self.padding = padding
+        self.input_size = input_size
+        self.min_visibility = min_visibility
+        self.min_visible = min_visible
+        self.max_roi_fraction = max_roi_fraction
+        self.margin = margin
+        self.min_fill = min_fill
+        self.roi = None
+        self.region = None  # what the graph saw last: a crop, or None for the full frame
+        self.crop_buffer = None
+        self.full_frames = 0
+        self.roi_frames = 0
+        self.lost = 0
+        self.moves = 0
+
+    def reset(self):
+        self.roi = None
+
+    def process(self, rgb_frame):
+        height, width = rgb_frame.shape[:2]
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            crop = rgb_frame[y0:y1, x0:x1]
+            if self.input_size and crop.shape[0] > self.input_size:
+                # Bilinear like the model's own resize; INTER_AREA costs more here than the crop saves
+                crop = cv2.resize(crop, (self.input_size, self.input_size), dst=self.crop_buffer, interpolation=cv2.INTER_LINEAR)
+                self.crop_buffer = crop
+            else:
+                # The slice is a view into the frame, and the graph only takes contiguous images
+                if self.crop_buffer is None or self.crop_buffer.shape != crop.shape:
+                    self.crop_buffer = np.empty(crop.shape, dtype=crop.dtype)
+                np.copyto(self.crop_buffer, crop)
+                crop = self.crop_buffer
+            results = self._process(crop, self.roi)
+            if results.pose_landmarks and self._map_to_frame(results.pose_landmarks, width, height):
+                self.roi_frames += 1
+                return results
+            # Tracking lost: retry this frame on the full image
+            self.lost += 1
+            self.roi = None
+
+        results = self._process(rgb_frame, None)
+        self.full_frames += 1
+        if results.pose_landmarks:
+            self._update_roi(results.pose_landmarks, width, height)
+        return results
+
+    def _process(self, image, region):
+        if region != self.region:
+            self.region = region
+            self.moves += 1
+            reset = getattr(self.pose, 'reset', None)
+            if reset:
+                reset()
+        return self.pose.process(image)
+
+    def _map_to_frame(self, pose_landmarks, width, height):
+        x0, y0, x1, y1 = self.roi
+        scale_x = (x1 - x0) / width
+        scale_y = (y1 - y0) / height
+        offset_x = x0 / width
+        offset_y = y0 / height
+        for lm in pose_landmarks.landmark:
+            lm.x = lm.x * scale_x + offset_x
+            lm.y = lm.y * scale_y + offset_y
+            lm.z = lm.z * scale_x
+        return self._update_roi(pose_landmarks, width, height)
+
+    # Padded square around the confident landmarks; returns False when they can't be trusted
+    def _update_roi(self, pose_landmarks, width, height):
+        points = np.array([(lm.x, lm.y, lm.visibility) for lm in pose_landmarks.landmark], dtype=np.float32)
+        visible = points[points[:, 2] >= self.min_visibility]
+        if len(visible) < self.min_visible:
+            self.roi = None
+            return False
+
+        x_min, y_min = visible[:, 0].min() * width, visible[:, 1].min() * height
+        x_max, y_max = visible[:, 0].max() * width, visible[:, 1].max() * height
+        side = max(x_max - x_min, y_max - y_min) * (1 + 2 * self.padding)
+        if self.roi is not None and self._fits(x_min, y_min, x_max, y_max, side, width, height):
+            return True
+        side = int(min(side, width, height))
+        center_x, center_y = (x_min + x_max) / 2, (y_min + y_max) / 2
+        x0 = int(np.clip(center_x - side / 2, 0, width - side))
+        y0 = int(np.clip(center_y - side / 2, 0, height - side))
+
+        # Not worth cropping when the person already fills most of the frame
+        if side * side > self.max_roi_fraction * width * height:
+            self.roi = None
+        else:
+            self.roi = (x0, y0, x0 + side, y0 + side)
+        return True
+
+    # Whether the current crop still frames the person: clear of its edges (those not on the frame
+    # border) by the margin, and not much bigger than a fresh crop would be
+    def _fits(self, x_min, y_min, x_max, y_max, side, width, height):
+        x0, y0, x1, y1 = self.roi
+        keep = (x1 - x0) * self.margin
+        return ((x0 == 0 or x_min >= x0 + keep) and (y0 == 0 or y_min >= y0 + keep) and
+                (x1 == width or x_max <= x1 - keep) and (y1 == height or y_max <= y1 - keep) and
+                side >= (x1 - x0) * self.min_fill)
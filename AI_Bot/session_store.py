@@ -0,0 +1,282 @@
+import argparse
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+
+# Workout history in SQLite: one row per session, rep and feedback onset.
+# Writers only put tuples on a queue; a background thread commits them in batches (one transaction
+# per batch), so the frame loop never touches the disk. Reads use their own connection (WAL mode
+# lets them run alongside the writer) and aggregate from the sessions table, which carries each
+# session's day and totals so month-sized calendar queries don't touch the per-rep rows.
+#
+#   python session_store.py --month 2026-10         # per-day summary for the calendar
+#   python session_store.py --benchmark --db /tmp/history.db   # fill a year of synthetic history and time queries
+
+DEFAULT_PATH = 'workout_history.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    exercise TEXT NOT NULL,
+    day TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    reps INTEGER NOT NULL DEFAULT 0,
+    counts TEXT
+);
+CREATE INDEX IF NOT EXISTS sessions_day ON sessions (day);
+CREATE TABLE IF NOT EXISTS reps (
+    session_id TEXT NOT NULL,
+    time REAL NOT NULL,
+    counter TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reps_session ON reps (session_id);
+CREATE TABLE IF NOT EXISTS feedback (
+    session_id TEXT NOT NULL,
+    time REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS feedback_session ON feedback (session_id);
+"""
+
+_STATEMENTS = {
+    'session': "INSERT INTO sessions (id, exercise, day, started_at) VALUES (?, ?, ?, ?)",
+    'rep': "INSERT INTO reps (session_id, time, counter, count) VALUES (?, ?, ?, ?)",
+    'feedback': "INSERT INTO feedback (session_id, time, message) VALUES (?, ?, ?)",
+    'end': "UPDATE sessions SET ended_at = ?, reps = ?, counts = ? WHERE id = ?",
+}
+
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class SessionStore:
+    def __init__(self, path=DEFAULT_PATH, batch_size=256, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        connection = connect(path)
+        connection.executescript(SCHEMA)
+        connection.close()
+        self.reader = None
+        self.pending = queue.Queue()
+        self.written = 0
+        self.batches = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._write_loop, name='session-store', daemon=True)
+        self.thread.start()
+
+    # Writes: all non-blocking, committed by the background thread
+
+    def start_session(self, exercise, started_at=None):
+        started_at = time.time() if started_at is None else started_at
+        session_id = uuid.uuid4().hex
+        day = datetime.date.fromtimestamp(started_at).isoformat()
+        self.pending.put(('session', (session_id, exercise, day, started_at)))
+        return session_id
+
+    def record_rep(self, session_id, counter, count, at=None):
+        self.pending.put(('rep', (session_id, time.time() if at is None else at, counter, count)))
+
+    def record_feedback(self, session_id, message, at=None):
+        self.pending.put(('feedback', (session_id, time.time() if at is None else at, message)))
+
+    def end_session(self, session_id, counts, ended_at=None):
+        ended_at = time.time() if ended_at is None else ended_at
+        total = sum(counts.values())
+        counts_text = ', '.join(f'{label}: {count}' for label, count in counts.items())
+        self.pending.put(('end', (ended_at, total, counts_text, session_id)))
+
+    # Wait for everything queued so far to be committed; returns False if the writer has stopped
+    # (see error) or it took longer than timeout seconds
+    def flush(self, timeout=None):
+        done = threading.Event()
+        self.pending.put(('flush', done))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done.wait(0.1):
+            if not self.thread.is_alive() or (deadline is not None and time.monotonic() >= deadline):
+                return done.is_set()
+        return True
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def _write_loop(self):
+        try:
+            self._write_batches()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print("Workout history stopped saving: " + self.error)
+
+    def _write_batches(self):
+        connection = connect(self.path)
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None and batch[-1][0] != 'flush':
+                try:
+                    batch.append(self.pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            # Consecutive rows for the same statement become one executemany
+            waiters = []
+            groups = []
+            for item in batch:
+                if item is None:
+                    running = False
+                elif item[0] == 'flush':
+                    waiters.append(item[1])
+                elif groups and groups[-1][0] == item[0]:
+                    groups[-1][1].append(item[1])
+                else:
+                    groups.append((item[0], [item[1]]))
+            try:
+                with connection:
+                    for kind, rows in groups:
+                        connection.executemany(_STATEMENTS[kind], rows)
+                self.written += sum(len(rows) for _, rows in groups)
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.error = str(e)
+                print("Could not save workout history: " + str(e))
+            finally:
+                # Even if the writer is going down, whoever flushed has its answer
+                for waiter in waiters:
+                    waiter.set()
+        connection.close()
+
+    # Queries
+
+    def _read(self, sql, args=()):
+        if self.reader is None:
+            self.reader = connect(self.path)
+            self.reader.row_factory = sqlite3.Row
+        return [dict(row) for row in self.reader.execute(sql, args)]
+
+    # Per-day totals for the calendar: [{day, exercise, sessions, reps, seconds}]
+    def daily_summary(self, first_day, last_day):
+        return self._read(
+            "SELECT day, exercise, COUNT(*) AS sessions, SUM(reps) AS reps, "
+            "ROUND(SUM(COALESCE(ended_at, started_at) - started_at), 1) AS seconds "
+            "FROM sessions WHERE day BETWEEN ? AND ? GROUP BY day, exercise ORDER BY day, exercise",
+            (str(first_day), str(last_day)))
+
+    def month_summary(self, year, month):
+        first = datetime.date(year, month, 1)
+        last = (first + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+        return self.daily_summary(first, last)
+
+    def sessions(self, first_day, last_day):
+        return self._read("SELECT * FROM sessions WHERE day BETWEEN ? AND ? ORDER BY started_at",
+                          (str(first_day), str(last_day)))
+
+    def session_reps(self, session_id):
+        return self._read("SELECT time, counter, count FROM reps WHERE session_id = ? ORDER BY time", (session_id,))
+
+    def session_feedback(self, session_id):
+        return self._read("SELECT time, message FROM feedback WHERE session_id = ? ORDER BY time", (session_id,))
+
+
+# Feeds one workout's per-frame exercise updates into the store: every rep, and each form message
+# when it starts applying (the rules fire on every frame they hold).
+# The counts passed to update() are the caller's running totals, which carry on when the user comes
+# back to an exercise; start() takes the totals at that point so the session only stores its own reps.
+class SessionLogger:
+    def __init__(self, store):
+        self.store = store
+        self.session_id = None
+        self.exercise = None
+        self.baseline = []
+        self.counts = []
+        self.active = set()
+
+    def start(self, exercise, counts=None):
+        self.finish()
+        self.exercise = exercise
+        self.baseline = list(counts) if counts is not None else [0] * len(exercise.counters)
+        self.counts = [0] * len(exercise.counters)
+        self.active = set()
+        self.session_id = self.store.start_session(exercise.name)
+
+    def update(self, exercise, update, counts):
+        self.counts[:] = [count - start for count, start in zip(counts, self.baseline)]
+        for i in update.reps:
+            self.store.record_rep(self.session_id, exercise.counters[i]['label'], self.counts[i])
+        messages = {rule['message'] for rule in update.messages}
+        for message in messages - self.active:
+            self.store.record_feedback(self.session_id, message)
+        self.active = messages
+
+    def finish(self):
+        if self.session_id is None:
+            return
+        labels = [counter['label'] for counter in self.exercise.counters]
+        self.store.end_session(self.session_id, dict(zip(labels, self.counts)))
+        self.session_id = None
+
+
+# A year of plausible history: a session or two most days, a rep every few seconds
+def fill_synthetic(store, days=365, seed=0):
+    import random
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    exercises = ['pushups', 'squats', 'bicep curl', 'lunges', 'overhead dumbbell press']
+    for offset in range(days, 0, -1):
+        day = today - datetime.timedelta(days=offset)
+        start = time.mktime(day.timetuple()) + 18 * 3600
+        for _ in range(rng.choice([0, 1, 1, 2])):
+            exercise = rng.choice(exercises)
+            session_id = store.start_session(exercise, start)
+            reps = rng.randint(10, 40)
+            for rep in range(1, reps + 1):
+                store.record_rep(session_id, 'Count', rep, start + rep * 3)
+                if rng.random() < 0.3:
+                    store.record_feedback(session_id, 'Go lower!', start + rep * 3 + 1)
+            store.end_session(session_id, {'Count': reps}, start + reps * 3 + 5)
+            start += reps * 3 + 600
+    store.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the workout history.')
+    parser.add_argument('--db', default=DEFAULT_PATH)
+    parser.add_argument('--month', help='YYYY-MM: per-day summary for that month (default: this month)')
+    parser.add_argument('--benchmark', action='store_true', help='Fill a year of synthetic history and time writes and queries')
+    args = parser.parse_args()
+
+    store = SessionStore(args.db)
+    if args.benchmark:
+        started = time.perf_counter()
+        fill_synthetic(store)
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {store.written} rows in {store.batches} batches, {elapsed:.2f}s ({store.written / elapsed:.0f} rows/s)")
+        today = datetime.date.today()
+        for label, first in (('month', today.replace(day=1)), ('year', today - datetime.timedelta(days=365))):
+            started = time.perf_counter()
+            for _ in range(100):
+                rows = store.daily_summary(first, today)
+            print(f"{label} summary: {len(rows)} rows, {(time.perf_counter() - started) / 100 * 1000:.2f} ms per query")
+    else:
+        year, month = map(int, args.month.split('-')) if args.month else (datetime.date.today().year, datetime.date.today().month)
+        for row in store.month_summary(year, month):
+            print(f"{row['day']}  {row['exercise']:24} {row['sessions']} sessions, {row['reps']} reps, {row['seconds']:.0f}s")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
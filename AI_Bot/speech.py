@@ -0,0 +1,108 @@
+import collections
+import threading
+import time
+
+
+# Background text-to-speech worker so the video loop never waits on audio.
+# The pyttsx3 engine is created and driven entirely from the worker thread
+# (some drivers, e.g. SAPI5 on Windows, only work from the thread that created them).
+class SpeechWorker:
+    def __init__(self, rate=120, voice_index=1, max_pending=2, engine_factory=None):
+        self.rate = rate
+        self.voice_index = voice_index
+        self.max_pending = max_pending
+        self.engine_factory = engine_factory
+        self.pending = collections.deque()
+        self.condition = threading.Condition()
+        self.interrupt_requested = False
+        self.running = False
+        self.thread = None
+        self.dropped = 0
+        self.spoken = 0
+
+    # Start the worker (and with it the speech engine) ahead of the first phrase
+    def start(self):
+        with self.condition:
+            if not self.running:
+                self._start()
+
+    # Queue a phrase without blocking; the oldest pending phrase is dropped when full
+    def say(self, text, interrupt=False):
+        with self.condition:
+            if not self.running:
+                self._start()
+            if interrupt:
+                self.dropped += len(self.pending)
+                self.pending.clear()
+                self.interrupt_requested = True
+            elif len(self.pending) >= self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append(text)
+            self.condition.notify()
+
+    # Drop everything that has not been spoken yet and cut off the current phrase
+    def interrupt(self):
+        with self.condition:
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            self.interrupt_requested = True
+            self.condition.notify()
+
+    def close(self, timeout=1.0):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def _start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='speech-worker', daemon=True)
+        self.thread.start()
+
+    def _create_engine(self):
+        if self.engine_factory is not None:
+            return self.engine_factory()
+        import pyttsx3
+        engine = pyttsx3.init()
+        engine.setProperty('rate', self.rate)  # Set the speed of the speech
+        voices = engine.getProperty('voices')
+        if len(voices) > self.voice_index:
+            engine.setProperty('voice', voices[self.voice_index].id)  # Set a different voice if available
+        return engine
+
+    def _run(self):
+        try:
+            engine = self._create_engine()
+        except Exception as e:
+            print("Error: Could not start text-to-speech engine: " + str(e))
+            with self.condition:
+                self.pending.clear()
+            return
+
+        # Drive the engine's event loop ourselves so we can interleave new phrases and interrupts
+        engine.startLoop(False)
+        try:
+            while True:
+                with self.condition:
+                    while self.running and not self.pending and not self.interrupt_requested and not engine.isBusy():
+                        self.condition.wait()
+                    if not self.running:
+                        break
+                    interrupt = self.interrupt_requested
+                    self.interrupt_requested = False
+                    text = None
+                    if not engine.isBusy() or interrupt:
+                        text = self.pending.popleft() if self.pending else None
+
+                if interrupt:
+                    engine.stop()
+                if text is not None:
+                    engine.say(text)
+                    self.spoken += 1
+                engine.iterate()
+                time.sleep(0.01)
+        finally:
+            engine.endLoop()
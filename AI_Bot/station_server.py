@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from landmark_array import landmarks_to_array
+from exercise_rules import EXERCISES, ExerciseSession
+from pipeline import FramePacket
+
+
+# Server mode for a gym with several stations: one process reads N cameras (or video files standing
+# in for them), each with its own exercise session, and a shared pool of pose workers serves them.
+#
+#   python station_server.py --station 0 squats --station 1 "bicep curl" 10 --workers 2
+#   python station_server.py --station a.mp4 squats --station b.mp4 lunges --json stations.json
+#
+# Each station keeps only its newest frame ("latest frame wins"). Workers take the station that is
+# most overdue against its own FPS target, so a busy station can't starve the others and a
+# station never has more than one frame in flight.
+
+
+# One camera (or video file) and everything the server tracks for it. Latencies are kept for the
+# last `latency_window` inferred frames in a ring buffer, so a station that runs for days doesn't grow.
+class Station:
+    def __init__(self, name, source, exercise, target_fps=15.0, realtime=True, latency_window=1024):
+        if exercise not in EXERCISES:
+            raise ValueError("Unknown exercise: " + exercise)
+        self.name = name
+        self.source = source
+        self.session = ExerciseSession(exercise)
+        self.interval = 1.0 / target_fps if target_fps else 0.0
+        self.realtime = realtime
+        self.cap = None
+        self.pose = None  # Pose graphs keep tracking state, so each station gets its own
+        self.latest = None
+        self.busy = False
+        self.finished = False
+        self.next_due = 0.0
+        self.error = None
+        self.rgb_frame = None
+        self.landmarks = np.empty((33, 4), dtype=np.float32)
+        self.captured = 0
+        self.inferred = 0
+        self.dropped = 0
+        self.frames_with_pose = 0
+        self.latencies = np.zeros(latency_window)
+        self.started_at = None
+        self.finished_at = None
+
+    def report(self):
+        elapsed = (self.finished_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        latencies = self.latencies[:min(self.inferred, len(self.latencies))] * 1000.0
+        return {
+            'station': self.name,
+            'source': self.source,
+            'exercise': self.session.name,
+            'counts': dict(zip(self.session.labels(), self.session.counts)),
+            'captured': self.captured,
+            'inferred': self.inferred,
+            'dropped': self.dropped,
+            'frames_with_pose': self.frames_with_pose,
+            'fps': round(self.inferred / elapsed, 2) if elapsed > 0 else 0.0,
+            'latency_p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            'latency_p95_ms': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+            'error': self.error,
+        }
+
+
+def open_source(source):
+    return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+
+
+class StationServer:
+    def __init__(self, stations, workers=None, pose_factory=None, on_rep=None):
+        if pose_factory is None:
+            from process_video import create_pose
+            pose_factory = create_pose
+        self.stations = stations
+        self.workers = workers or min(len(stations), os.cpu_count() or 1)
+        self.pose_factory = pose_factory
+        self.on_rep = on_rep
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        for station in self.stations:
+            station.cap = open_source(station.source)
+            if not station.cap.isOpened():
+                station.error = "Could not open source"
+                station.finished = True
+                continue
+            station.started_at = time.perf_counter()
+            self.threads.append(threading.Thread(target=self._capture_loop, args=(station,), name=f'capture-{station.name}', daemon=True))
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self._worker_loop, name=f'pose-worker-{i}', daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join(2.0)
+        self.threads = []
+        for station in self.stations:
+            if station.cap is not None:
+                station.cap.release()
+            if station.pose is not None:
+                station.pose.close()
+                station.pose = None
+
+    # Serve until every source has ended (or `duration` seconds have passed)
+    def run(self, duration=None):
+        self.start()
+        deadline = time.perf_counter() + duration if duration else None
+        try:
+            while not self.stop_event.is_set() and any(thread.is_alive() for thread in self.threads):
+                if deadline and time.perf_counter() >= deadline:
+                    break
+                time.sleep(0.1)
+        finally:
+            self.stop()
+        return [station.report() for station in self.stations]
+
+    def _capture_loop(self, station):
+        cap = station.cap
+        frame_time = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0)
+        next_frame = time.perf_counter()
+        index = 0
+        while not self.stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            with self.condition:
+                if not station.realtime:
+                    # Offline: wait for the workers instead of dropping frames
+                    while station.latest is not None and not self.stop_event.is_set():
+                        self.condition.wait(0.1)
+                elif station.latest is not None:
+                    station.dropped += 1
+                station.latest = FramePacket(index, frame, time.perf_counter())
+                station.captured += 1
+                self.condition.notify_all()
+            index += 1
+
+            # Video files stand in for cameras by delivering frames at their recorded rate
+            if station.realtime and not isinstance(station.source, int) and not str(station.source).isdigit():
+                next_frame += frame_time
+                delay = next_frame - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame = time.perf_counter()
+
+        with self.condition:
+            station.finished = True
+            self.condition.notify_all()
+
+    # Earliest-deadline-first over the stations that have a frame waiting and none in flight
+    def _next_job(self):
+        with self.condition:
+            while not self.stop_event.is_set():
+                now = time.perf_counter()
+                ready = [station for station in self.stations if station.latest is not None and not station.busy]
+                due = [station for station in ready if station.next_due <= now]
+                if due:
+                    station = min(due, key=lambda s: s.next_due)
+                    packet, station.latest = station.latest, None
+                    station.busy = True
+                    station.next_due = max(station.next_due + station.interval, now)
+                    self.condition.notify_all()
+                    return station, packet
+                if all(station.finished and station.latest is None for station in self.stations):
+                    return None
+                wait = min((station.next_due - now for station in ready), default=0.1)
+                self.condition.wait(min(max(wait, 0.001), 0.1))
+        return None
+
+    def _worker_loop(self):
+        # Several workers already run in parallel; keep OpenCV from adding threads of its own
+        cv2.setNumThreads(1)
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            station, packet = job
+            try:
+                self._process(station, packet)
+            except Exception as e:
+                station.error = f"{type(e).__name__}: {e}"
+                print(f"{station.name}: pose estimation failed: {e}")
+            finally:
+                with self.condition:
+                    station.busy = False
+                    self.condition.notify_all()
+
+    def _process(self, station, packet):
+        if station.pose is None:
+            station.pose = self.pose_factory()
+        station.rgb_frame = cv2.cvtColor(packet.frame, cv2.COLOR_BGR2RGB, dst=station.rgb_frame)
+        results = station.pose.process(station.rgb_frame)
+        station.latencies[station.inferred % len(station.latencies)] = time.perf_counter() - packet.captured_at
+        station.inferred += 1
+        station.finished_at = time.perf_counter()
+        if not results.pose_landmarks:
+            return
+
+        station.frames_with_pose += 1
+        update = station.session.update(landmarks_to_array(results.pose_landmarks, station.landmarks))
+        if self.on_rep:
+            for i in update.reps:
+                self.on_rep(station, station.session.labels()[i], station.session.counts[i])
+
+
+def print_rep(station, label, count):
+    print(f"[{station.name}] {label}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve several camera stations from one process.')
+    parser.add_argument('--station', nargs='+', action='append', required=True, metavar='ARG',
+                        help='SOURCE EXERCISE [FPS]: camera index or video file, its exercise and optional target FPS')
+    parser.add_argument('--workers', type=int, default=None, help='Pose worker threads (default: one per station, up to one per core)')
+    parser.add_argument('--fps', type=float, default=15.0, help='Default per-station target FPS')
+    parser.add_argument('--model-complexity', type=int, default=1, choices=[0, 1, 2])
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds')
+    parser.add_argument('--fast', action='store_true', help='Process video files as fast as possible, without dropping frames')
+    parser.add_argument('--json', help='Write the per-station report as JSON to this file')
+    args = parser.parse_args()
+
+    stations = []
+    for i, spec in enumerate(args.station):
+        if len(spec) not in (2, 3):
+            parser.error("--station takes SOURCE EXERCISE [FPS]")
+        if spec[1] not in EXERCISES:
+            parser.error(f"Unknown exercise {spec[1]!r}; choose from {', '.join(sorted(EXERCISES))}")
+        fps = float(spec[2]) if len(spec) == 3 else args.fps
+        stations.append(Station(f'station-{i + 1}', spec[0], spec[1], target_fps=None if args.fast else fps, realtime=not args.fast))
+
+    from process_video import create_pose
+    server = StationServer(stations, args.workers, lambda: create_pose(args.model_complexity), on_rep=print_rep)
+    reports = server.run(args.duration)
+
+    for report in reports:
+        counts = ', '.join(f'{label} {count}' for label, count in report['counts'].items())
+        status = f" ERROR {report['error']}" if report['error'] else ''
+        print(f"{report['station']} ({report['exercise']}): {counts} | {report['inferred']}/{report['captured']} frames, "
+              f"{report['fps']} fps, p50 latency {report['latency_p50_ms']} ms{status}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
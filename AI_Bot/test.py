@@ -2,8 +2,8 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import speech_recognition as sr
-from gtts import gTTS
-import os
+from phrase_cache import PhraseCache
+from feedback_bus import AudioSink, FeedbackBus
 
 # Initialize mediapipe pose class and drawing utilities
 mp_pose = mp.solutions.pose
@@ -21,14 +21,15 @@ def calculate_angle(a, b, c):
         angle = 360 - angle
     return angle
 
+# Synthesized phrases are cached on disk and in memory (see phrase_cache.py)
+phrases = PhraseCache()
+
 # Function to convert text to speech
 def text_to_speech(text):
-    language = 'en'
-    output = gTTS(text=text, lang=language, slow=False)
-    output_file = "output.mp3"
-    output.save(output_file)
-    os.system(f"start {output_file}")  # On Windows, this will play the audio.
-    os.remove(output_file)
+    phrases.say(text)
+
+# Detectors emit spoken cues every frame; the bus rate-limits them (see feedback_bus.py)
+feedback = FeedbackBus([AudioSink(lambda text, interrupt=False: text_to_speech(text))])
 
 # Function to draw text with a shadow for better visibility
 def put_text_with_shadow(img, text, position, font_scale, color, shadow_color, thickness=2):
@@ -118,10 +119,10 @@ def detect_pushups(landmarks, frame, pushup_count, stage):
     form_correct = True
     if hip[1] < shoulder[1] - 0.05:
         form_correct = False
-        text_to_speech(f"Lower your hips")
+        feedback.emit('form', "Lower your hips", show=False, speak=True)
     if hip[1] > shoulder[1] + 0.05:
         form_correct = False
-        text_to_speech(f"Raise your hips")
+        feedback.emit('form', "Raise your hips", show=False, speak=True)
     
     # Push-up logic
     if elbow_angle > 160 and form_correct:
@@ -133,7 +134,7 @@ def detect_pushups(landmarks, frame, pushup_count, stage):
     # Display push-up count
     cv2.putText(frame, f'Push-ups: {pushup_count}', (50, 50), 
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-    text_to_speech({pushup_count})
+    feedback.emit('count', str(pushup_count), show=False, speak=True)
     
     return pushup_count, stage
 
@@ -160,12 +161,12 @@ def detect_squats(landmarks, frame, squat_count, stage):
     # Check for not going low enough (knee angle > 90)
     if knee_angle > 90:
         form_correct = False
-        text_to_speech(f"Go lower")
+        feedback.emit('form', "Go lower", show=False, speak=True)
 
     # Check for leaning forward too much (torso angle < 75)
     if torso_angle < 75:
         form_correct = False
-        text_to_speech(f"Keep your torso upright")
+        feedback.emit('form', "Keep your torso upright", show=False, speak=True)
 
     # Squat logic: count rep when knee angle goes below 90 and form is correct
     if knee_angle > 160:
@@ -177,7 +178,7 @@ def detect_squats(landmarks, frame, squat_count, stage):
     # Display squat count
     cv2.putText(frame, f'Squats: {squat_count}', (50, 50), 
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-    text_to_speech({squat_count})
+    feedback.emit('count', str(squat_count), show=False, speak=True)
     
     return squat_count, stage
 
@@ -205,12 +206,12 @@ def detect_bicep_curls(landmarks, frame, curl_count, stage):
     # Check if elbow moves too much vertically (stability)
     if abs(shoulder[1] - elbow[1]) > 0.05:  # Example threshold for stability
         form_correct = False
-        text_to_speech(f"Keep elbows stable")
+        feedback.emit('form', "Keep elbows stable", show=False, speak=True)
     
     # Display bicep curl count
     cv2.putText(frame, f'Bicep Curls: {curl_count}', (50, 50), 
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-    text_to_speech({curl_count})
+    feedback.emit('count', str(curl_count), show=False, speak=True)
 
     return curl_count, stage
 
@@ -275,11 +276,13 @@ def main():
     # Define the current exercise (pushups by default)
     current_exercise = selected_workout  # You can change this dynamically
 
+    # Camera frame and its RGB copy are reused every iteration
+    frame = rgb_frame = None
     while cap.isOpened():
-        ret, frame = cap.read()
+        ret, frame = cap.read(frame)
         
         # Recolor the image to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
         results = pose.process(rgb_frame)
 
         # Draw pose landmarks
@@ -297,6 +300,7 @@ def main():
                 curl_count, curl_stage = detect_bicep_curls(landmarks, frame, curl_count, curl_stage)
             elif current_exercise == "lunges":
                 lunge_count, lunge_stage = detect_lunges(landmarks, frame, lunge_count, lunge_stage)
+            feedback.flush()
 
         cv2.imshow('Fitness Coach', frame)
 
@@ -0,0 +1,69 @@
+import aifitnesscoach
+from background_loader import BackgroundLoader
+
+
+class FakePose:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSpeech:
+    def __init__(self):
+        self.started = self.closed = False
+
+    def start(self):
+        self.started = True
+
+    def close(self):
+        self.closed = True
+
+
+class ClosedCamera:
+    def __init__(self, index):
+        self.released = False
+        cameras.append(self)
+
+    def isOpened(self):
+        return False
+
+    def release(self):
+        self.released = True
+
+
+cameras = []
+
+
+# Runs main() up to an early exit with the camera, speech and pose model swapped for fakes
+def run_main(monkeypatch, workout):
+    pose = FakePose()
+    speech = FakeSpeech()
+    cameras.clear()
+
+    def pick_workout(voice=None):
+        aifitnesscoach.selected_workout = workout
+
+    monkeypatch.setattr(aifitnesscoach, 'pose_loader', BackgroundLoader(lambda: pose, name='pose-loader'))
+    monkeypatch.setattr(aifitnesscoach, 'speech', speech)
+    monkeypatch.setattr(aifitnesscoach, 'display_intro', pick_workout)
+    monkeypatch.setattr(aifitnesscoach.cv2, 'VideoCapture', ClosedCamera)
+    monkeypatch.setattr(aifitnesscoach.cv2, 'destroyAllWindows', lambda: None)
+    aifitnesscoach.main(history_path=None)
+    return pose, speech
+
+
+def test_the_pose_model_is_closed_when_the_camera_does_not_open(monkeypatch, capsys):
+    pose, speech = run_main(monkeypatch, 'pushups')
+    assert "Could not open camera" in capsys.readouterr().out
+    assert pose.closed
+    assert cameras[0].released
+    assert speech.started and speech.closed
+
+
+def test_the_pose_model_is_closed_when_no_workout_is_picked(monkeypatch):
+    pose, speech = run_main(monkeypatch, None)
+    assert pose.closed
+    assert cameras == []
+    assert speech.closed
@@ -0,0 +1,47 @@
+import multiprocessing
+import os
+
+import pytest
+
+import batch_process
+from batch_process import run_batch
+
+# The workers are forked, so they see the fakes patched in below
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="needs forked workers")
+
+
+# Stands in for process_video in the workers: "crash" files kill the process like a native crash
+# would, "bad" files raise like an unreadable video does
+def fake_process_video(path, exercise, pose):
+    if 'crash' in path:
+        os._exit(1)
+    if 'bad' in path:
+        raise IOError("Could not open video: " + path)
+    return {'file': path, 'exercise': exercise, 'reps': [{'rep': 1}], 'speedup': 10.0, 'video_seconds': 1.0}
+
+
+@pytest.fixture
+def fake_worker(monkeypatch):
+    monkeypatch.setattr(batch_process, 'create_pose', lambda model_complexity: None)
+    monkeypatch.setattr(batch_process, 'process_video', fake_process_video)
+
+
+def test_a_crashing_worker_only_fails_its_own_file(fake_worker):
+    files = ['a.mp4', 'b.mp4', 'crash1.mp4', 'c.mp4', 'bad.mp4', 'd.mp4', 'crash2.mp4', 'e.mp4', 'f.mp4']
+    jobs = [(path, 'squats') for path in files]
+    results, failed = run_batch(jobs, workers=2, progress=None)
+
+    assert [result['file'] for result in results] == files
+    errors = {result['file']: result['error'].split(':')[0] for result in results if 'error' in result}
+    assert errors == {'crash1.mp4': 'BrokenProcessPool', 'crash2.mp4': 'BrokenProcessPool', 'bad.mp4': 'OSError'}
+    assert failed == 3
+    assert all(result['reps'] == [{'rep': 1}] for result in results if 'error' not in result)
+
+
+def test_every_job_reports_once(fake_worker):
+    progress = []
+    jobs = [('crash.mp4', 'squats')] + [(f'{i}.mp4', 'squats') for i in range(5)]
+    results, failed = run_batch(jobs, workers=3, progress=progress.append)
+    assert failed == 1
+    assert len(progress) == len(jobs)
+    assert progress[-1].startswith(f"[{len(jobs)}/{len(jobs)}]")
@@ -0,0 +1,57 @@
+import socket
+import time
+
+from event_stream import EventStreamServer, ExerciseEventPublisher
+from exercise_rules import COMPILED_EXERCISES, ExerciseUpdate
+
+
+class RecordingStream:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event_type, key=None, **fields):
+        self.events.append((event_type, fields))
+
+
+def test_rep_counts_are_per_announced_session():
+    stream = RecordingStream()
+    publisher = ExerciseEventPublisher(stream)
+    squats = COMPILED_EXERCISES['squats']
+    counts, stages = [0], ['up']
+
+    for session_reps in (10, 5):
+        publisher.start(squats, counts)
+        for _ in range(session_reps):
+            counts[0] += 1
+            publisher.update(squats, ExerciseUpdate(None, [0], [], None), counts, stages, stages)
+        publisher.finish()
+
+    sessions = [fields['counts'] for kind, fields in stream.events if kind == 'session']
+    assert sessions == [[0], [10], [0], [5]]
+    reps = [fields['count'] for kind, fields in stream.events if kind == 'rep']
+    assert reps == list(range(1, 11)) + list(range(1, 6))
+
+
+def test_a_stalled_client_is_dropped_and_counted():
+    stream = EventStreamServer(port=0, max_pending=8, send_timeout=0.3).start()
+    stalled = socket.socket()
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    try:
+        stalled.connect(stream.address)
+        stalled.sendall(b'GET /events HTTP/1.1\r\nHost: test\r\n\r\n')
+        while stream.stats()['clients'] < 1:
+            time.sleep(0.01)
+
+        # Never read: the socket buffers fill up and the handler's write stalls
+        deadline = time.perf_counter() + 10.0
+        while stream.stats()['timeouts'] == 0:
+            assert time.perf_counter() < deadline, "stalled client was never timed out"
+            stream.publish('benchmark', padding='x' * 2000)
+            time.sleep(0.005)
+
+        stats = stream.stats()
+        assert stats['clients'] == 0
+        assert stats['dropped'] > 0
+    finally:
+        stalled.close()
+        stream.close()
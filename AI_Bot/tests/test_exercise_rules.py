@@ -0,0 +1,170 @@
+import numpy as np
+import pytest
+
+from benchmark import synthetic_landmarks
+from exercise_rules import COMPILED_EXERCISES
+from landmark_array import PoseLandmark as L
+
+
+# The per-exercise detectors the rule tables replaced, minus the drawing: each takes a landmark
+# array, the counts and the stages (lists, updated in place) and returns the form messages shown.
+# The tables must count, stage and coach exactly like these.
+
+def calculate_angle(a, b, c):
+    a, b, c = np.array(a), np.array(b), np.array(c)
+    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
+    angle = np.abs(radians * 180.0 / np.pi)
+    if angle > 180.0:
+        angle = 360 - angle
+    return angle
+
+
+def point(landmarks, name):
+    return [float(landmarks[name, 0]), float(landmarks[name, 1])]
+
+
+def pushups(lm, counts, stages):
+    left_shoulder, left_elbow, left_wrist = point(lm, L.LEFT_SHOULDER), point(lm, L.LEFT_ELBOW), point(lm, L.LEFT_WRIST)
+    right_shoulder, right_elbow, right_wrist = point(lm, L.RIGHT_SHOULDER), point(lm, L.RIGHT_ELBOW), point(lm, L.RIGHT_WRIST)
+    left = calculate_angle(left_shoulder, left_elbow, left_wrist)
+    right = calculate_angle(right_shoulder, right_elbow, right_wrist)
+    messages = []
+    if left > 160 and right > 160:
+        stages[0] = 'up'
+    elif left < 90 and right < 90 and stages[0] == 'up':
+        stages[0] = 'down'
+        counts[0] += 1
+    else:
+        if left > 90 or right > 90:
+            messages.append('Go lower!')
+        if left < 90 and right < 90 and left_shoulder[1] > left_wrist[1] and right_shoulder[1] > right_wrist[1]:
+            messages.append('Keep your back straight!')
+    return messages
+
+
+def squats(lm, counts, stages):
+    left_hip, left_knee, left_ankle = point(lm, L.LEFT_HIP), point(lm, L.LEFT_KNEE), point(lm, L.LEFT_ANKLE)
+    right_hip, right_knee, right_ankle = point(lm, L.RIGHT_HIP), point(lm, L.RIGHT_KNEE), point(lm, L.RIGHT_ANKLE)
+    left = calculate_angle(left_hip, left_knee, left_ankle)
+    right = calculate_angle(right_hip, right_knee, right_ankle)
+    messages = []
+    if left > 130 and right > 130:
+        stages[0] = 'up'
+    if left < 110 and right < 110 and stages[0] == 'up':
+        stages[0] = 'down'
+        counts[0] += 1
+    if abs(left_knee[0] - left_ankle[0]) > 0.1 or abs(right_knee[0] - right_ankle[0]) > 0.1:
+        messages.append('Align knees with toes!')
+    if left > 120 or right > 120:
+        messages.append('Go lower for a full squat!')
+    if left_hip[1] > left_knee[1] or right_hip[1] > right_knee[1]:
+        messages.append('Keep your back straight!')
+    return messages
+
+
+def bicep_curls(lm, counts, stages):
+    left = calculate_angle(point(lm, L.LEFT_SHOULDER), point(lm, L.LEFT_ELBOW), point(lm, L.LEFT_WRIST))
+    right = calculate_angle(point(lm, L.RIGHT_SHOULDER), point(lm, L.RIGHT_ELBOW), point(lm, L.RIGHT_WRIST))
+    messages = []
+    if lm[L.LEFT_ELBOW, 0] > lm[L.LEFT_SHOULDER, 0] + 0.1 or lm[L.RIGHT_ELBOW, 0] > lm[L.RIGHT_SHOULDER, 0] + 0.1:
+        messages.append('Keep your elbows close to your body!')
+    if abs(lm[L.LEFT_SHOULDER, 0] - lm[L.LEFT_HIP, 0]) > 0.1 or abs(lm[L.RIGHT_SHOULDER, 0] - lm[L.RIGHT_HIP, 0]) > 0.1:
+        messages.append('Avoid swinging; keep your back straight!')
+    if left > 160 and right > 160:
+        messages.append('Lower your arm fully between reps!')
+    if abs(lm[L.LEFT_WRIST, 0] - lm[L.LEFT_ELBOW, 0]) > 0.05 or abs(lm[L.RIGHT_WRIST, 0] - lm[L.RIGHT_ELBOW, 0]) > 0.05:
+        messages.append('Keep your wrists straight!')
+    if left > 160:
+        stages[0] = 'down'
+    if left < 50 and stages[0] == 'down':
+        stages[0] = 'up'
+        counts[0] += 1
+    if right > 160:
+        stages[1] = 'down'
+    if right < 50 and stages[1] == 'down':
+        stages[1] = 'up'
+        if stages[0] != 'up':
+            counts[1] += 1
+    return messages
+
+
+def overhead_press(lm, counts, stages):
+    left_shoulder, left_elbow, left_wrist = point(lm, L.LEFT_SHOULDER), point(lm, L.LEFT_ELBOW), point(lm, L.LEFT_WRIST)
+    right_shoulder, right_elbow, right_wrist = point(lm, L.RIGHT_SHOULDER), point(lm, L.RIGHT_ELBOW), point(lm, L.RIGHT_WRIST)
+    left = calculate_angle(left_shoulder, left_elbow, left_wrist)
+    right = calculate_angle(right_shoulder, right_elbow, right_wrist)
+    messages = []
+    if left_wrist[1] < left_shoulder[1] and right_wrist[1] < right_shoulder[1]:
+        if left > 160 and right > 160 and stages[0] != 'up':
+            stages[0] = 'up'
+        elif left < 100 and right < 100 and stages[0] == 'up':
+            stages[0] = 'down'
+            counts[0] += 1
+    else:
+        stages[0] = None
+    if abs(left_wrist[0] - left_elbow[0]) > 0.1 or abs(right_wrist[0] - right_elbow[0]) > 0.1:
+        messages.append('Keep your wrists straight!')
+    halfway_line = (left_shoulder[1] + right_shoulder[1]) / 2
+    if left_wrist[1] > halfway_line and right_wrist[1] > halfway_line:
+        messages.append("Don't drop your arms!")
+    if left_wrist[1] <= halfway_line or right_wrist[1] <= halfway_line:
+        if left < 160 or right < 160:
+            messages.append('Fully extend your arms!')
+    if abs(lm[L.LEFT_HIP, 0] - left_shoulder[0]) > 0.1 or abs(lm[L.RIGHT_HIP, 0] - right_shoulder[0]) > 0.1:
+        messages.append('Maintain a straight back!')
+    return messages
+
+
+# stages/counts are [left, right] like the compiled counters
+def lunges(lm, counts, stages):
+    left_hip, left_knee, left_ankle = point(lm, L.LEFT_HIP), point(lm, L.LEFT_KNEE), point(lm, L.LEFT_ANKLE)
+    right_hip, right_knee, right_ankle = point(lm, L.RIGHT_HIP), point(lm, L.RIGHT_KNEE), point(lm, L.RIGHT_ANKLE)
+    left = calculate_angle(left_hip, left_knee, left_ankle)
+    right = calculate_angle(right_hip, right_knee, right_ankle)
+    messages = []
+    if left > 160 and right < 110:
+        stages[1] = 'down'
+    elif right > 160 and left < 110:
+        stages[0] = 'down'
+    elif left > 160 and right > 160:
+        if stages[1] == 'down':
+            counts[1] += 1
+            stages[1] = None
+        if stages[0] == 'down':
+            counts[0] += 1
+            stages[0] = None
+    if left_knee[0] > left_ankle[0] + 0.05 or right_knee[0] > right_ankle[0] + 0.05:
+        messages.append('Avoid letting your knee go past your toes!')
+    if left < 70 or right < 70:
+        messages.append('Lower your back knee toward the ground!')
+    if abs(left_hip[0] - left_knee[0]) > 0.1 or abs(right_hip[0] - right_knee[0]) > 0.1:
+        messages.append('Keep your torso upright; avoid leaning forward!')
+    return messages
+
+
+REFERENCE = {
+    'pushups': pushups,
+    'squats': squats,
+    'bicep curl': bicep_curls,
+    'overhead dumbbell press': overhead_press,
+    'lunges': lunges,
+}
+
+
+@pytest.mark.parametrize('name', sorted(REFERENCE))
+def test_compiled_tables_match_the_original_detectors(name):
+    exercise = COMPILED_EXERCISES[name]
+    detector = REFERENCE[name]
+    counters = len(exercise.counters)
+    counts, stages = [0] * counters, [None] * counters
+    expected_counts, expected_stages = [0] * counters, [None] * counters
+    shown = set()
+    for frame, landmarks in enumerate(synthetic_landmarks(3000, seed=1)):
+        update = exercise.update(landmarks, counts, stages)
+        expected = detector(landmarks, expected_counts, expected_stages)
+        assert (counts, stages) == (expected_counts, expected_stages), "frame " + str(frame)
+        assert [rule['message'] for rule in update.messages] == expected, "frame " + str(frame)
+        shown.update(expected)
+    # The walk has to exercise the counters and every form rule for the comparison to mean anything
+    assert min(counts) > 0
+    assert shown == {rule['message'] for rule in exercise.form_rules}
@@ -0,0 +1,28 @@
+from exercise_rules import EXERCISES
+from feedback_bus import FeedbackBus, ScreenSink
+
+
+def test_messages_up_at_the_same_time_get_their_own_lines():
+    drawn = []
+    bus = FeedbackBus([ScreenSink(lambda frame, text, position, color: drawn.append((text, position)))])
+    pushups = EXERCISES['pushups']
+    rep = pushups['counters'][0]['rep_message']
+    go_lower, back = pushups['form_rules']
+
+    # "Go lower!" on the way down, then the rep lands at the same spot while it is still held
+    bus.emit('form', go_lower['message'], go_lower['position'])
+    bus.emit('form', back['message'], back['position'])
+    bus.flush(frame=object(), now=0.0)
+    assert sorted(drawn) == sorted([(go_lower['message'], (50, 150)), (back['message'], (50, 200))])
+
+    drawn.clear()
+    bus.emit('rep', rep['text'], rep['position'], rep['color'])
+    bus.flush(frame=object(), now=0.2)
+    positions = dict(drawn)
+    assert positions[rep['text']] == rep['position']
+    assert len(set(positions.values())) == len(drawn) == 3
+
+    # Once the held messages expire, nothing needs to move
+    drawn.clear()
+    bus.flush(frame=object(), now=0.8)
+    assert drawn == []
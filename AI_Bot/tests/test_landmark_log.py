@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from benchmark import synthetic_landmarks
+from landmark_log import LandmarkRecorder, load_recording
+
+
+@pytest.mark.parametrize('landmark_dtype', [np.float16, np.float32])
+def test_recordings_round_trip(tmp_path, landmark_dtype):
+    path = str(tmp_path / 'session.aifc')
+    landmarks = synthetic_landmarks(50, seed=2)
+    times = np.cumsum(np.random.default_rng(2).uniform(0.02, 0.05, 50))
+    missing = np.zeros(50, dtype=bool)
+    missing[[0, 7, 8, 9, 49]] = True
+
+    with LandmarkRecorder(path, 'bicep curl', landmark_dtype) as recorder:
+        for i in range(50):
+            recorder.write(times[i], None if missing[i] else landmarks[i])
+    assert recorder.frames == 50
+
+    exercise, records = load_recording(path)
+    assert exercise == 'bicep curl'
+    assert isinstance(records, np.memmap)
+    assert len(records) == 50
+    assert np.array_equal(records['time'], times)
+    # Frames without a pose come back as NaN rows, the rest exactly as stored
+    assert np.array_equal(np.isnan(records['landmarks'][:, 0, 0]), missing)
+    assert np.isnan(records['landmarks'][missing]).all()
+    assert np.array_equal(records['landmarks'][~missing], landmarks[~missing].astype(landmark_dtype))
+
+
+def test_a_partial_last_record_is_ignored(tmp_path):
+    path = str(tmp_path / 'session.aifc')
+    with LandmarkRecorder(path, 'squats') as recorder:
+        for i in range(3):
+            recorder.write(i / 30, synthetic_landmarks(1)[0])
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 10)
+    assert len(load_recording(path)[1]) == 3
+
+
+def test_an_empty_recording_loads(tmp_path):
+    path = str(tmp_path / 'session.aifc')
+    LandmarkRecorder(path, 'squats').close()
+    exercise, records = load_recording(path)
+    assert (exercise, len(records)) == ('squats', 0)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import motion_model
+from benchmark import FixedResults, synthetic_squats
+from exercise_rules import ExerciseSession
+from landmark_array import NUM_LANDMARKS, landmarks_to_array
+from landmark_log import record_dtype
+from motion_model import LandmarkPredictor, StridedPose, to_landmark_list
+from replay import replay
+
+FPS = 30
+
+
+# 20 s of squats at 30 FPS with a second where the person is lost (NaN landmarks) in the middle
+def squat_trace():
+    times, landmarks = synthetic_squats(20, FPS)
+    landmarks[10 * FPS:11 * FPS] = np.nan
+    return times, landmarks
+
+
+def records(times, landmarks):
+    trace = np.zeros(len(times), dtype=record_dtype(np.float32))
+    trace['time'] = times
+    trace['landmarks'] = landmarks
+    return trace
+
+
+# Stands in for the time module: inference "takes" whatever the fake model says
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.mark.parametrize('stride', [2, 3])
+def test_strided_replay_counts_the_same_reps_as_every_frame(stride):
+    trace = records(*squat_trace())
+    every_frame = replay(trace, 'squats')
+    assert list(every_frame['counts'].values()) == [8]
+    assert replay(trace, 'squats', stride=stride)['counts'] == every_frame['counts']
+
+
+def test_adaptive_stride_counts_the_same_reps_as_every_frame(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(motion_model, 'time', clock)
+    times, landmarks = squat_trace()
+
+    # A model that takes 70 ms per frame needs three frames at 30 FPS
+    def process(index):
+        clock.now += 0.07
+        if np.isnan(landmarks[index, 0, 0]):
+            return FixedResults(None)
+        return FixedResults(to_landmark_list(landmarks[index]))
+
+    strided = StridedPose(process, adaptive=True, target_fps=FPS)
+    session = ExerciseSession('squats')
+    buffer = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    for i, timestamp in enumerate(times):
+        results = strided.process(i, timestamp)
+        if results.pose_landmarks:
+            session.update(landmarks_to_array(results.pose_landmarks, buffer))
+    assert strided.stride == 3
+    assert strided.predicted > strided.inferred
+    assert session.counts == list(replay(records(times, landmarks), 'squats')['counts'].values())
+
+
+def test_predictions_follow_the_capture_times(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(motion_model, 'time', clock)
+    rng = np.random.default_rng(0)
+    frame = np.full((NUM_LANDMARKS, 4), 0.5, dtype=np.float32)
+
+    # Landmarks moving at a constant 0.3/s, while inference runs whenever it gets round to a frame
+    def process(timestamp):
+        clock.now += rng.uniform(0.0, 0.05)
+        frame[:, 0] = 0.1 + 0.3 * timestamp
+        return FixedResults(to_landmark_list(frame))
+
+    strided = StridedPose(process, stride=2, predictor=LandmarkPredictor(smoothing=1.0))
+    for i in range(20):
+        timestamp = i / FPS
+        results = strided.process(timestamp, timestamp)
+        x = np.array([lm.x for lm in results.pose_landmarks.landmark])
+        # (from the second inference on, once there is a velocity to extrapolate along)
+        if i >= 2:
+            assert np.allclose(x, 0.1 + 0.3 * timestamp, atol=1e-5)
+    assert strided.predicted == 10
@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+
+import perf_controller
+from perf_controller import AdaptivePose
+
+LEVELS = [
+    {'model_complexity': 1, 'max_width': None, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+    {'model_complexity': 0, 'max_width': None, 'min_detection_confidence': 0.5, 'min_tracking_confidence': 0.5},
+]
+
+
+# Stands in for the time module: inference "takes" whatever the model says, without sleeping
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeModel:
+    def __init__(self, clock, latency):
+        self.clock = clock
+        self.latency = latency
+        self.closed = False
+        self.thread = threading.current_thread()
+
+    def process(self, rgb_frame):
+        self.clock.now += self.latency[0]
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAdaptivePose(AdaptivePose):
+    def __init__(self, clock, latencies, **kwargs):
+        self.fake_clock = clock
+        self.latencies = latencies
+        super().__init__(clock=clock.monotonic, **kwargs)
+
+    def _build(self, key):
+        return FakeModel(self.fake_clock, self.latencies[key[0]])
+
+
+def run(controller, frames):
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    for _ in range(frames):
+        controller.process(frame)
+        # Let the background builds finish before the next dwell looks at them
+        for loader in list(controller.loaders.values()):
+            loader.done.wait(5)
+
+
+def test_a_level_over_budget_is_tried_again_later(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(perf_controller, 'time', clock)
+    heavy, light = [0.1], [0.01]
+    controller = FakeAdaptivePose(clock, {1: heavy, 0: light}, target_fps=20, levels=LEVELS, start_level=0,
+                                  dwell=5, smoothing=1.0, retry_after=30.0)
+
+    run(controller, 5)
+    assert controller.level == 1
+
+    # Well under budget, but level 0 was just measured over it
+    run(controller, 50)
+    assert controller.level == 1
+
+    # Whatever slowed it down has gone; once the measurement is old enough level 0 gets another go
+    heavy[0] = 0.02
+    clock.now += 30.0
+    run(controller, 5)
+    assert controller.level == 0
+    run(controller, 50)
+    assert controller.level == 0
+
+
+def test_models_are_built_off_the_inference_thread_and_the_given_pose_is_used(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(perf_controller, 'time', clock)
+    initial = FakeModel(clock, [0.1])
+    controller = FakeAdaptivePose(clock, {0: [0.01]}, target_fps=20, levels=LEVELS, start_level=0,
+                                  dwell=5, smoothing=1.0, pose=initial)
+    assert controller.pose is initial
+
+    run(controller, 5)
+    assert controller.level == 1
+    assert controller.pose.thread is not threading.current_thread()
+
+    controller.close()
+    assert initial.closed
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import threading
+import time
+import types
+
+import pytest
+
+import phrase_cache
+from phrase_cache import PhraseCache
+
+
+# pygame.mixer stand-ins: a Sound remembers its mp3 bytes and the thread that decoded it
+class FakeSound:
+    def __init__(self, file):
+        self.data = file.read()
+        self.thread = threading.current_thread()
+
+
+class FakeChannel:
+    def __init__(self, index):
+        self.played = []
+
+    def get_busy(self):
+        return False
+
+    def play(self, sound):
+        self.played.append(sound.data)
+
+
+fake_pygame = types.SimpleNamespace(mixer=types.SimpleNamespace(
+    init=lambda: None, quit=lambda: None, Channel=FakeChannel, Sound=FakeSound))
+
+
+# gTTS stand-in; with online False it fails the way it does without a network
+class FakeTTS:
+    online = True
+    calls = 0
+
+    def __init__(self, text, lang, slow):
+        self.text = text
+
+    def write_to_fp(self, fp):
+        FakeTTS.calls += 1
+        if not FakeTTS.online:
+            raise ConnectionError("no network")
+        fp.write(b'mp3:' + self.text.encode())
+
+
+# Collects what the offline engine would say
+class FakeSpeech:
+    def __init__(self):
+        self.said = []
+
+    def say(self, text):
+        self.said.append(text)
+
+    def close(self):
+        pass
+
+
+def eventually(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(phrase_cache, 'pygame', fake_pygame)
+    monkeypatch.setattr(phrase_cache, 'gTTS', FakeTTS)
+    monkeypatch.setattr(FakeTTS, 'online', True)
+    monkeypatch.setattr(FakeTTS, 'calls', 0)
+    cache = PhraseCache(str(tmp_path), fallback=FakeSpeech())
+    yield cache
+    cache.close()
+
+
+def test_phrases_are_stored_under_a_hash_of_language_and_text(cache, tmp_path):
+    digest = hashlib.sha1(b'en:Go lower!').hexdigest()
+    assert cache.path_for('Go lower!') == os.path.join(str(tmp_path), digest + '.mp3')
+    assert PhraseCache(str(tmp_path), language='de').path_for('Go lower!') != cache.path_for('Go lower!')
+    assert cache.synthesize('Go lower!') == b'mp3:Go lower!'
+    assert cache.cached_audio('Go lower!') == b'mp3:Go lower!'
+
+
+def test_a_miss_is_decoded_off_the_caller_thread_and_then_played_from_memory(cache):
+    cache.synthesize('Go lower!')
+    cache.say('Go lower!')
+    eventually(lambda: cache.channel.played == [b'mp3:Go lower!'])
+    sound = cache.sounds['Go lower!']
+    assert sound.thread is not threading.current_thread()
+
+    cache.say('Go lower!')
+    assert cache.channel.played == [b'mp3:Go lower!'] * 2
+    assert (cache.hits, cache.misses, cache.fallbacks) == (1, 1, 0)
+
+
+def test_an_uncached_phrase_is_spoken_offline_and_synthesized_for_next_time(cache):
+    cache.say('Keep your back straight!')
+    eventually(lambda: cache.fallback.said == ['Keep your back straight!'])
+    eventually(lambda: cache.cached_audio('Keep your back straight!') is not None)
+
+    cache.say('Keep your back straight!')
+    eventually(lambda: cache.channel.played == [b'mp3:Keep your back straight!'])
+    assert cache.fallbacks == 1
+
+
+def test_offline_it_falls_back_and_waits_before_trying_the_network_again(cache):
+    FakeTTS.online = False
+    cache.say('Go lower!')
+    eventually(lambda: FakeTTS.calls == 1 and not cache.queued)
+    cache.say('Go lower!')
+    eventually(lambda: cache.fallback.said == ['Go lower!'] * 2)
+    eventually(lambda: not cache.queued)
+    # One attempt, then none until retry_after has passed
+    assert FakeTTS.calls == 1
+    assert cache.cached_audio('Go lower!') is None
+
+
+def test_without_playback_everything_goes_to_the_offline_engine(cache, monkeypatch):
+    monkeypatch.setattr(phrase_cache, 'pygame', None)
+    cache.say('Starting now!')
+    assert cache.fallback.said == ['Starting now!']
+    assert cache.loader is None
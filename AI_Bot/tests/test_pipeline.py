@@ -0,0 +1,117 @@
+import queue
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import aifitnesscoach as coach
+from benchmark import FixedResults, StaticCapture, synthetic_landmarks
+from pipeline import FramePipeline, put_latest
+
+SIZE = (1080, 1920)
+FRAME_BYTES = SIZE[0] * SIZE[1] * 3
+
+
+@pytest.fixture
+def frame():
+    return np.random.default_rng(0).integers(0, 255, SIZE + (3,), dtype=np.uint8)
+
+
+@pytest.fixture
+def quiet(monkeypatch):
+    monkeypatch.setattr(coach, 'text_to_speech', lambda text, interrupt=False: None)
+
+
+def test_put_latest_replaces_the_oldest_item():
+    q = queue.Queue(maxsize=1)
+    dropped = []
+    assert put_latest(q, 'first', dropped.append) == 0
+    assert put_latest(q, 'second', dropped.append) == 1
+    assert dropped == ['first']
+    assert q.get_nowait() == 'second'
+
+
+def test_frame_buffers_go_round(frame):
+    pipeline = FramePipeline(StaticCapture(frame, fps=200), lambda rgb_frame: FixedResults(None)).start()
+    seen = set()
+    try:
+        for _ in range(100):
+            packet = pipeline.get()
+            seen.add(id(packet.frame))
+            pipeline.release(packet)
+    finally:
+        pipeline.stop()
+    # Only the handful of frames in flight at once were ever allocated, then reused
+    assert pipeline.pool.allocated <= 5
+    assert len(seen) <= pipeline.pool.allocated
+    assert pipeline.captured > 100
+
+
+def test_a_timestamped_process_gets_the_capture_time(frame):
+    seen = {}
+
+    def process(rgb_frame, timestamp):
+        seen[timestamp] = True
+        return FixedResults(None)
+
+    pipeline = FramePipeline(StaticCapture(frame, fps=200), process, timestamped=True).start()
+    try:
+        packets = [pipeline.get() for _ in range(10)]
+    finally:
+        pipeline.stop()
+    assert all(packet.captured_at in seen for packet in packets)
+
+
+# Stands in for the live-stream landmarker: only gets round to every third frame, and reports the
+# ones it skipped once a later result comes back
+class SkippingBackend:
+    def __init__(self):
+        self.in_flight = []
+        self.submitted = 0
+
+    def submit(self, rgb_frame, timestamp, on_result, on_drop=None):
+        self.submitted += 1
+        self.in_flight.append((timestamp, on_drop))
+        if self.submitted % 3 == 0:
+            *skipped, _ = self.in_flight
+            self.in_flight = []
+            for skipped_at, drop in skipped:
+                drop(skipped_at)
+            on_result(FixedResults(None), timestamp)
+
+
+def test_frames_the_backend_skips_go_back_to_the_pool(frame):
+    backend = SkippingBackend()
+    pipeline = FramePipeline(StaticCapture(frame, fps=200), None, submit=backend.submit).start()
+    try:
+        for _ in range(50):
+            pipeline.release(pipeline.get())
+    finally:
+        pipeline.stop()
+    assert pipeline.dropped_inference >= 100
+    assert pipeline.pool.allocated <= 6
+
+
+def test_steady_state_frames_allocate_no_frame_sized_arrays(frame, quiet):
+    landmarks = synthetic_landmarks(256)
+    pipeline = FramePipeline(StaticCapture(frame, fps=120), lambda rgb_frame: FixedResults(None)).start()
+    counts, stages = [0], [None]
+    # Warm text cache: every angle label the detector can draw
+    for angle in range(181):
+        coach.put_text_with_shadow(frame.copy(), str(angle), (50, 50), 1, (255, 255, 255), (0, 0, 0), 2)
+    tracemalloc.start()
+    peaks = []
+    try:
+        for i in range(-20, 100):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            packet = pipeline.get()
+            coach.run_exercise('squats', landmarks[i % len(landmarks)], packet.frame, counts, stages)
+            pipeline.release(packet)
+            if i >= 0:
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        pipeline.stop()
+        tracemalloc.stop()
+    # A new frame (or RGB copy) per iteration would be 6 MB here
+    assert max(peaks) < FRAME_BYTES / 16
@@ -0,0 +1,69 @@
+import csv
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmark import FixedResults, synthetic_squats
+from motion_model import to_landmark_list
+from process_video import CSV_FIELDS, process_video, write_csv
+
+FPS = 30
+
+
+# Sees the next frame of the squat trace whatever the frame, and no one for `missing` frames
+class FakePose:
+    def __init__(self, landmarks, missing=()):
+        self.landmarks = landmarks
+        self.missing = set(missing)
+        self.frames = 0
+        self.resets = 0
+
+    def process(self, rgb_frame):
+        index = self.frames
+        self.frames += 1
+        if index in self.missing:
+            return FixedResults(None)
+        return FixedResults(to_landmark_list(self.landmarks[index]))
+
+    def reset(self):
+        self.resets += 1
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / 'squats.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, (32, 24))
+    for i in range(225):
+        writer.write(np.full((24, 32, 3), i % 256, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_reps_are_counted_and_timed(video, tmp_path):
+    times, landmarks = synthetic_squats(7.5, FPS)
+    pose = FakePose(landmarks, missing=range(10))
+    result = process_video(video, 'squats', pose)
+
+    assert pose.resets == 1
+    assert (result['frames'], result['frames_with_pose']) == (225, 215)
+    assert result['video_seconds'] == 7.5
+    assert result['counts'] == {'Squat Count': 3}
+    # Reps land where the knees first pass 110 degrees on the way down, every 2.5 s
+    assert [rep['rep'] for rep in result['reps']] == [1, 2, 3]
+    assert [round(rep['time'] - result['reps'][0]['time'], 1) for rep in result['reps']] == [0.0, 2.5, 5.0]
+    # Each completed cycle adds its range of motion to the rep it belongs to
+    assert all(rep['min_angle'] < 80 for rep in result['reps'][:2])
+
+    path = str(tmp_path / 'reps.csv')
+    write_csv(result, path)
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3
+    assert list(rows[0]) == CSV_FIELDS
+    assert rows[2]['file'] == video and rows[2]['count'] == '3'
+
+
+def test_an_unreadable_video_raises(tmp_path):
+    with pytest.raises(IOError):
+        process_video(str(tmp_path / 'missing.mp4'), 'squats', FakePose(None))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from exercise_rules import ExerciseSession
+from landmark_array import ANGLE_INDEX, NUM_LANDMARKS
+
+FPS = 30.0
+
+
+# Knee angles for a squat set: stand at the top, go down to each depth and back up
+def squat_angles(depths, top=170.0, step=5.0, hold=5):
+    angles = [top] * hold
+    for depth in depths:
+        down = np.arange(top, depth, -step).tolist() + [depth]
+        angles += down + down[-2::-1] + [top] * hold
+    return angles
+
+
+def run_squats(knee_angles):
+    session = ExerciseSession('squats')
+    landmarks = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    angles = np.full(len(ANGLE_INDEX), 170.0)
+    completed = []
+    for frame, knee in enumerate(knee_angles):
+        angles[ANGLE_INDEX['left_knee']] = angles[ANGLE_INDEX['right_knee']] = knee
+        update = session.update(landmarks, angles, timestamp=frame / FPS)
+        completed.extend(update.metrics)
+    return session, completed
+
+
+def test_each_rep_gets_its_own_minimum():
+    depths = [100, 60, 100, 60, 100]
+    session, completed = run_squats(squat_angles(depths))
+    assert session.counts == [len(depths)]
+    assert [rep.min_angle for rep in completed] == pytest.approx(depths)
+    assert [rep.rom for rep in completed] == pytest.approx([170 - depth for depth in depths])
+
+
+def test_metrics_wait_for_the_cycle_to_finish():
+    # Counted on the way down, but not complete until back up past the reset angle
+    angles = squat_angles([60])
+    session, completed = run_squats(angles[:angles.index(60) + 5])
+    assert session.counts == [1]
+    assert completed == []
+
+
+def test_tempo_covers_the_whole_rep():
+    session, completed = run_squats(squat_angles([60], step=5.0))
+    rep = completed[0]
+    # All the way down, then back up until the counter resets (knees over 130)
+    assert rep.eccentric == pytest.approx(len(np.arange(170, 60, -5)) / FPS, abs=2 / FPS)
+    assert rep.concentric == pytest.approx(len(np.arange(60, 130, 5)) / FPS, abs=2 / FPS)
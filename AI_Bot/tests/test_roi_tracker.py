@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from benchmark import FixedResults
+from landmark_array import NUM_LANDMARKS
+from motion_model import to_landmark_list
+from roi_tracker import RoiPoseTracker
+
+WIDTH, HEIGHT = 1280, 720
+
+
+# Finds a "person" - a box of landmarks around `center` - in whatever region the tracker gave it,
+# reporting coordinates normalized to that region like a pose graph would. Like the graph, it only
+# takes contiguous images.
+class FakePose:
+    def __init__(self, size=0.3):
+        self.center = [0.5, 0.5]
+        self.size = size
+        self.tracker = None
+        self.resets = 0
+        self.shapes = set()
+
+    def process(self, image):
+        assert image.flags['C_CONTIGUOUS']
+        self.shapes.add(image.shape)
+        x0, y0, x1, y1 = self.tracker.region or (0, 0, WIDTH, HEIGHT)
+        grid = np.linspace(-0.5, 0.5, NUM_LANDMARKS)
+        landmarks = np.ones((NUM_LANDMARKS, 4), dtype=np.float32)
+        landmarks[:, 0] = ((self.center[0] + grid * self.size * HEIGHT / WIDTH) * WIDTH - x0) / (x1 - x0)
+        landmarks[:, 1] = ((self.center[1] + grid[::-1] * self.size) * HEIGHT - y0) / (y1 - y0)
+        landmarks[:, 2] = 0.0
+        return FixedResults(to_landmark_list(landmarks))
+
+    def reset(self):
+        self.resets += 1
+
+
+def track(path, size=0.3, input_size=None):
+    pose = FakePose(size)
+    tracker = pose.tracker = RoiPoseTracker(pose, input_size=input_size)
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for center in path:
+        pose.center = list(center)
+        results = tracker.process(frame)
+        mapped = np.array([(lm.x, lm.y) for lm in results.pose_landmarks.landmark])
+        assert np.allclose(mapped.mean(axis=0), center, atol=1e-3)
+    return tracker, pose
+
+
+def test_crop_stays_put_while_the_person_moves_a_little():
+    rng = np.random.default_rng(0)
+    path = 0.5 + rng.uniform(-0.01, 0.01, (200, 2))
+    tracker, pose = track(path)
+    # One full frame to find the person, then the same crop throughout
+    assert (tracker.full_frames, tracker.roi_frames, tracker.lost) == (1, 199, 0)
+    assert tracker.moves == pose.resets == 1
+
+
+def test_crop_follows_the_person_across_the_frame():
+    path = [(x, 0.5) for x in np.linspace(0.3, 0.7, 200)]
+    tracker, pose = track(path)
+    assert tracker.lost == 0
+    assert 1 < tracker.moves < 20
+    assert pose.resets == tracker.moves
+
+
+@pytest.mark.parametrize('size', [0.3, 0.5])
+def test_the_crop_handed_to_the_pose_is_contiguous(size):
+    # A small person's crop is under input_size and handed over as is, a bigger one is resized
+    path = 0.5 + np.random.default_rng(1).uniform(-0.01, 0.01, (50, 2))
+    tracker, pose = track(path, size=size, input_size=384)
+    assert tracker.roi_frames == 49
+    crops = pose.shapes - {(HEIGHT, WIDTH, 3)}
+    assert len(crops) == 1
+    side = crops.pop()[0]
+    assert side == 384 if size == 0.5 else side < 384
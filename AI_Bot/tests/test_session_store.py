@@ -0,0 +1,58 @@
+import datetime
+import threading
+
+from exercise_rules import COMPILED_EXERCISES, ExerciseUpdate
+from session_store import SessionLogger, SessionStore
+
+
+# Feed the logger n reps on top of main()'s running totals
+def do_reps(logger, exercise, counts, n):
+    for _ in range(n):
+        counts[0] += 1
+        logger.update(exercise, ExerciseUpdate(None, [0], [], None), counts)
+
+
+def test_coming_back_to_an_exercise_only_logs_the_new_reps(tmp_path):
+    store = SessionStore(str(tmp_path / 'history.db'))
+    logger = SessionLogger(store)
+    squats, pushups = COMPILED_EXERCISES['squats'], COMPILED_EXERCISES['pushups']
+    squat_counts, pushup_counts = [0], [0]
+
+    logger.start(squats, squat_counts)
+    do_reps(logger, squats, squat_counts, 10)
+    logger.start(pushups, pushup_counts)
+    do_reps(logger, pushups, pushup_counts, 3)
+    logger.start(squats, squat_counts)
+    do_reps(logger, squats, squat_counts, 5)
+    logger.finish()
+    store.flush()
+
+    today = datetime.date.today()
+    sessions = store.sessions(today - datetime.timedelta(days=1), today + datetime.timedelta(days=1))
+    assert [(row['exercise'], row['reps']) for row in sessions] == [('squats', 10), ('pushups', 3), ('squats', 5)]
+    assert sessions[2]['counts'] == 'Squat Count: 5'
+    assert [rep['count'] for rep in store.session_reps(sessions[2]['id'])] == [1, 2, 3, 4, 5]
+    store.close()
+
+
+# Run fn on a thread and give it `timeout` seconds; returns (finished, result)
+def within(timeout, fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive(), result[0] if result else None
+
+
+def test_flush_and_close_return_when_the_writer_dies(tmp_path):
+    store = SessionStore(str(tmp_path / 'history.db'), flush_interval=0.05)
+    # Not a statement the writer knows: it goes down with a KeyError rather than an sqlite3 error
+    store.pending.put(('unknown', ()))
+    assert within(5, store.flush)[0]
+    store.thread.join(5)
+    assert not store.thread.is_alive()
+    assert store.error.startswith('KeyError')
+
+    store.start_session('squats')
+    assert within(5, store.flush) == (True, False)
+    assert within(5, store.close)[0]
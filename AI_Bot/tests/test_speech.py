@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+
+from benchmark import SlowSpeechEngine, synthetic_landmarks
+from exercise_rules import ExerciseSession
+from speech import SpeechWorker
+
+
+# SlowSpeechEngine that remembers what it was asked to do
+class RecordingEngine(SlowSpeechEngine):
+    def __init__(self, seconds=0.5):
+        super().__init__(seconds)
+        self.said = []
+        self.stops = 0
+
+    def say(self, text):
+        self.said.append(text)
+        super().say(text)
+
+    def stop(self):
+        self.stops += 1
+        super().stop()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+# Per-frame times of the squat detector, asking the worker to speak every `every` frames
+def frame_times(worker, landmarks, every=None):
+    session = ExerciseSession('squats')
+    times = np.empty(len(landmarks))
+    for i, frame in enumerate(landmarks):
+        start = time.perf_counter()
+        session.update(frame)
+        if every and i % every == 0:
+            worker.say(f'Rep {i}')
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def test_speaking_does_not_stall_the_frame_loop():
+    landmarks = synthetic_landmarks(600)
+    worker = SpeechWorker(engine_factory=SlowSpeechEngine)
+    worker.start()
+    try:
+        frame_times(worker, landmarks[:100])  # warm up
+        silent = frame_times(worker, landmarks)
+        speaking = frame_times(worker, landmarks, every=10)
+    finally:
+        worker.close()
+    # A blocking say() would add the engine's 0.5 s to every 10th frame, thousands of times a frame's
+    # few tens of microseconds; the margin here only absorbs the worker thread waking up for the GIL
+    assert speaking.mean() / silent.mean() < 3.0
+    assert speaking.max() < 0.05
+
+
+def test_full_queue_drops_the_oldest_phrase():
+    engine = RecordingEngine(seconds=10)
+    worker = SpeechWorker(max_pending=2, engine_factory=lambda: engine)
+    try:
+        worker.say('first')
+        wait_for(lambda: engine.said == ['first'])
+        for text in ('a', 'b', 'c'):
+            worker.say(text)
+        assert list(worker.pending) == ['b', 'c']
+        assert worker.dropped == 1
+    finally:
+        worker.close()
+
+
+def test_interrupt_cuts_off_and_skips_the_queue():
+    engine = RecordingEngine(seconds=10)
+    worker = SpeechWorker(max_pending=2, engine_factory=lambda: engine)
+    try:
+        worker.say('first')
+        wait_for(lambda: engine.said == ['first'])
+        worker.say('a')
+        worker.say('b')
+        worker.say('Rep 5', interrupt=True)
+        wait_for(lambda: engine.said == ['first', 'Rep 5'])
+        assert engine.stops == 1
+        assert worker.dropped == 2
+        assert not worker.pending
+    finally:
+        worker.close()
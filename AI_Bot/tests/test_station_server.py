@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+import pytest
+
+import station_server
+from benchmark import FixedResults, synthetic_squats
+from motion_model import to_landmark_list
+from pipeline import FramePacket
+from station_server import Station, StationServer
+
+FPS = 30
+TIMES, SQUATS = synthetic_squats(10, FPS)
+
+
+# Stands in for a station's pose graph: whatever the frame, it sees the next frame of the squat trace
+class FakePose:
+    def __init__(self):
+        self.frames = 0
+        self.closed = False
+
+    def process(self, rgb_frame):
+        landmarks = SQUATS[self.frames % len(SQUATS)]
+        self.frames += 1
+        return FixedResults(to_landmark_list(landmarks))
+
+    def close(self):
+        self.closed = True
+
+
+def write_video(path, frames):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), FPS, (32, 24))
+    for i in range(frames):
+        writer.write(np.full((24, 32, 3), i % 256, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_video_files_stand_in_for_cameras(tmp_path):
+    # 5 s and 7.5 s of squats at a 2.5 s period; the third station's file doesn't exist
+    stations = [
+        Station('short', write_video(tmp_path / 'short.avi', 150), 'squats', target_fps=None, realtime=False),
+        Station('long', write_video(tmp_path / 'long.avi', 225), 'squats', target_fps=None, realtime=False),
+        Station('missing', str(tmp_path / 'missing.avi'), 'squats', target_fps=None, realtime=False),
+    ]
+    poses = []
+    server = StationServer(stations, workers=2, pose_factory=lambda: poses.append(FakePose()) or poses[-1])
+    short, long, missing = server.run(duration=30)
+
+    assert (short['counts'], long['counts']) == ({'Squat Count': 2}, {'Squat Count': 3})
+    # Offline, every frame is inferred and nothing is dropped
+    assert (short['captured'], short['inferred'], short['dropped']) == (150, 150, 0)
+    assert (long['captured'], long['inferred'], long['dropped']) == (225, 225, 0)
+    assert short['error'] is long['error'] is None
+    assert missing['error'] == "Could not open source"
+    assert missing['captured'] == 0
+    # One pose graph per station that ran, closed at the end
+    assert len(poses) == 2 and all(pose.closed for pose in poses)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+# Stands in for the server's condition: waiting just moves the fake clock on
+class FakeCondition:
+    def __init__(self, clock):
+        self.clock = clock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def wait(self, timeout):
+        self.clock.now += timeout
+
+    def notify_all(self):
+        pass
+
+
+# One worker taking `service_time` per frame, with a frame always waiting at every station; returns
+# how many frames per second each station got
+def serve(monkeypatch, targets, service_time, seconds=10.0):
+    clock = FakeClock()
+    monkeypatch.setattr(station_server, 'time', clock)
+    stations = [Station(f'station-{i}', 'unused', 'squats', target_fps=fps) for i, fps in enumerate(targets)]
+    server = StationServer(stations, workers=1, pose_factory=FakePose)
+    server.condition = FakeCondition(clock)
+    for station in stations:
+        station.latest = FramePacket(0, None, 0.0)
+    served = [0] * len(stations)
+    while clock.now < seconds:
+        station, packet = server._next_job()
+        served[stations.index(station)] += 1
+        clock.now += service_time
+        station.busy = False
+        station.latest = packet
+    return [round(count / seconds) for count in served]
+
+
+@pytest.mark.parametrize('targets, service_time, expected', [
+    # Room for everyone: each station gets its own target
+    ([20, 50], 0.005, [20, 50]),
+    # 50 frames/s for 125 wanted: the slow station still gets all it asks for, the others share the rest
+    ([100, 10, 30], 0.02, [20, 10, 20]),
+    ([100, 25], 0.02, [25, 25]),
+])
+def test_the_schedule_is_fair_across_target_rates(monkeypatch, targets, service_time, expected):
+    assert serve(monkeypatch, targets, service_time) == expected
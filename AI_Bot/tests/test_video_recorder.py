@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+import pytest
+
+import video_recorder
+from video_recorder import VideoRecorder
+
+
+# Stands in for cv2.VideoWriter: keeps an id per written frame and takes `delay` seconds per write
+class FakeWriter:
+    delay = 0.0
+
+    def __init__(self, path, fourcc, fps, size):
+        self.written = []
+        writers.append(self)
+
+    def isOpened(self):
+        return True
+
+    def write(self, frame):
+        time.sleep(self.delay)
+        self.written.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        pass
+
+
+writers = []
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writers.clear()
+    monkeypatch.setattr(video_recorder.cv2, 'VideoWriter', FakeWriter)
+    monkeypatch.setattr(FakeWriter, 'delay', 0.0)
+    return FakeWriter
+
+
+def test_a_slow_encoder_drops_frames_instead_of_blocking(writer):
+    writer.delay = 0.02
+    released = []
+    calls = []
+    with VideoRecorder('unused.mp4', max_queue=4) as recorder:
+        for i in range(100):
+            frame = np.full((8, 8, 3), i % 256, dtype=np.uint8)
+            started = time.perf_counter()
+            recorder.write(frame, released.append, i / 1000)
+            calls.append(time.perf_counter() - started)
+    stats = recorder.stats()
+    assert max(calls) < 0.01
+    assert stats['dropped'] > 50
+    assert stats['written'] + stats['merged'] + stats['dropped'] == 100
+    # Every handed-over buffer came back exactly once, written or not
+    assert len(released) == 100
+    assert len({id(frame) for frame in released}) == 100
+
+
+def test_copied_frames_use_a_fixed_set_of_buffers(writer):
+    writer.delay = 0.005
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    with VideoRecorder('unused.mp4', max_queue=4) as recorder:
+        for i in range(200):
+            recorder.write(frame, timestamp=i / 1000)
+    assert recorder.stats()['buffers'] <= recorder.max_buffers
+
+
+def test_the_recording_keeps_real_time_when_frames_arrive_slower_than_its_rate(writer):
+    # (a queue long enough that nothing is dropped)
+    with VideoRecorder('unused.mp4', fps=30, max_queue=16) as recorder:
+        # 10 FPS live, with a stall after frame 5 and two frames inside one 1/30 s slot at the end
+        timestamps = [i / 10 for i in range(6)] + [1.0, 1.1, 1.2, 1.21]
+        for i, timestamp in enumerate(timestamps):
+            recorder.write(np.full((8, 8, 3), i, dtype=np.uint8), timestamp=timestamp)
+    written = writers[0].written
+    assert written == [0] * 3 + [1] * 3 + [2] * 3 + [3] * 3 + [4] * 3 + [5] * 15 + [6] * 3 + [7] * 3 + [9]
+    # Played back at 30 FPS the file lasts as long as the session did
+    assert len(written) == round(timestamps[-1] * 30) + 1
+    assert recorder.stats()['merged'] == 1
+    assert recorder.stats()['repeated'] == len(written) - recorder.stats()['written']
+
+
+def test_without_timestamps_every_frame_is_written_once(writer):
+    with VideoRecorder('unused.mp4', max_queue=16) as recorder:
+        for i in range(5):
+            recorder.write(np.full((8, 8, 3), i, dtype=np.uint8))
+    assert writers[0].written == [0, 1, 2, 3, 4]
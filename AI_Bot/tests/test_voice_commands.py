@@ -0,0 +1,50 @@
+import pytest
+
+from voice_commands import VoiceCommandListener, grammar_words, parse_command
+
+
+@pytest.mark.parametrize('text, command', [
+    ('start squats', ('start', 'squats')),
+    ('Begin push-ups', ('start', 'pushups')),
+    ("let's start", ('start', None)),
+    ('switch to lunges', ('switch', 'lunges')),
+    ('change to bicep curls', ('switch', 'bicep curl')),
+    ('next overhead press', ('switch', 'overhead dumbbell press')),
+    # The longest alias wins: "dumbbell press" isn't read as a plain "press" somewhere else
+    ('dumbbell press please', ('switch', 'overhead dumbbell press')),
+    # Just naming an exercise selects it
+    ('curls', ('switch', 'bicep curl')),
+    ('  SQUAT  ', ('switch', 'squats')),
+    # "switch" without an exercise isn't a command
+    ('switch', None),
+    ('stop', ('stop', None)),
+    ('OK quit now', ('stop', None)),
+    ('end workout', ('stop', None)),
+    # Stopping wins over anything else said with it
+    ('stop squats', ('stop', None)),
+    # Whole words only
+    ('squatting', None),
+    ('restart', None),
+    ('', None),
+    ('what a nice day', None),
+])
+def test_parse_command(text, command):
+    assert parse_command(text) == command
+
+
+def test_every_alias_is_in_the_grammar():
+    words = set(grammar_words())
+    assert {'push', 'ups', 'overhead', 'dumbbell', 'switch', 'to', 'stop'} <= words
+    assert all(word == word.lower() and ' ' not in word for word in words)
+
+
+def test_latencies_stay_within_the_window(monkeypatch):
+    listener = VoiceCommandListener(latency_window=4)
+    monkeypatch.setattr(listener, 'recognize', lambda audio: 'start squats')
+    for _ in range(10):
+        listener._on_audio(None, None)
+    assert len(listener.latencies) == 4
+    assert len(listener.recent_latencies()) == 4
+    assert (listener.utterances, listener.recognized) == (10, 10)
+    assert listener.poll() == [('start', 'squats')] * 10
+    assert listener.poll() == []
@@ -0,0 +1,226 @@
+import argparse
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+# Annotated-video export that never holds up the live loop.
+# write(frame) queues the finished frame (skeleton, angles, feedback and all) for a background
+# thread that encodes it with cv2.VideoWriter, which releases the GIL while it works. When the
+# encoder falls behind and the queue is full, the frame is dropped and counted instead of waiting.
+# The frame is either copied into one of the recorder's own spare buffers, or - with
+# write(frame, release) - handed over as is and given back through release(frame) once it has been
+# encoded (or dropped), which is how the live loop returns it to FramePipeline's buffer pool.
+# Either way buffers go round instead of being allocated per frame.
+#
+# The file plays at a fixed rate but frames don't arrive at one: the pipeline drops frames when
+# inference falls behind, and so does the recorder. So write() takes the frame's timestamp, and the
+# encoder holds each frame until the next one arrives and then writes it once for every 1/fps it
+# stayed on screen (frames that land in a slot already taken are merged away). The recording keeps
+# real time at any live frame rate.
+#
+#   python video_recorder.py --benchmark              # write() cost and drops at 1080p, 30 FPS
+#   python video_recorder.py --benchmark --fps 0      # as fast as possible, to see frames dropped
+#   python video_recorder.py --benchmark --handover   # pooled frames handed over instead of copied
+
+class VideoRecorder:
+    def __init__(self, path, fps=30.0, fourcc='mp4v', max_queue=8):
+        self.path = path
+        self.fps = fps
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.max_buffers = max_queue + 2  # the queue, the frame being encoded and the one held back
+        self.pending = queue.Queue(maxsize=max_queue)
+        self.free = queue.SimpleQueue()
+        self.buffers = 0
+        self.writer = None
+        self.started_at = None
+        self.submitted = 0
+        self.frames = 0
+        self.repeated = 0
+        self.merged = 0
+        self.dropped = 0
+        self.max_pending = 0
+        self.encode_time = 0.0
+        self.error = None
+        self.thread = threading.Thread(target=self._encode_loop, name='video-recorder', daemon=True)
+        self.thread.start()
+
+    # Queue frame for encoding; returns False if it had to be dropped. Without release the frame is
+    # copied; with it the recorder owns frame until it calls release(frame). timestamp is when the
+    # frame was captured, in seconds (without one, every frame takes one 1/fps slot).
+    def write(self, frame, release=None, timestamp=None):
+        self.submitted += 1
+        if release is None:
+            release = self.free.put
+            frame = self._copy(frame)
+        if frame is None or self.error:
+            return self._drop(frame, release)
+        try:
+            self.pending.put_nowait((frame, release, timestamp))
+        except queue.Full:
+            return self._drop(frame, release)
+        self.max_pending = max(self.max_pending, self.pending.qsize())
+        return True
+
+    def _copy(self, frame):
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            if self.buffers >= self.max_buffers:
+                return None
+            self.buffers += 1
+            return frame.copy()
+        if buffer.shape != frame.shape:
+            return frame.copy()
+        np.copyto(buffer, frame)
+        return buffer
+
+    def _drop(self, frame, release):
+        if frame is not None:
+            release(frame)
+        self.dropped += 1
+        return False
+
+    # Encode what is queued and finish the file
+    def close(self):
+        if self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+
+    # Which 1/fps slot of the video a frame starts in
+    def _slot(self, timestamp, previous):
+        if timestamp is None:
+            return previous + 1
+        if self.started_at is None:
+            self.started_at = timestamp
+        return max(round((timestamp - self.started_at) * self.fps), previous)
+
+    def _encode_loop(self):
+        held, held_slot = None, -1
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            buffer, release, timestamp = item
+            slot = self._slot(timestamp, held_slot)
+            if held is not None:
+                self._encode(*held, slot - held_slot)
+            held, held_slot = (buffer, release), slot
+        if held is not None:
+            self._encode(*held, 1)
+        if self.writer is not None:
+            self.writer.release()
+
+    # Write buffer `copies` times (0: it was replaced before its slot came up) and give it back
+    def _encode(self, buffer, release, copies):
+        started = time.perf_counter()
+        try:
+            if copies:
+                if self.writer is None:
+                    height, width = buffer.shape[:2]
+                    self.writer = cv2.VideoWriter(self.path, self.fourcc, self.fps, (width, height))
+                    if not self.writer.isOpened():
+                        raise IOError("Could not open " + self.path + " for writing")
+                for _ in range(copies):
+                    self.writer.write(buffer)
+                self.frames += 1
+                self.repeated += copies - 1
+            else:
+                self.merged += 1
+        except (cv2.error, IOError) as e:
+            if self.error is None:
+                print("Could not record video: " + str(e))
+            self.error = str(e)
+        self.encode_time += time.perf_counter() - started
+        release(buffer)
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'written': self.frames,
+            'repeated': self.repeated,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'buffers': self.buffers,
+            'max_pending': self.max_pending,
+            'encode_ms': round(self.encode_time / self.frames * 1000, 2) if self.frames else None,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Feed frames like the live loop would (recorder=None: the same loop without recording); returns
+# the loop's frame rate and each write() call's time on the calling thread
+# (handover: pass pooled frames with a release callback instead of having them copied)
+def feed(recorder, frame, frames, fps, handover=False):
+    width = frame.shape[1]
+    pool = queue.SimpleQueue()
+    times = np.zeros(frames)
+    interval = 1.0 / fps if fps else 0.0
+    started = time.perf_counter()
+    for i in range(frames):
+        due = started + i * interval
+        now = time.perf_counter()
+        if now < due:
+            time.sleep(due - now)
+            now = time.perf_counter()
+        # Something that changes from frame to frame, like the overlays do
+        cv2.rectangle(frame, (i * 7 % width, 100), (i * 7 % width + 80, 180), (0, 255, 0), -1)
+        if handover:
+            # Stands in for the capture reading into a free pool buffer
+            try:
+                pooled = pool.get_nowait()
+            except queue.Empty:
+                pooled = np.empty_like(frame)
+            np.copyto(pooled, frame)
+        if recorder is None:
+            if handover:
+                pool.put(pooled)
+            continue
+        call = time.perf_counter()
+        if handover:
+            recorder.write(pooled, pool.put, now)
+        else:
+            recorder.write(frame, timestamp=now)
+        times[i] = time.perf_counter() - call
+    return frames / (time.perf_counter() - started), times
+
+
+def benchmark(path, width, height, frames, fps, handover=False):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    baseline, _ = feed(None, frame, frames, fps, handover)
+    with VideoRecorder(path, fps or 30.0) as recorder:
+        looped, times = feed(recorder, frame, frames, fps, handover)
+    micros = times * 1e6
+    print(f"{frames} frames of {width}x{height} at {looped:.1f} FPS ({baseline:.1f} FPS without recording): "
+          f"write() p50 {np.percentile(micros, 50):.0f} us, p99 {np.percentile(micros, 99):.0f} us, max {micros.max():.0f} us")
+    print(recorder.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the background video recorder.')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--output', default='recorder_benchmark.mp4')
+    parser.add_argument('--size', default='1920x1080', help='WIDTHxHEIGHT')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fps', type=float, default=30, help='Rate to feed frames at (0: as fast as possible)')
+    parser.add_argument('--handover', action='store_true', help='Hand frames over with a release callback instead of copying them')
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+    width, height = map(int, args.size.lower().split('x'))
+    benchmark(args.output, width, height, args.frames, args.fps, args.handover)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import json
+import queue
+import re
+import time
+
+import numpy as np
+
+
+# Voice control that runs beside the video loop: SpeechRecognition's background listener records
+# utterances on its own thread, each utterance is recognized exactly once, and the text is matched
+# against a small command grammar. The loop only ever calls poll(), which never blocks.
+#
+#   python voice_commands.py                   # print commands as they are recognized (Google)
+#   python voice_commands.py --backend sphinx  # offline (pocketsphinx), restricted to the grammar
+#
+# Commands are (action, argument) tuples: ('start', exercise or None), ('switch', exercise), ('stop', None).
+
+# Spoken names for each exercise, longest first so "overhead press" wins over "press"
+EXERCISE_ALIASES = {
+    'overhead dumbbell press': ['overhead dumbbell press', 'overhead press', 'shoulder press', 'dumbbell press', 'press'],
+    'bicep curl': ['bicep curls', 'bicep curl', 'biceps', 'curls', 'curl'],
+    'pushups': ['push ups', 'push-ups', 'pushups', 'push up', 'pushup'],
+    'squats': ['squats', 'squat'],
+    'lunges': ['lunges', 'lunge'],
+}
+
+START_WORDS = ['start', 'begin']
+SWITCH_WORDS = ['switch to', 'change to', 'switch', 'next']
+STOP_WORDS = ['stop', 'quit', 'exit', 'finish', 'end workout']
+
+BACKENDS = ['google', 'sphinx', 'vosk']
+
+
+def _pattern(words):
+    return re.compile(r'\b(' + '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)) + r')\b')
+
+
+_EXERCISE_PATTERNS = [(name, _pattern(aliases)) for name, aliases in EXERCISE_ALIASES.items()]
+_START = _pattern(START_WORDS)
+_SWITCH = _pattern(SWITCH_WORDS)
+_STOP = _pattern(STOP_WORDS)
+
+
+# Match recognized text against the grammar; returns a command tuple or None
+def parse_command(text):
+    text = text.lower().strip()
+    if not text:
+        return None
+    if _STOP.search(text):
+        return ('stop', None)
+    exercise = next((name for name, pattern in _EXERCISE_PATTERNS if pattern.search(text)), None)
+    if _SWITCH.search(text) and exercise:
+        return ('switch', exercise)
+    if _START.search(text):
+        return ('start', exercise)
+    if exercise:
+        # Just naming an exercise selects it
+        return ('switch', exercise)
+    return None
+
+
+# Every word the grammar knows, for constraining offline recognizers
+def grammar_words():
+    phrases = START_WORDS + SWITCH_WORDS + STOP_WORDS + [alias for aliases in EXERCISE_ALIASES.values() for alias in aliases]
+    return sorted({word for phrase in phrases for word in phrase.replace('-', ' ').split()})
+
+
+# Recognition latencies are kept for the last `latency_window` utterances in a ring buffer, so a
+# listener that runs all session doesn't grow.
+class VoiceCommandListener:
+    def __init__(self, backend='google', phrase_time_limit=3.0, on_command=None, latency_window=256):
+        if backend not in BACKENDS:
+            raise ValueError("Unknown recognizer backend: " + backend)
+        self.backend = backend
+        self.phrase_time_limit = phrase_time_limit
+        self.on_command = on_command
+        self.commands = queue.Queue()
+        self.stop_listening = None
+        self.recognizer = None
+        self.utterances = 0
+        self.recognized = 0
+        self.latencies = np.zeros(latency_window)
+
+    def start(self):
+        import speech_recognition as sr
+        self.recognizer = sr.Recognizer()
+        microphone = sr.Microphone()
+        with microphone as source:
+            self.recognizer.adjust_for_ambient_noise(source)
+        self.stop_listening = self.recognizer.listen_in_background(microphone, self._on_audio, phrase_time_limit=self.phrase_time_limit)
+        return self
+
+    def close(self):
+        if self.stop_listening:
+            self.stop_listening(wait_for_stop=False)
+            self.stop_listening = None
+
+    # Commands recognized since the last call (never blocks)
+    def poll(self):
+        commands = []
+        while True:
+            try:
+                commands.append(self.commands.get_nowait())
+            except queue.Empty:
+                return commands
+
+    # One recognition pass per utterance (runs on the listener thread)
+    def recognize(self, audio):
+        import speech_recognition as sr
+        try:
+            if self.backend == 'sphinx':
+                # Keyword spotting over the grammar is much faster than open dictation
+                keywords = [(word, 1e-20) for word in grammar_words()]
+                return self.recognizer.recognize_sphinx(audio, keyword_entries=keywords)
+            if self.backend == 'vosk':
+                return json.loads(self.recognizer.recognize_vosk(audio)).get('text', '')
+            return self.recognizer.recognize_google(audio)
+        except sr.UnknownValueError:
+            return ''
+        except sr.RequestError as e:
+            print("Speech recognition unavailable: " + str(e))
+            return ''
+
+    # Recognition time of the recent utterances, in seconds
+    def recent_latencies(self):
+        return self.latencies[:min(self.utterances, len(self.latencies))]
+
+    def _on_audio(self, recognizer, audio):
+        started = time.perf_counter()
+        text = self.recognize(audio)
+        command = parse_command(text)
+        self.latencies[self.utterances % len(self.latencies)] = time.perf_counter() - started
+        self.utterances += 1
+        if command is None:
+            return
+        self.recognized += 1
+        self.commands.put(command)
+        if self.on_command:
+            self.on_command(command, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Listen for voice commands and print them.')
+    parser.add_argument('--backend', choices=BACKENDS, default='google')
+    parser.add_argument('--parse', help='Only parse this text against the grammar')
+    args = parser.parse_args()
+
+    if args.parse is not None:
+        print(parse_command(args.parse))
+        return
+
+    listener = VoiceCommandListener(args.backend, on_command=lambda command, text: print(f"{text!r} -> {command}")).start()
+    print("Listening... say e.g. 'start squats', 'switch to lunges' or 'stop' (Ctrl+C to quit)")
+    try:
+        while True:
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    listener.close()
+    latencies = listener.recent_latencies()
+    if len(latencies):
+        print(f"{listener.utterances} utterances, {listener.recognized} commands, "
+              f"mean recognition {latencies.mean() * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()